@@ -0,0 +1,607 @@
+""" Micro-benchmarks for the hot paths of the DOM, CSS and layout code.
+
+Run all of them with
+
+    python benchmarks.py
+
+or only some by passing their names, e.g. ``python benchmarks.py siblings``.
+"""
+import os, re, sys, time, StringIO
+
+import pxdom
+import domhtml
+import cssutils
+import cssutils.tokenize2
+import cssutils.util
+
+def timed(function, *args):
+    """ Return the wall clock time in seconds function(*args) took to run """
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+# Sibling navigation
+# ------------------
+
+def _make_list(length):
+    document = pxdom.getDOMImplementation('').createDocument(None, 'ul', None)
+    ul = document.documentElement
+    for i in xrange(length):
+        ul.appendChild(document.createElement('li'))
+    return ul
+
+def _walk_by_index(ul):
+    """ Sibling walk as pxdom used to do it, looking the node up in its
+    parent's childNodes at every step """
+    node = ul.firstChild
+    while node is not None:
+        siblings = node.parentNode.childNodes
+        index = siblings._index(node)
+        if index >= siblings.length - 1:
+            node = None
+        else:
+            node = siblings.item(index + 1)
+
+def _walk_by_sibling(ul):
+    node = ul.firstChild
+    while node is not None:
+        node = node.nextSibling
+
+def bench_siblings(length=100000):
+    """ Walk a list of 100k siblings with nextSibling """
+    ul = _make_list(length)
+    # the index based walk is quadratic, so time it on a sample and scale up
+    sample = min(length, 1000)
+    before = timed(_walk_by_index, _make_list(sample)) * (length / sample) ** 2
+    after = timed(_walk_by_sibling, ul)
+    print 'siblings: %d nodes, linear index lookup ~%.2fs (extrapolated), ' \
+          'nextSibling %.2fs' % (length, before, after)
+
+# CSS tokenizer
+# -------------
+
+_SHEET = u"""/* a typical site stylesheet */
+@import url("print.css") print;
+@media screen, projection {
+    body { font: 12px/1.4 "Lucida Grande", Verdana, sans-serif; }
+}
+html, body { margin: 0; padding: 0 0 1em; background: #fff url(img/bg.png) repeat-x; }
+#content .entry > h2 a:hover, ul.nav li + li { color: #3c6ead; border-bottom: 1px dotted; }
+div[class~="wiki"] p:first-child { text-indent: -.5em; width: 95%; }
+.ticket table.properties td { font-size: 90%; content: "\201C"; }
+"""
+
+def _tokenize(tokenizer, text):
+    for token in tokenizer.tokenize(text, fullsheet=True):
+        pass
+
+def bench_tokenizer(megabytes=4):
+    """ Tokenize a multi-megabyte stylesheet """
+    text = _SHEET * (megabytes * 2**20 / len(_SHEET))
+    size = len(text) / float(2**20)
+    tokenizer = cssutils.tokenize2.Tokenizer()
+    seconds = timed(_tokenize, tokenizer, text)
+    print 'tokenizer: %.1fMB in %.2fs, %.2fMB/s' % (size, seconds,
+                                                   size / seconds)
+
+# Name normalization
+# ------------------
+
+_NAMES = [u'color', u'margin-top', u'Font-Family', u'BACKGROUND', u'c\\olor',
+          u'border-left-width', u'media', u'import', u'screen', u'z-index']
+
+_escapes = re.compile(ur'(\\[^0-9a-fA-F])').sub
+
+def _normalize_regex(x):
+    """ Base._normalize as it used to be, a substitution and lower() """
+    if x:
+        def removeescape(matchobj):
+            return matchobj.group(0)[1:]
+        return _escapes(removeescape, x).lower()
+    return x
+
+def _normalize_all(normalize, times):
+    for i in xrange(times):
+        for name in _NAMES:
+            normalize(name)
+
+def bench_normalize(times=100000):
+    """ Normalize a set of typical property and at-rule names """
+    count = times * len(_NAMES)
+    before = timed(_normalize_all, _normalize_regex, times)
+    after = timed(_normalize_all, cssutils.util.Base._normalize, times)
+    print 'normalize: %d names, regex %.2fs, cached %.2fs' % (count, before,
+                                                             after)
+
+# Parsing text with many references
+# ---------------------------------
+
+class _ConcatenatingParser(pxdom.LSParser):
+    """ LSParser queueing text the way it used to, by string concatenation """
+    def _push(self, text):
+        self._queue= (self._queue or '')+text
+    def _pop(self):
+        text= self._queue or ''
+        self._queue= []
+        return text
+
+def _parse(parser, text):
+    input = pxdom.LSInput()
+    input.stringData = text
+    parser.parse(input)
+
+def bench_references(count=20000):
+    """ Parse a paragraph of short text runs between entity references """
+    text = '<p>%s</p>' % ('x &amp; y &lt; ' * count)
+    before = timed(_parse, _ConcatenatingParser(), text)
+    after = timed(_parse, pxdom.LSParser(), text)
+    print 'references: %d references, concatenated %.2fs, list %.2fs' % (
+        count * 2, before, after)
+
+# Parsing XHTML
+# -------------
+
+class _CharacterParser(pxdom.LSParser):
+    """ LSParser with its low-level primitives as they used to be, stepping
+    through the input a character at a time """
+    def _match(self, chars, stepPast=True):
+        index = self._buffer.index
+        matches = self._buffer.chars[index:index + len(chars)] == chars
+        if stepPast and matches:
+            self._buffer.index = index + len(chars)
+        return matches
+    def _upto(self, chars):
+        end = len(self._buffer.chars)
+        for s in chars:
+            index = self._buffer.chars.find(s, self._buffer.index, end)
+            if index != -1 and index < end:
+                end = index
+        try:
+            return self._buffer.chars[self._buffer.index:end]
+        finally:
+            self._buffer.index = end
+    def _white(self, required=True):
+        start = index = self._buffer.index
+        chars = self._buffer.chars
+        while index < len(chars) and (chars[index] in pxdom.WHITE or
+                                      chars[index] in pxdom.WHITEU):
+            index = index + 1
+        self._buffer.index = index
+        if required and index <= start:
+            self._error('Expected whitespace')
+    def _quote(self):
+        for quote in '"\'':
+            if self._match(quote):
+                return quote
+        self._error('Expected open-quote')
+    def _name(self):
+        index = self._buffer.index
+        if index >= len(self._buffer.chars) or \
+           self._buffer.chars[index] in pxdom.NOTFIRST or \
+           [r for r in pxdom.NOTFIRSTU
+            if r[0] <= ord(self._buffer.chars[index]) < r[1]]:
+            self._error('Expected name')
+        return self._nmtokens()
+    def _nmtokens(self):
+        start = index = self._buffer.index
+        chars = self._buffer.chars
+        while index < len(chars):
+            char = chars[index]
+            if char in pxdom.NOTNAME or char in pxdom.NOTCHAR or \
+               char in pxdom.NOTCHARU:
+                break
+            if [r for r in pxdom.NOTNAMEU if r[0] <= ord(char) < r[1]]:
+                break
+            index = index + 1
+        self._buffer.index = index
+        if index == start:
+            self._error('Expected name tokens')
+        return self._domConfig._cnorm(chars[start:index], None, True)
+
+_ROW = """    <tr class="row" id="r%d">
+      <td headers="name"><a href="/ticket/%d" title="View ticket">#%d</a></td>
+      <td headers="summary">Parser drops <em>trailing</em> whitespace &amp; text</td>
+    </tr>
+"""
+
+def _scan(parser, text):
+    """ Step through the tags, attributes and references of text using only
+    the parser's low-level primitives """
+    input = pxdom.LSInput()
+    input.stringData = text
+    parser._buffer = pxdom.InputBuffer(input, (1, 1), parser.domConfig, False)
+    end = len(parser._buffer.chars)
+    while parser._buffer.index < end:
+        parser._upto('<&')
+        if parser._match('</'):
+            parser._name()
+            parser._white(False)
+            parser._match('>')
+        elif parser._match('<'):
+            parser._name()
+            while not parser._match('>') and not parser._match('/>'):
+                parser._white()
+                parser._name()
+                parser._equal()
+                parser._literal()
+        elif parser._match('&'):
+            parser._name()
+            parser._match(';')
+
+def _xhtml(rows):
+    return ('<html xmlns="http://www.w3.org/1999/xhtml">\n  <body>\n'
+            '  <table>\n%s  </table>\n  </body>\n</html>\n' %
+            ''.join([_ROW % (i, i, i) for i in xrange(rows)]))
+
+def bench_xhtml(rows=2000):
+    """ Scan and parse a large indented XHTML table """
+    text = _xhtml(rows)
+    before = timed(_scan, _CharacterParser(), text)
+    after = timed(_scan, pxdom.LSParser(), text)
+    parse = timed(_parse, pxdom.LSParser(), text)
+    print 'xhtml: %dkB, primitives per character %.2fs, regex %.2fs, ' \
+          'whole parse %.2fs' % (len(text) / 1024, before, after, parse)
+
+# Lazy locations
+# --------------
+
+def _lazy_parser():
+    parser = pxdom.LSParser()
+    parser.domConfig.setParameter('pxdom-lazy-locations', True)
+    return parser
+
+def bench_locations(rows=2000):
+    """ Parse a large XHTML table with and without lazy node locations """
+    text = _xhtml(rows)
+    before = timed(_parse, pxdom.LSParser(), text)
+    after = timed(_parse, _lazy_parser(), text)
+    print 'locations: %dkB, line and column %.2fs, lazy offsets %.2fs' % (
+        len(text) / 1024, before, after)
+
+# Reading input
+# -------------
+
+def _read_through(isDocument, text):
+    """ Read text through an InputBuffer as the parser would, swallowing what
+    has been read; return the most characters the buffer held at once """
+    input = pxdom.LSInput()
+    input.byteStream = StringIO.StringIO(text)
+    buffer = pxdom.InputBuffer(input, (1, 1), pxdom.DOMConfiguration(),
+                               isDocument)
+    buffer.setEncoding()
+    held = 0
+    while True:
+        held = max(held, len(buffer.chars))
+        buffer.index = len(buffer.chars)
+        buffer.swallow()
+        if not buffer.more():
+            return held
+
+def bench_input(megabytes=16):
+    """ Read a multi-megabyte document whole and a window at a time """
+    line = '<p class="x">Some text &amp; more text</p>\r\n'
+    text = line * (megabytes * 2**20 / len(line))
+    held = {}
+    whole = timed(lambda: held.setdefault(False, _read_through(False, text)))
+    windowed = timed(lambda: held.setdefault(True, _read_through(True, text)))
+    print 'input: %dMB, whole %.2fs holding %dk chars, windowed %.2fs ' \
+          'holding %dk chars' % (megabytes, whole, held[False] / 1024,
+                                 windowed, held[True] / 1024)
+
+# Building deep documents
+# -----------------------
+
+def _build_deep(depth, width, bulk):
+    document = pxdom.getDOMImplementation('').createDocument(None, 'div',
+                                                              None)
+    if bulk:
+        document._beginBuild()
+    node = document.documentElement
+    for i in xrange(depth):
+        for j in xrange(width):
+            node.appendChild(document.createElement('span'))
+        node = node.appendChild(document.createElement('div'))
+    if bulk:
+        document._endBuild()
+
+def bench_build(depth=500, width=20):
+    """ Build a deeply nested document with and without bulk building """
+    before = timed(_build_deep, depth, width, False)
+    after = timed(_build_deep, depth, width, True)
+    print 'build: %d nodes %d deep, propagating %.2fs, bulk %.2fs' % (
+        depth * (width + 1), depth, before, after)
+
+# Attribute lookup
+# ----------------
+
+def _get_by_scan(attributes, name):
+    """ NamedNodeMap.getNamedItem as it used to be, a scan of the list """
+    for node in attributes._list:
+        if name == node.nodeName:
+            return node
+
+def _lookup_all(get, attributes, names, times):
+    for i in xrange(times):
+        for name in names:
+            get(attributes, name)
+
+def bench_attributes(count=200, times=100):
+    """ Look up every attribute of an element with many attributes """
+    document = pxdom.getDOMImplementation('').createDocument(None, 'svg',
+                                                              None)
+    names = ['data-item-%d' % i for i in xrange(count)]
+    for name in names:
+        document.documentElement.setAttribute(name, name)
+    attributes = document.documentElement.attributes
+    before = timed(_lookup_all, _get_by_scan, attributes, names, times)
+    after = timed(_lookup_all, pxdom.NamedNodeMap.getNamedItem, attributes,
+                  names, times)
+    print 'attributes: %d lookups in %d attributes, scan %.2fs, ' \
+          'indexed %.2fs' % (count * times, count, before, after)
+
+# ID lookup
+# ---------
+
+def _make_ids(count):
+    rows = ''.join(['<p id="p%d">text</p>' % i for i in xrange(count)])
+    return pxdom.parseString('<!DOCTYPE div [<!ATTLIST p id ID #IMPLIED>]>'
+                             '<div>%s</div>' % rows)
+
+def _get_all(get, document, count):
+    for i in xrange(count):
+        get(document, 'p%d' % i)
+
+def _get_by_walk(document, elementId):
+    """ getElementById as it used to be, a walk of the whole document """
+    return document._getElementById(document, elementId)
+
+def _mutate_and_get(get, document, rounds, elementId):
+    """ Change the document, then look up an ID """
+    div = document.documentElement
+    for i in xrange(rounds):
+        p = document.createElement('p')
+        p.setAttribute('id', 'new%d' % i)
+        div.appendChild(p)
+        div.firstChild.setAttribute('class', 'c%d' % i)
+        get(document, elementId)
+
+def bench_ids(count=5000, rounds=200):
+    """ Look up every ID of a document, and look up IDs between changes """
+    document = _make_ids(count)
+    # the walk is quadratic, so time it on a sample and scale up
+    sample = min(count, 500)
+    before = timed(_get_all, _get_by_walk, _make_ids(sample),
+                   sample) * (count / sample) ** 2
+    after = timed(_get_all, pxdom.Document.getElementById, document, count)
+    print 'ids: %d lookups, walk ~%.2fs (extrapolated), indexed %.2fs' % (
+        count, before, after)
+    for elementId in ('p1', 'p%d' % (count / 2)):
+        before = timed(_mutate_and_get, _get_by_walk, _make_ids(count),
+                       rounds, elementId)
+        after = timed(_mutate_and_get, pxdom.Document.getElementById,
+                      _make_ids(count), rounds, elementId)
+        print 'ids: %d changes and lookups of %s, walk %.2fs, ' \
+              'indexed %.2fs' % (rounds, elementId, before, after)
+
+# Live lists
+# ----------
+
+class _WalkingList(pxdom.NodeListByTagName):
+    """ NodeListByTagName as it used to be, walking the document whenever it
+    has changed """
+    def _key(self):
+        return None
+
+def _grow_page(listclass, count):
+    """ Add paragraphs and images to a page one at a time, counting the
+    images after each """
+    document = pxdom.getDOMImplementation('').createDocument(None, 'body',
+                                                              None)
+    body = document.documentElement
+    images = listclass(document, pxdom.NONS, 'img')
+    for i in xrange(count):
+        p = body.appendChild(document.createElement('p'))
+        if i % 10 == 0:
+            p.appendChild(document.createElement('img'))
+        images.length
+
+def bench_live(count=1000):
+    """ Read a live list of a document after each change to it """
+    before = timed(_grow_page, _WalkingList, count)
+    after = timed(_grow_page, pxdom.NodeListByTagName, count)
+    print 'live: %d changes, walking %.2fs, indexed %.2fs' % (count, before,
+                                                            after)
+
+# Parsing pages
+# -------------
+
+_PAGE = """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN"
+    "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">
+<html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">
+<head>
+<title>Timeline &amp; changes</title>
+<link rel="stylesheet" href="/chrome/common/css/trac.css" type="text/css" />
+</head>
+<body>
+<div id="content" class="timeline">
+%s</div>
+</body>
+</html>
+"""
+
+_ENTRY = """<!-- changeset %d -->
+<dl><dt class="changeset"><a href="/changeset/%d"><span class="time">10:%02d</span>
+Changeset <em>[%d]</em> by <strong>pib</strong></a></dt>
+<dd class="changeset">Fixed &lt;td&gt; widths when a cell&#8217;s content
+overflows &#8212; see <a href="/ticket/%d">#%d</a>.</dd></dl>
+"""
+
+def _pages():
+    """ A corpus of pages as tidy writes them: an XHTML table and a text
+    heavy timeline """
+    timeline = ''.join([_ENTRY % (i, i, i % 60, i, i, i)
+                        for i in xrange(1000)])
+    return [_xhtml(1000), _PAGE % timeline]
+
+def _parse_pages(parse, pages):
+    for page in pages:
+        parse(page, 'http://localhost/')
+
+def _parse_ls(page, uri):
+    """ domhtml.parseString, but without fetching the DTD """
+    return domhtml._parse(page, uri, {'pxdom-resolve-resources': False})
+
+def bench_pages():
+    """ Parse a corpus of pages with LSParser and with parseFast """
+    pages = _pages()
+    size = sum([len(page) for page in pages]) / 1024
+    before = timed(_parse_pages, _parse_ls, pages)
+    after = timed(_parse_pages, domhtml.parseFast, pages)
+    print 'pages: %d pages, %dkB, LSParser %.2fs, parseFast %.2fs' % (
+        len(pages), size, before, after)
+
+# Cascade
+# -------
+
+def _trac_sheet():
+    """ The Trac style sheet of csstest.py """
+    source = open(os.path.join(os.path.dirname(__file__) or '.',
+                               'csstest.py')).read()
+    return cssutils.parseString(source.split('"""')[1])
+
+def _match_all(sheet, elements):
+    """ Test every selector of every style rule against every element """
+    for element in elements:
+        for rule in sheet.cssRules:
+            if rule.type == rule.STYLE_RULE:
+                for selector in rule.selectorList:
+                    selector.match(element)
+
+def _match_indexed(sheet, elements):
+    index = sheet.ruleIndex
+    for element in elements:
+        index.matchingRules(element)
+
+def bench_cascade():
+    """ Find the rules of the Trac style sheet matching each element of a
+    page, testing all of them and only the indexed candidates """
+    sheet = _trac_sheet()
+    document = domhtml.parseFast(_pages()[1])
+    elements = list(document.getElementsByTagName('*'))
+    before = timed(_match_all, sheet, elements)
+    after = timed(_match_indexed, sheet, elements)
+    print 'cascade: %d rules, %d elements, all %.2fs, indexed %.2fs' % (
+        len(sheet.cssRules), len(elements), before, after)
+
+# Computed styles
+# ---------------
+
+def _styles_unshared(node, parent_properties, styles):
+    """ Build a computed style for every node below node, one each, as
+    getComputedStyle used to """
+    for child in node.childNodes:
+        style_text = ''
+        if child.nodeType == pxdom.Node.ELEMENT_NODE:
+            style_text = child.getAttribute('style')
+        style, properties = domhtml._make_style(parent_properties, style_text)
+        styles.append(style)
+        _styles_unshared(child, properties, styles)
+
+def _styles_shared(view, node, styles):
+    for child in node.childNodes:
+        styles.append(view.getComputedStyle(child, None))
+        _styles_shared(view, child, styles)
+
+def bench_styles():
+    """ Compute the style of every node of a page, with a separate style for
+    each node and with styles shared between siblings and cousins """
+    document = domhtml.parseFast(_pages()[1])
+    before, after = [], []
+    unshared = timed(_styles_unshared, document,
+                     domhtml._default_properties, before)
+    shared = timed(_styles_shared, document.defaultView, document, after)
+    print 'styles: %d nodes, %d styles %.2fs, %d shared styles %.2fs' % (
+        len(before), len(before), unshared,
+        len(set(map(id, after))), shared)
+
+# Resolved styles
+# ---------------
+
+_BOX_FIELDS = ['display', 'whiteSpace'] + [
+    '%s%s%s' % (prefix, side, suffix)
+    for prefix, suffix in [('margin', ''), ('padding', ''),
+                           ('border', 'Width'), ('border', 'Style')]
+    for side in ('Top', 'Right', 'Bottom', 'Left')]
+
+def _read_styles(getStyle, nodes, times):
+    """ Read the fields a box reads from the style of each node """
+    for i in xrange(times):
+        for node in nodes:
+            style = getStyle(node)
+            for field in _BOX_FIELDS:
+                getattr(style, field)
+
+def bench_resolved(times=5):
+    """ Read box properties from computed CSSStyleDeclarations and from
+    resolved ComputedStyles """
+    document = domhtml.parseFast(_pages()[1])
+    view = document.defaultView
+    nodes = list(document.getElementsByTagName('*'))
+    before = timed(_read_styles, lambda node: view.getComputedStyle(node,
+                                                                    None),
+                   nodes, times)
+    after = timed(_read_styles, view.getLayoutStyle, nodes, times)
+    print 'resolved: %d reads, declarations %.2fs, resolved %.2fs' % (
+        len(nodes) * times * len(_BOX_FIELDS), before, after)
+
+# Setting values
+# --------------
+
+def _declarations(sheet):
+    """ The (name, value) of every declaration of the style rules of sheet """
+    return [(property.name, property.cssValue.cssText)
+            for rule in sheet.cssRules if rule.type == rule.STYLE_RULE
+            for property in rule.style.getProperties()]
+
+def _set_values(declarations, times, cache):
+    parsedValues = cssutils.css.cssvalue._parsedValues
+    for i in xrange(times):
+        style = cssutils.css.CSSStyleDeclaration()
+        for name, value in declarations:
+            if not cache:
+                parsedValues.clear()
+            style.setProperty(name, value)
+
+def bench_values(times=20):
+    """ Set the declarations of the Trac style sheet on new style
+    declarations, parsing every value and reusing cached parsed values """
+    declarations = _declarations(_trac_sheet())
+    before = timed(_set_values, declarations, times, False)
+    after = timed(_set_values, declarations, times, True)
+    print 'values: %d values set, parsed %.2fs, cached %.2fs' % (
+        len(declarations) * times, before, after)
+
+BENCHMARKS = {
+    'attributes': bench_attributes,
+    'build': bench_build,
+    'cascade': bench_cascade,
+    'ids': bench_ids,
+    'input': bench_input,
+    'live': bench_live,
+    'locations': bench_locations,
+    'normalize': bench_normalize,
+    'pages': bench_pages,
+    'references': bench_references,
+    'resolved': bench_resolved,
+    'siblings': bench_siblings,
+    'styles': bench_styles,
+    'tokenizer': bench_tokenizer,
+    'values': bench_values,
+    'xhtml': bench_xhtml,
+    }
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or sorted(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -1 +1 @@
-__all__ = ['layout', 'box']
+__all__ = ['layout', 'box', 'metrics']
@@ -1,6 +1,6 @@
 import re
 
-findwhitespace = re.compile('\s', re.MULTILINE)
+from metrics import getMetrics
 
 class Box:
     """ Base Box Class """
@@ -88,8 +88,8 @@ class BlockBox(Box):
         if parentBox:
             self.width = parentBox.widthAtY(y)
         if ownerNode:
-            style = ownerNode.ownerDocument.defaultView.getComputedStyle(ownerNode,
-                                                                         None)
+            style = ownerNode.ownerDocument.defaultView.getLayoutStyle(
+                ownerNode)
             self.margin = CSSBoxProps(style.marginTop, style.marginRight,
                                       style.marginBottom, style.marginLeft)
             self.border = CSSBorderProps(
@@ -132,8 +132,9 @@ class TextBox(InlineBox):
         self.ownerNode = elem
         self.parentBox = parentBox
         self._renderer = renderer
-        self.style = self.ownerNode.ownerDocument.defaultView.getComputedStyle(
-            self.ownerNode, None)
+        self._metrics = getMetrics(renderer)
+        self.style = self.ownerNode.ownerDocument.defaultView.getLayoutStyle(
+            self.ownerNode)
 
         # type tells us whether we need to draw the left and right borders,
         # paddings, and margins
@@ -154,8 +155,9 @@ class TextBox(InlineBox):
             self.pre = False
             self.text = re.sub('\s+', ' ', text)
         
-        (self.width, self.height) = renderer.text_size(self.text,
-                                                       self.ownerNode)
+        (self._breaks, self._widths, self.height) = self._metrics.measure(
+            self.text, self.ownerNode)
+        self.width = self._widths[-1]
         self._calc_size()
 
     def getLines(self):
@@ -193,44 +195,15 @@ class TextBox(InlineBox):
         if width > self._full_width:
             return [self]
 
-        text = self.text
-        whitespace = findwhitespace.search(text)
-        
-        if not whitespace:
+        # the longest text that fits, or the shortest if none does
+        split = self._metrics.breakAt(self._breaks, self._widths,
+                                      width - self._left_width)
+        if split is None:
             return [self]
 
-        # find all the positions which we can split at:
-        splits = []
-        while whitespace:
-            splits.append(whitespace.start())
-            whitespace = findwhitespace.search(text, whitespace.end())
-
-        split = None
-        for s in splits:
-            (w, h) =  self._renderer.text_size(text[:s], self.ownerNode)
-            split_width = w + self._left_width
-
-            # we want this to be as long as possible without being longer than
-            # width.
-            
-            # If a split is too wide 
-            if split_width > width:
-                # ...and we found a thinner one previously, use the previous one
-                if split:
-                    break
-                # ...and it's the first split we found, use it
-                split = s
-                break
-
-            # otherwise, store the split in case the next one is too wide
-            split = s
-            # In the unlikely case that the split is exactly width, use it
-            if split_width == width:
-                break
-
         # split on the space, throw the space away
-        lefttext = text[:split]
-        righttext = text[split+1:]
+        lefttext = self.text[:split]
+        righttext = self.text[split+1:]
 
         # Pick the type of the two sub-boxes based on the current type
         (lt, rt) = {
@@ -24,6 +24,25 @@ class PageLayout:
         self._current_box = self._initial_containing_block
         self._current_box.width = width
 
+        # Set once the layout has run out of elements, while waiting for the
+        # rest of the document to arrive. New subtrees are then queued up in
+        # the element queue by addSubtrees.
+        self._at_end = False
+        self._element_queue = []
+
+    def addSubtrees(self, nodes):
+        """ Tell the layout about newly parsed subtrees, given by their root
+        nodes in document order, as returned by
+        document.TidyDomDocument.write for incrementally loaded documents.
+
+        New content always follows what has already been parsed, so while
+        the layout is still inside the known part of the document it reaches
+        the new subtrees by itself. Only if it already ran out of elements
+        are they queued, so it can resume from the first one.
+        """
+        if self._at_end:
+            self._element_queue.extend(nodes)
+
     def nextBox(self):
         """ Returns the next block box. Either an actual block box or an
         implied LineBoxBox containg a collection of inline boxes
@@ -42,14 +61,16 @@ class PageLayout:
           
         """
         elem = self.nextElement()
+        if not elem:
+            return None
 
-        style = self._document.defaultView.getComputedStyle(elem, None)
+        style = self._document.defaultView.getLayoutStyle(elem)
 
         while style.display == 'none':
             elem = self.skipElement()
             if not elem:
                 return None
-            style = self._document.defaultView.getComputedStyle(elem, None)
+            style = self._document.defaultView.getLayoutStyle(elem)
 
         if style.display == 'inline':
             box = LineBoxBox(elem, self._current_box, 
@@ -89,7 +110,7 @@ class PageLayout:
         elem = self._current_node
 
         while elem:
-            style = self._document.defaultView.getComputedStyle(elem, None)
+            style = self._document.defaultView.getLayoutStyle(elem)
 
             if style.display == 'block':
                 self.prevElement()
@@ -144,6 +165,7 @@ class PageLayout:
           - If such a node is found:
             - next element is that nextSibling
           - else:
+            - note that the layout is at the end of the document so far
             - return None
         """
         old_node = self._current_node # backup in case there's no next
@@ -154,6 +176,8 @@ class PageLayout:
             
         if not self._current_node.nextSibling:
             self._current_node = old_node
+            if not pretend:
+                self._at_end = True
             return None
         self._current_node = self._current_node.nextSibling
         
@@ -171,6 +195,8 @@ class PageLayout:
         
         - If there are elements in the element queue
           - Pop and return the first element from the element queue
+        - else if the layout is at the end of the document so far
+          - return None
         - else
           - Read the next element:
             - If the current element has children:
@@ -184,6 +210,17 @@ class PageLayout:
               - else:
                 - return None
         """
+        if self._element_queue:
+            self._current_node = self._element_queue[0]
+            # The queued subtrees after the first one are reached by walking
+            del self._element_queue[:]
+            self._at_end = False
+            return self._current_node
+
+        # The current node may be one that was skipped, don't go into it
+        if self._at_end:
+            return None
+
         if self._current_node.childNodes:
             self._current_node = self._current_node.firstChild
         else:
@@ -0,0 +1,81 @@
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+
+# words and the single whitespace characters text can be broken at
+findtokens = re.compile('\S+|\s', re.MULTILINE)
+
+class TextMetrics:
+    """ A caching text measurement layer between a renderer and the layout.
+
+    Text is measured a word at a time. The size of each word is cached per
+    font, as given by the renderer's font_key(elem), and the least recently
+    used words are dropped once the cache holds more than size of them. The
+    width of a piece of text is the sum of the widths of its words and
+    whitespace, which ignores kerning across word boundaries.
+    """
+    def __init__(self, renderer, size=4096):
+        self._renderer = renderer
+        self._size = size
+        self._words = OrderedDict()
+
+    def wordSize(self, word, elem, font=None):
+        """ Return the (width, height) of word rendered in the font of elem
+        (or the given font key).
+        """
+        if font is None:
+            font = self._renderer.font_key(elem)
+        key = (font, word)
+        words = self._words
+        try:
+            size = words.pop(key)
+        except KeyError:
+            size = self._renderer.text_size(word, elem)
+            if len(words) >= self._size:
+                words.popitem(last=False)
+        words[key] = size
+        return size
+
+    def measure(self, text, elem):
+        """ Measure text, returning a tuple (breaks, widths, height).
+
+        breaks are the positions of the whitespace characters text can be
+        broken at, widths[i] the width of text[:breaks[i]] and widths[-1]
+        (one more than there are breaks) the width of all of text.
+        """
+        font = self._renderer.font_key(elem)
+        breaks = []
+        widths = []
+        width = height = 0
+        for token in findtokens.finditer(text):
+            (w, h) = self.wordSize(token.group(), elem, font)
+            if token.group().isspace():
+                breaks.append(token.start())
+                widths.append(width)
+            width += w
+            height = max(height, h)
+        if not text:
+            (width, height) = self.wordSize(text, elem, font)
+        widths.append(width)
+        return (breaks, widths, height)
+
+    def breakAt(self, breaks, widths, width):
+        """ Return the break position for a line at most width wide, given
+        the breaks and widths returned by measure. This is the last break
+        whose text fits, or the first break if none of them do, or None if
+        there are no breaks.
+        """
+        if not breaks:
+            return None
+        i = bisect_right(widths, width, 0, len(breaks))
+        return breaks[max(i, 1) - 1]
+
+def getMetrics(renderer):
+    """ Return the TextMetrics of renderer, creating it on first use.
+    Renderers can plug in their own by setting a text_metrics attribute.
+    """
+    try:
+        return renderer.text_metrics
+    except AttributeError:
+        metrics = renderer.text_metrics = TextMetrics(renderer)
+        return metrics
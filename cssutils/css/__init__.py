@@ -16,6 +16,7 @@ currently implemented
     - CSSStyleRule
     - CSSUnkownRule
     - CSSStyleDeclaration
+    - RuleIndex (cssutils addon)
     - CSS2Properties
     - CSSValue
     - CSSPrimitiveValue
@@ -39,6 +40,7 @@ __all__ = [
     'CSSUnknownRule',
     'CSSStyleDeclaration', 'Property',
     'CSSValue', 'CSSPrimitiveValue', 'CSSValueList',
+    'RuleIndex',
     ]
 __docformat__ = 'restructuredtext'
 __author__ = '$LastChangedBy: cthedot $'
@@ -61,6 +63,7 @@ from cssstyledeclaration import *
 from cssvalue import *
 from selectorlist import *
 from selector import *
+from ruleindex import *
 
 
 if __name__ == '__main__':
@@ -93,7 +93,10 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
         The CSS rule that contains this declaration block or None if this
         CSSStyleDeclaration is not attached to a CSSRule.
     seq: a list (cssutils)
-        All parts of this style declaration including CSSComments
+        All parts of this style declaration including CSSComments.
+        Assigning a list stores a copy of it. Changes to seq in place and
+        renaming one of its properties reindex the effective properties
+        on the next lookup.
     valid
         if this declaration is valid, currently to CSS 2.1 (?)
     wellformed
@@ -144,7 +147,8 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
         """
         known = ['_tokenizer', '_log', '_ttypes',
                  'valid', 'wellformed', 
-                 'seq', 'parentRule', '_parentRule', 'cssText',
+                 'seq', '_seq', '_nnames', '_nnamesversion',
+                 'parentRule', '_parentRule', 'cssText',
                  '_readonly']
         known.extend(CSS2Properties._properties)
         if n in known:
@@ -154,6 +158,38 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
                 'Unknown CSS Property, ``CSSStyleDeclaration.setProperty("%s")`` MUST be used.'
                 % n)
 
+    def _getSeq(self):
+        return self._seq
+
+    def _setSeq(self, seq):
+        self._seq = _Seq(seq)
+        self.__index()
+
+    seq = property(_getSeq, _setSeq,
+        doc="All parts of this style declaration including CSSComments")
+
+    def __index(self):
+        """
+        rebuilds the index of normalname to effective (last set) Property
+        """
+        nnames = {}
+        seq = self._seq
+        for x in seq:
+            if isinstance(x, Property):
+                nnames[x.normalname] = x
+                x._indexedIn(seq)
+        self._nnames = nnames
+        self._nnamesversion = seq.version
+
+    def __effective(self):
+        """
+        returns the index of normalname to effective Property, reindexing
+        if ``seq`` or the name of one of its properties has been changed
+        """
+        if self._nnamesversion != self._seq.version:
+            self.__index()
+        return self._nnames
+
     def __iter__(self):
         "CSSStyleDeclaration is iterable, see __items()"
         return CSSStyleDeclaration.__items(self)
@@ -185,7 +221,11 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
             italic
 
         """
-        return self.getPropertyValue(CSSName)
+        # CSSName is normalized already
+        property = self.__effective().get(CSSName)
+        if property is None:
+            return u''
+        return property.value
 
     def _setP(self, CSSName, value):
         """
@@ -352,6 +392,16 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
             different values or priorities for different UAs are returned.
         """
         nname = self._normalize(name)
+        if not all:
+            # effective properties only, use the index
+            nnames = self.__effective()
+            if nname:
+                if nname in nnames:
+                    return [nnames[nname]]
+                return []
+            return [x for x in self.seq if isinstance(x, Property) and
+                                           nnames.get(x.normalname) is x]
+
         properties = []
         done = set()
         for x in reversed(self.seq):
@@ -392,14 +442,17 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
         nname = self._normalize(name)
         if nname in self._SHORTHANDPROPERTIES:
             self._log.debug(
-                u'CSSValue for shorthand property "%s" should be None, this may be implemented later.' %
-                nname, neverraise=True)
-
-        properties = self.getProperties(name, all=(not normalize))
+                u'CSSValue for shorthand property "%s" should be None, this may be implemented later.',
+                args=(nname,), neverraise=True)
+
+        if normalize:
+            property = self.__effective().get(nname)
+            if property is None:
+                return None
+            return property.cssValue
+        properties = self.getProperties(name, all=True)
         for property in reversed(properties):
-            if normalize and property.normalname == nname:
-                return property.cssValue
-            elif property.name == name:
+            if property.name == name:
                 return property.cssValue
         return None
 
@@ -420,11 +473,14 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
         property has not been set.
         """
         nname = self._normalize(name)
-        properties = self.getProperties(name, all=(not normalize))
+        if normalize:
+            property = self.__effective().get(nname)
+            if property is None:
+                return u''
+            return property.value
+        properties = self.getProperties(name, all=True)
         for property in reversed(properties):
-            if normalize and property.normalname == nname:
-                return property.value
-            elif property.name == name:
+            if property.name == name:
                 return property.value
         return u''
 
@@ -445,11 +501,14 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
         one exists. The empty string if none exists.
         """
         nname = self._normalize(name)
-        properties = self.getProperties(name, all=(not normalize))
+        if normalize:
+            property = self.__effective().get(nname)
+            if property is None:
+                return u''
+            return property.priority
+        properties = self.getProperties(name, all=True)
         for property in reversed(properties):
-            if normalize and property.normalname == nname:
-                return property.priority
-            elif property.name == name:
+            if property.name == name:
                 return property.priority
         return u''
 
@@ -533,25 +592,22 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
                     % (name, value, priority))
         else:
             nname = self._normalize(name)
-            properties = self.getProperties(name, all=(not normalize))
+            if normalize:
+                properties = [self.__effective().get(nname)]
+            else:
+                properties = self.getProperties(name, all=True)
             for property in reversed(properties):
-                if normalize and property.normalname == nname:
-                    property.cssValue = newp.cssValue.cssText
-                    property.priority = newp.priority
-                    break
-                elif property.name == name:
+                if property is None:
+                    continue
+                if normalize or property.name == name:
                     property.cssValue = newp.cssValue.cssText
                     property.priority = newp.priority
                     break
             else:
+                self.__effective()[newp.normalname] = newp
                 self.seq.append(newp)
-
-    def __nnames(self):
-        nnames = set()
-        for x in self.seq:
-            if isinstance(x, Property):
-                nnames.add(x.normalname)
-        return nnames
+                newp._indexedIn(self.seq)
+                self._nnamesversion = self.seq.version
 
     def item(self, index):
         """
@@ -580,21 +636,14 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
 
         ``item()`` and ``length`` work on the same set here.
         """
-        nnames = self.__nnames()
-        orderednnames = []
-        for x in reversed(self.seq):
-            nname = x.normalname
-            if isinstance(x, Property) and nname in nnames:
-                nnames.remove(nname)
-                orderednnames.append(nname)
-        orderednnames.reverse()
+        orderednnames = [x.normalname for x in self.getProperties()]
         try:
             return orderednnames[index]
         except IndexError:
             return u''
 
     def _getLength(self):
-        return len(self.__nnames())
+        return len(self.__effective())
 
     length = property(_getLength,
         doc="(DOM) The number of distince properties that have been explicitly\
@@ -610,3 +659,25 @@ class CSSStyleDeclaration(CSS2Properties, cssutils.util.Base):
         return "<cssutils.css.%s object length=%r (all: %r) at 0x%x>" % (
                 self.__class__.__name__, self.length,
                 len(self.getProperties(all=True)), id(self))
+
+
+class _Seq(list):
+    """
+    the seq of a CSSStyleDeclaration, ``version`` counts the changes to the
+    list and to the names of the properties it has been indexed with
+    """
+    version = 0
+
+def _changing(name):
+    "returns list method ``name`` counting the change in version"
+    method = getattr(list, name)
+    def change(self, *args):
+        self.version += 1
+        return method(self, *args)
+    change.__name__ = name
+    return change
+
+for _name in ('__setitem__', '__delitem__', '__setslice__', '__delslice__',
+              '__iadd__', '__imul__', 'append', 'extend', 'insert', 'pop',
+              'remove', 'reverse', 'sort'):
+    setattr(_Seq, _name, _changing(_name))
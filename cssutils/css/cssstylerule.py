@@ -164,6 +164,7 @@ class CSSStyleRule(cssrule.CSSRule):
         """
         self._checkReadonly()
         self._selectorList = selectorList
+        self._selectorsChanged()
 
     def _getSelectorList(self):
         """
@@ -176,6 +177,14 @@ class CSSStyleRule(cssrule.CSSRule):
     selectorList = property(_getSelectorList, _setSelectorList,
         doc="The SelectorList of this rule.")
 
+    def _selectorsChanged(self):
+        """
+        updates the RuleIndex of the parentStyleSheet (if it has one)
+        """
+        sheet = self.parentStyleSheet
+        if sheet is not None and sheet._ruleIndex is not None:
+            sheet._ruleIndex.ruleChanged(self)
+
     def _getSelectorText(self):
         """
         wrapper for cssutils SelectorList object
@@ -200,6 +209,7 @@ class CSSStyleRule(cssrule.CSSRule):
         """
         self._checkReadonly()
         self._selectorList = SelectorList(selectorText)
+        self._selectorsChanged()
 
     selectorText = property(_getSelectorText, _setSelectorText,
         doc="""(DOM) The textual representation of the selector for the
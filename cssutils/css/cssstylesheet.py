@@ -43,6 +43,10 @@ class CSSStyleSheet(cssutils.stylesheets.StyleSheet):
         A set of declared prefixes via @namespace rules. Each
         CSSStyleRule is checked if it uses additional prefixes which are
         not declared. If they do they are "invalidated".
+    ruleIndex: RuleIndex
+        an index of the style rules of this sheet by the id, class or
+        element name their selectors end with, see RuleIndex. It is
+        created on first use and kept up to date from then on.
 
     Format
     ======
@@ -68,6 +72,7 @@ class CSSStyleSheet(cssutils.stylesheets.StyleSheet):
         self.cssRules.extend = self.insertRule
         
         self.prefixes = set()
+        self._ruleIndex = None
         self._readonly = readonly
 
     def _getCssText(self):
@@ -203,6 +208,7 @@ class CSSStyleSheet(cssutils.stylesheets.StyleSheet):
              }, 
              default=ruleset)
 
+        self._ruleIndex = None
         del self.cssRules[:]
         for r in newseq:
             self.cssRules.append(r)
@@ -262,12 +268,17 @@ class CSSStyleSheet(cssutils.stylesheets.StyleSheet):
         self._checkReadonly()
 
         try:
-            self.cssRules[index].parentStyleSheet = None # detach
+            rule = self.cssRules[index]
+            rule.parentStyleSheet = None # detach
             del self.cssRules[index] # delete from StyleSheet
         except IndexError:
             raise xml.dom.IndexSizeErr(
                 u'CSSStyleSheet: %s is not a valid index in the rulelist of length %i' % (
                 index, self.cssRules.length))
+        if self._ruleIndex is not None:
+            if index < 0:
+                index += len(self.cssRules) + 1
+            self._ruleIndex.ruleDeleted(rule, index)
 
     def insertRule(self, rule, index=None):
         """
@@ -420,8 +431,18 @@ class CSSStyleSheet(cssutils.stylesheets.StyleSheet):
             self.cssRules.insert(index, rule)
             rule.parentStyleSheet = self
 
+        if self._ruleIndex is not None:
+            self._ruleIndex.ruleInserted(rule, index)
         return index
 
+    def _getRuleIndex(self):
+        if self._ruleIndex is None:
+            self._ruleIndex = cssutils.css.RuleIndex(self)
+        return self._ruleIndex
+
+    ruleIndex = property(_getRuleIndex,
+        doc="(cssutils) RuleIndex of the style rules of this sheet")
+
     def _getsetOwnerRuleDummy(self):
         """
         NOT IMPLEMENTED YET
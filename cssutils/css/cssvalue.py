@@ -13,6 +13,7 @@ __version__ = '$LastChangedRevision: 678 $'
 
 import re
 import xml.dom
+from collections import OrderedDict
 import cssutils
 import cssproperties
 
@@ -37,6 +38,9 @@ class CSSValue(cssutils.util.Base):
 
     _value (INTERNAL!)
         value without any comments, used to validate
+
+    Values are parsed and validated once per property name and cssText,
+    setting the same cssText again reuses the cached result.
     """
 
     CSS_INHERIT = 0
@@ -80,6 +84,8 @@ class CSSValue(cssutils.util.Base):
         self.wellformed = False
         self._valueValue = u''
         self._linetoken = None # used for line report only
+        self._parsed = None # cached by _setCssText
+        self.__propertyName = None
         self._propertyName = _propertyName
 
         if cssText is not None: # may be 0
@@ -159,6 +165,19 @@ class CSSValue(cssutils.util.Base):
         """
         self._checkReadonly()
 
+        if isinstance(cssText, basestring):
+            key = (self._propertyName, cssText)
+            parsed = _getParsed(key)
+            if parsed is not None:
+                self._setParsed(parsed)
+                if not parsed[_VALID]:
+                    # log the warning again
+                    self._validate()
+                self.wellformed = True
+                return
+        else:
+            key = None
+
         # for closures: must be a mutable
         new = {'values': [], 
                'commas': 0, 
@@ -332,37 +351,63 @@ class CSSValue(cssutils.util.Base):
                 self._valuestr(cssText))
 
             else:
-                self._linetoken = linetoken # used for line report
                 self.seq = newseq
                 self.valid = False
 
                 self._validate()
 
                 if len(new['values']) == 1 and new['values'][0] == u'inherit':
-                    self._value = u'inherit'
-                    self._cssValueType = CSSValue.CSS_INHERIT
-                    self.__class__ = CSSValue # reset
+                    valueType = CSSValue.CSS_INHERIT
                 elif len(new['values']) == 1:
-                    self.__class__ = CSSPrimitiveValue
-                    self._init() #inits CSSPrimitiveValue
+                    valueType = CSSValue.CSS_PRIMITIVE_VALUE
                 elif len(new['values']) > 1 and\
                      len(new['values']) == new['commas'] + 1:
                     # e.g. value for font-family: a, b
-                    self.__class__ = CSSPrimitiveValue
-                    self._init() #inits CSSPrimitiveValue
+                    valueType = CSSValue.CSS_PRIMITIVE_VALUE
                 elif len(new['values']) > 1:
                     # separated by S
-                    self.__class__ = CSSValueList
-                    self._init() # inits CSSValueList
+                    valueType = CSSValue.CSS_VALUE_LIST
                 else:
-                    self._cssValueType = CSSValue.CSS_CUSTOM
-                    self.__class__ = CSSValue # reset
-                    
+                    valueType = CSSValue.CSS_CUSTOM
+
+                parsed = [tuple(newseq), linetoken, valueType, self.valid,
+                          None]
+                self._setParsed(parsed)
+                if wellformed and key is not None:
+                    _setParsedCache(key, parsed)
+
             self.wellformed = wellformed
 
     cssText = property(_getCssText, _setCssText,
         doc="A string representation of the current value.")
 
+    def _setParsed(self, parsed):
+        """
+        sets seq, validity and type of this value from ``parsed``, a list
+        of [seq, linetoken, cssValueType, valid, primitiveType]
+        """
+        seq, self._linetoken, valueType, self.valid, primitiveType = parsed
+        self.seq = list(seq)
+        # comments are mutable, each value gets its own
+        for i, x in enumerate(self.seq):
+            if isinstance(x, cssutils.css.CSSComment):
+                self.seq[i] = cssutils.css.CSSComment(x.cssText)
+        self._parsed = parsed
+        self._primitiveType = primitiveType
+        if CSSValue.CSS_INHERIT == valueType:
+            self._value = u'inherit'
+            self._cssValueType = valueType
+            self.__class__ = CSSValue # reset
+        elif CSSValue.CSS_PRIMITIVE_VALUE == valueType:
+            self.__class__ = CSSPrimitiveValue
+            self._init() #inits CSSPrimitiveValue
+        elif CSSValue.CSS_VALUE_LIST == valueType:
+            self.__class__ = CSSValueList
+            self._init() # inits CSSValueList
+        else:
+            self._cssValueType = valueType
+            self.__class__ = CSSValue # reset
+
     def _getCssValueType(self):
         if hasattr(self, '_cssValueType'):
             return self._cssValueType
@@ -391,19 +436,21 @@ class CSSValue(cssutils.util.Base):
                 else:
                     self.valid = False
                     self._log.warn(
-                        u'CSSValue: Invalid value for CSS2 property %r: %r' %
-                        (self._propertyName, self._value), neverraise=True)
+                        u'CSSValue: Invalid value for CSS2 property %r: %r',
+                        args=(self._propertyName, self._value),
+                        neverraise=True)
             else:
                 self._log.debug(
-                    u'CSSValue: Unable to validate as no or unknown property context set for this value: %r'
-                    % self._value, neverraise=True)
+                    u'CSSValue: Unable to validate as no or unknown property context set for this value: %r',
+                    args=(self._value,), neverraise=True)
 
     def _get_propertyName(self):
         return self.__propertyName
 
     def _set_propertyName(self, _propertyName):
-        self.__propertyName = _propertyName
-        self._validate()
+        if _propertyName != self.__propertyName:
+            self.__propertyName = _propertyName
+            self._validate()
     
     _propertyName = property(_get_propertyName, _set_propertyName,
         doc="cssutils: Property this values is validated against") 
@@ -640,9 +687,11 @@ class CSSPrimitiveValue(CSSValue):
             primitiveType = self.CSS_UNKNOWN
 
         self._primitiveType = primitiveType
+        if self._parsed is not None:
+            self._parsed[_PRIMITIVETYPE] = primitiveType
 
     def _getPrimitiveType(self):
-        if not hasattr(self, '_primitivetype'):
+        if getattr(self, '_primitiveType', None) is None:
             self.__set_primitiveType()
         return self._primitiveType
 
@@ -1055,3 +1104,26 @@ class CSSValueList(CSSValue):
     def __str_(self):
         return "<cssutils.css.%s object length=%s at 0x%x>" % (
                 self.__class__.__name__, self.length, id(self))
+
+
+# parsed values by (property name, cssText), see CSSValue._setCssText
+_PARSED_VALUES = 1024
+_parsedValues = OrderedDict()
+
+# indexes of a parsed value
+_SEQ, _LINETOKEN, _VALUETYPE, _VALID, _PRIMITIVETYPE = range(5)
+
+def _getParsed(key):
+    "returns the parsed value cached for key or None"
+    try:
+        parsed = _parsedValues.pop(key)
+    except KeyError:
+        return None
+    _parsedValues[key] = parsed
+    return parsed
+
+def _setParsedCache(key, parsed):
+    "caches parsed value for key, dropping the least recently used one"
+    if len(_parsedValues) >= _PARSED_VALUES:
+        _parsedValues.popitem(last=False)
+    _parsedValues[key] = parsed
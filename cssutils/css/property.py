@@ -8,6 +8,7 @@ __author__ = '$LastChangedBy: cthedot $'
 __date__ = '$LastChangedDate: 2007-12-28 13:07:34 +0100 (Fr, 28 Dez 2007) $'
 __version__ = '$LastChangedRevision: 753 $'
 
+import weakref
 import xml.dom
 import cssutils
 import cssproperties
@@ -89,6 +90,7 @@ class Property(cssutils.util.Base):
         super(Property, self).__init__()
 
         self.seqs = [[], None, []]
+        self._seqs = None # id: declaration seq this property is indexed in
         self.valid = False
         self.wellformed = False
         self._mediaQuery = _mediaQuery
@@ -221,13 +223,16 @@ class Property(cssutils.util.Base):
             self._name = new['name']
             self.normalname = self._normalize(self._name)
             self.seqs[0] = newseq
+            if self._seqs:
+                for seq in self._seqs.values():
+                    seq.version += 1
 
             # validate
             if self.normalname not in cssproperties.cssvalues:
                 self.valid = False
                 tokenizer=self._tokenize2(name)
-                self._log.info(u'Property: No CSS2 Property: %r.' %
-                         new['name'], token=token, neverraise=True)
+                self._log.info(u'Property: No CSS2 Property: %r.',
+                         args=(new['name'],), token=token, neverraise=True)
             else:
                 self.valid = True
                 if self.cssValue:
@@ -241,6 +246,16 @@ class Property(cssutils.util.Base):
     name = property(_getName, _setName,
         doc="(cssutils) Name of this property")
 
+    def _indexedIn(self, seq):
+        """
+        remembers that ``seq`` of a CSSStyleDeclaration indexes this
+        property by name, so setting the name counts as a change of seq,
+        seqs are only referenced weakly
+        """
+        if self._seqs is None:
+            self._seqs = weakref.WeakValueDictionary()
+        self._seqs[id(seq)] = seq
+
     def _getCSSValue(self):
         return self.seqs[1]
 
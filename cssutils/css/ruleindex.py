@@ -0,0 +1,167 @@
+"""RuleIndex finds the CSSStyleRules of a CSSStyleSheet an element may match.
+
+The cascade only needs to test an element against the rules it may match.
+Selectors are put in buckets by the id, class or element name of their
+rightmost simple selector sequence (or in the universal bucket if it has
+none), the matching rules are returned in cascading order, see
+    http://www.w3.org/TR/CSS21/cascade.html#cascading-order
+"""
+__all__ = ['RuleIndex']
+__docformat__ = 'restructuredtext'
+__author__ = '$LastChangedBy$'
+__date__ = '$LastChangedDate$'
+__version__ = '$LastChangedRevision$'
+
+class RuleIndex(object):
+    """
+    (cssutils) an index of the CSSStyleRules of a CSSStyleSheet
+
+    Only the style rules directly in the sheet are indexed, rules in
+    @media rules and imported style sheets are not. The index is kept up
+    to date by CSSStyleSheet.insertRule and deleteRule and when the
+    selectorText of an indexed rule is set.
+
+    Properties
+    ==========
+    namespaces
+        a dict of the namespace prefixes declared by the @namespace rules
+        of the sheet to their namespace URIs
+    """
+    def __init__(self, sheet):
+        """
+        sheet
+            the CSSStyleSheet to index, all its style rules are indexed
+            straight away
+        """
+        self._sheet = sheet
+        self._ids = {}
+        self._classes = {}
+        self._types = {}
+        self._universal = []
+        # rule: list of (bucket, entry) the rule has been put in
+        self._entries = {}
+        # rule: position in cssRules, None if it has to be counted again
+        self._positions = None
+        self.namespaces = {}
+        for rule in sheet.cssRules:
+            self._add(rule)
+
+    def _bucket(self, key):
+        "returns the bucket for the key of a selector"
+        if key is None:
+            return self._universal
+        buckets = {'id': self._ids,
+                   'class': self._classes,
+                   'type': self._types}[key[0]]
+        return buckets.setdefault(key[1], [])
+
+    def _add(self, rule):
+        if rule.type == rule.NAMESPACE_RULE:
+            # a new dict so selectors are compiled again
+            self.namespaces = dict(self.namespaces)
+            self.namespaces[rule.prefix] = rule.namespaceURI
+        elif rule.type == rule.STYLE_RULE and rule not in self._entries:
+            entries = self._entries[rule] = []
+            for selector in rule.selectorList:
+                if selector.wellformed:
+                    bucket = self._bucket(selector._getParsed()[3])
+                    entry = (selector, rule)
+                    bucket.append(entry)
+                    entries.append((bucket, entry))
+
+    def _remove(self, rule):
+        if rule.type == rule.NAMESPACE_RULE:
+            self.namespaces = dict([(r.prefix, r.namespaceURI)
+                                    for r in self._sheet.cssRules
+                                    if r.type == r.NAMESPACE_RULE])
+        elif rule in self._entries and rule not in self._sheet.cssRules:
+            # (a rule may have been inserted more than once)
+            self._unbucket(rule)
+
+    def _unbucket(self, rule):
+        for bucket, entry in self._entries.pop(rule):
+            bucket.remove(entry)
+
+    def ruleInserted(self, rule, index):
+        """
+        indexes ``rule`` which has been inserted into the sheet at
+        ``index``
+        """
+        if self._positions is not None:
+            if index == len(self._sheet.cssRules) - 1:
+                self._positions[rule] = index
+            else:
+                self._positions = None
+        self._add(rule)
+
+    def ruleDeleted(self, rule, index):
+        """
+        removes ``rule`` which has been deleted from the sheet at ``index``
+        from the index
+        """
+        self._positions = None
+        self._remove(rule)
+
+    def ruleChanged(self, rule):
+        """
+        indexes ``rule`` again after its selectors have changed
+        """
+        if rule in self._entries:
+            self._unbucket(rule)
+            self._add(rule)
+
+    def candidates(self, element):
+        """
+        returns the list of (selector, rule) pairs of all selectors which
+        may match DOM element ``element``, in no particular order
+        """
+        candidates = list(self._universal)
+        elementId = element.getAttribute('id')
+        if elementId and elementId in self._ids:
+            candidates.extend(self._ids[elementId])
+        classes = element.getAttribute('class')
+        if classes:
+            for name in set(classes.split()):
+                if name in self._classes:
+                    candidates.extend(self._classes[name])
+        name = element.localName or element.nodeName
+        if name in self._types:
+            candidates.extend(self._types[name])
+        return candidates
+
+    def _matching(self, element):
+        """
+        returns a list of (specificity, position, selector, rule) of the
+        rules matching ``element``, selector being the one of the rule with
+        the highest specificity which matches
+        """
+        positions = self._positions
+        if positions is None:
+            positions = self._positions = dict(
+                [(rule, i) for i, rule in enumerate(self._sheet.cssRules)])
+        namespaces = self.namespaces
+        matching = {}
+        for selector, rule in self.candidates(element):
+            if selector.match(element, namespaces):
+                specificity = selector.specificity
+                if rule not in matching or matching[rule][0] < specificity:
+                    matching[rule] = (specificity, positions[rule],
+                                      selector, rule)
+        return matching.values()
+
+    def matchingRules(self, element):
+        """
+        returns a list of (selector, rule) pairs of all style rules matching
+        DOM element ``element`` in cascading order, i.e. by specificity and
+        then position in the sheet. The declarations of later rules override
+        those of earlier ones (!important aside). selector is the selector
+        of rule with the highest specificity which matches.
+        """
+        matching = self._matching(element)
+        matching.sort()
+        return [(selector, rule) for specificity, position, selector, rule
+                in matching]
+
+    def __repr__(self):
+        return "cssutils.css.%s(sheet=%r)" % (
+                self.__class__.__name__, self._sheet)
@@ -25,6 +25,7 @@ __author__ = '$LastChangedBy: cthedot $'
 __date__ = '$LastChangedDate: 2007-12-25 21:53:11 +0100 (Di, 25 Dez 2007) $'
 __version__ = '$LastChangedRevision: 723 $'
 
+import re
 import xml.dom
 
 import cssutils
@@ -41,6 +42,10 @@ class Selector(cssutils.util.Base):
         a set which prefixes have been used in this selector
     seq
         sequence of Selector parts including comments
+    specificity
+        a tuple (a, b, c) of the number of ids, the number of classes,
+        attributes and pseudo-classes and the number of element names
+        and pseudo-elements in this selector
         
     wellformed
         if this selector is wellformed regarding the Selector spec
@@ -140,6 +145,8 @@ class Selector(cssutils.util.Base):
         self.wellformed = False
         self.seq = self._newseq()
         self.prefixes = set()
+        self._parsed = None
+        self._matcher = None
         if selectorText:
             self.selectorText = selectorText
         self._readonly = readonly
@@ -639,6 +646,56 @@ class Selector(cssutils.util.Base):
     selectorText = property(_getSelectorText, _setSelectorText,
         doc="(DOM) The parsable textual representation of the selector.")
 
+    def _getParsed(self):
+        """
+        returns (compounds, specificity, key) of seq (see ``_parse``),
+        parsing it again only if seq has been replaced
+        """
+        parsed = self._parsed
+        if parsed is None or parsed[0] is not self.seq:
+            if self.wellformed:
+                compounds = _parse([(val, typ) for val, typ in self.seq._items
+                                    if isinstance(val, basestring)])
+            else:
+                compounds = []
+            parsed = self._parsed = (self.seq, compounds,
+                                     _specificity(compounds), _key(compounds))
+        return parsed
+
+    def _getSpecificity(self):
+        return self._getParsed()[2]
+
+    specificity = property(_getSpecificity,
+        doc="""(cssutils) The specificity (a, b, c) of this selector, see
+        http://www.w3.org/TR/css3-selectors/#specificity""")
+
+    def match(self, element, namespaces=None):
+        """
+        (cssutils)
+        returns if the DOM element ``element`` matches this selector
+
+        namespaces
+            an optional dict of namespace prefixes to namespace URIs
+            (e.g. from the @namespace rules of a style sheet), ``u''``
+            being the default namespace. Element and attribute names
+            with an undeclared prefix never match.
+
+        The selector is compiled once into a chain of tests which are
+        run from right to left, it is compiled again only if seq or
+        namespaces are replaced. Dynamic pseudo-classes like ``:hover``
+        never match, neither do selectors with a pseudo-element.
+        """
+        matcher = self._matcher
+        parsed = self._getParsed()
+        if matcher is None or matcher[0] is not parsed or \
+           matcher[1] is not namespaces:
+            if parsed[1]:
+                match = _compile(parsed[1], namespaces or {})
+            else:
+                match = _never
+            matcher = self._matcher = (parsed, namespaces, match)
+        return matcher[2](element)
+
     def __repr__(self):
         return "cssutils.css.%s(selectorText=%r)" % (
                 self.__class__.__name__, self.selectorText)
@@ -646,3 +703,459 @@ class Selector(cssutils.util.Base):
     def __str__(self):
         return "<cssutils.css.%s object selectorText=%r at 0x%x>" % (
                 self.__class__.__name__, self.selectorText, id(self))
+
+
+# Matching
+# --------
+# A selector is parsed into a list of compounds (simple selector sequences)
+# with the combinator before each, and compiled from left to right into a
+# single function which tests an element against the rightmost compound
+# first and only then walks to the elements the combinator relates it to.
+
+_ELEMENT_NODE = xml.dom.Node.ELEMENT_NODE
+_DOCUMENT_NODE = xml.dom.Node.DOCUMENT_NODE
+
+def _never(element):
+    return False
+
+def _parse(items):
+    """
+    returns the compounds of a list of (value, type) items of a selector seq
+    (without comments)
+
+    Compounds are a list of (combinator, simple selectors) from left to
+    right, combinator is the one before the compound or None for the first.
+    Simple selectors are tuples of:
+
+    ('type', prefix, name)
+        prefix is None if none is given, name is None for ``*``
+    ('id', value), ('class', value)
+    ('attrib', prefix, name, operator, value)
+        operator and value are None if only presence is tested
+    ('pseudo-class', name, argument)
+        argument is None if name is not a function
+    ('not', simple selectors)
+    ('pseudo-element', name)
+    """
+    simples = []
+    compounds = [(None, simples)]
+    prefix = None
+    i, length = 0, len(items)
+    while i < length:
+        val, typ = items[i]
+        i += 1
+        if typ == 'combinator':
+            # whitespace around comments or other combinators
+            combinator = val
+            while i < length and items[i][1] == 'combinator':
+                if items[i][0] != u' ':
+                    combinator = items[i][0]
+                i += 1
+            simples = []
+            compounds.append((combinator, simples))
+
+        elif typ == 'namespace_prefix':
+            prefix = val[:-1]
+
+        elif typ == 'universal':
+            if u'|' in val:
+                simples.append(('type', val.split(u'|')[0], None))
+            else:
+                simples.append(('type', prefix, None))
+            prefix = None
+
+        elif typ == 'IDENT':
+            simples.append(('type', prefix, val))
+            prefix = None
+
+        elif typ == 'class':
+            simples.append(('class', val[1:]))
+
+        elif typ == 'HASH':
+            simples.append(('id', val[1:]))
+
+        elif val == u'[':
+            start = i
+            while items[i][0] != u']':
+                i += 1
+            attrib = items[start:i]
+            i += 1
+            attprefix = None
+            if attrib[0][1] == 'namespace_prefix':
+                attprefix = attrib.pop(0)[0][:-1]
+            operator = value = None
+            if len(attrib) > 1:
+                operator = attrib[1][0]
+                value, valtyp = attrib[2]
+                if valtyp == 'STRING':
+                    value = value[1:-1]
+            simples.append(('attrib', attprefix, attrib[0][0],
+                            operator, value))
+
+        elif typ in ('pseudo-class', 'pseudo-element', 'negation'):
+            name = val.lstrip(u':').lower()
+            argument = None
+            if name.endswith(u'('):
+                name = name[:-1]
+                start, depth = i, 1
+                while True:
+                    argval, argtyp = items[i]
+                    i += 1
+                    if argtyp in ('pseudo-class', 'pseudo-element',
+                                  'negation') and argval.endswith(u'('):
+                        depth += 1
+                    elif argval == u')' and argtyp is None:
+                        depth -= 1
+                        if not depth:
+                            break
+                argument = items[start:i-1]
+            if name == u'not':
+                simples.append(('not', _parse(argument)[0][1]))
+            elif typ == 'pseudo-element':
+                simples.append(('pseudo-element', name))
+            else:
+                if argument is not None:
+                    argument = u''.join([argval for argval, argtyp in argument
+                                         if argtyp != 'combinator'])
+                simples.append(('pseudo-class', name, argument))
+
+    return compounds
+
+def _count(simples):
+    "returns the specificity (a, b, c) of a list of simple selectors"
+    a = b = c = 0
+    for simple in simples:
+        kind = simple[0]
+        if kind == 'id':
+            a += 1
+        elif kind in ('class', 'attrib', 'pseudo-class'):
+            b += 1
+        elif kind == 'pseudo-element' or kind == 'type' and simple[2]:
+            c += 1
+        elif kind == 'not':
+            na, nb, nc = _count(simple[1])
+            a, b, c = a + na, b + nb, c + nc
+    return a, b, c
+
+def _specificity(compounds):
+    "returns the specificity (a, b, c) of compounds"
+    a = b = c = 0
+    for combinator, simples in compounds:
+        sa, sb, sc = _count(simples)
+        a, b, c = a + sa, b + sb, c + sc
+    return a, b, c
+
+def _key(compounds):
+    """
+    returns the most selective of ('id', value), ('class', value) or
+    ('type', name) of the rightmost compound, or None if it has none
+    (used to index rules, see cssutils.css.RuleIndex)
+    """
+    if not compounds:
+        return None
+    key = None
+    for simple in compounds[-1][1]:
+        kind = simple[0]
+        if kind == 'id':
+            return simple
+        elif kind == 'class' and (key is None or key[0] == 'type'):
+            key = simple
+        elif kind == 'type' and simple[2] and key is None:
+            key = ('type', simple[2])
+    return key
+
+def _compile(compounds, namespaces):
+    "returns a function testing if an element matches compounds"
+    match = None
+    for combinator, simples in compounds:
+        test = _compound(simples, namespaces)
+        if match is None:
+            match = test
+        else:
+            match = _COMBINATORS[combinator](match, test)
+    return match
+
+# order in which the simple selectors of a compound are tested, the most
+# selective and cheapest first
+_ORDER = {'id': 0, 'class': 1, 'type': 2, 'attrib': 3, 'pseudo-class': 4,
+          'not': 5, 'pseudo-element': 6}
+
+def _compound(simples, namespaces):
+    "returns a function testing if an element matches all simples"
+    tests = []
+    for simple in sorted(simples, key=lambda simple: _ORDER[simple[0]]):
+        test = _SIMPLES[simple[0]](namespaces, *simple[1:])
+        if test is _never:
+            return _never
+        elif test is not None:
+            tests.append(test)
+
+    if not tests:
+        return lambda element: True
+    elif len(tests) == 1:
+        return tests[0]
+    else:
+        def match(element):
+            for test in tests:
+                if not test(element):
+                    return False
+            return True
+        return match
+
+def _name(node):
+    return node.localName or node.nodeName
+
+def _typeTest(namespaces, prefix, name):
+    if prefix is None and u'' in namespaces:
+        prefix = u''
+        uri = namespaces[u'']
+    elif prefix is None or prefix == u'*':
+        uri = prefix = None
+    elif prefix == u'':
+        uri = None
+    elif prefix in namespaces:
+        uri = namespaces[prefix]
+    else:
+        return _never
+
+    if prefix is None:
+        if name is None:
+            return None
+        return lambda element: _name(element) == name
+    elif name is None:
+        return lambda element: element.namespaceURI == uri
+    else:
+        return lambda element: _name(element) == name and \
+                               element.namespaceURI == uri
+
+def _idTest(namespaces, value):
+    return lambda element: element.getAttribute('id') == value
+
+def _classTest(namespaces, value):
+    return lambda element: value in element.getAttribute('class').split()
+
+# attribute value operators: (actual value, selector value) -> bool
+_OPERATORS = {
+    None: lambda actual, value: True,
+    u'=': lambda actual, value: actual == value,
+    u'~=': lambda actual, value: value in actual.split(),
+    u'|=': lambda actual, value: actual == value or
+                                 actual.startswith(value + u'-'),
+    u'^=': lambda actual, value: bool(value) and actual.startswith(value),
+    u'$=': lambda actual, value: bool(value) and actual.endswith(value),
+    u'*=': lambda actual, value: bool(value) and value in actual,
+    }
+
+def _anyAttributeNode(element, name):
+    "returns the first attribute called name in any namespace or None"
+    attributes = element.attributes
+    for i in range(attributes.length):
+        node = attributes.item(i)
+        if _name(node) == name:
+            return node
+    return None
+
+def _attribTest(namespaces, prefix, name, operator, value):
+    if prefix is None or prefix == u'':
+        getNode = lambda element: element.getAttributeNode(name)
+    elif prefix == u'*':
+        getNode = lambda element: _anyAttributeNode(element, name)
+    elif prefix in namespaces:
+        uri = namespaces[prefix]
+        getNode = lambda element: element.getAttributeNodeNS(uri, name)
+    else:
+        return _never
+    compare = _OPERATORS[operator]
+
+    def test(element):
+        node = getNode(element)
+        return node is not None and compare(node.value, value)
+    return test
+
+def _previousElement(node):
+    node = node.previousSibling
+    while node is not None and node.nodeType != _ELEMENT_NODE:
+        node = node.previousSibling
+    return node
+
+def _nextElement(node):
+    node = node.nextSibling
+    while node is not None and node.nodeType != _ELEMENT_NODE:
+        node = node.nextSibling
+    return node
+
+def _sameType(node, element):
+    return node.nodeType == _ELEMENT_NODE and \
+           _name(node) == _name(element) and \
+           node.namespaceURI == element.namespaceURI
+
+def _position(element, sibling, ofType):
+    "returns the position (from 1) of element among its sibling elements"
+    position = 1
+    node = getattr(element, sibling)
+    while node is not None:
+        if ofType:
+            if _sameType(node, element):
+                position += 1
+        elif node.nodeType == _ELEMENT_NODE:
+            position += 1
+        node = getattr(node, sibling)
+    return position
+
+_nth = re.compile(ur'^(?:([-+]?\d*)n([-+]\d+)?|([-+]?\d+))$', re.U)
+
+def _nthTest(argument, sibling, ofType):
+    "returns a test for the an+b expression argument"
+    argument = argument.lower()
+    if argument == u'odd':
+        a, b = 2, 1
+    elif argument == u'even':
+        a, b = 2, 0
+    else:
+        mo = _nth.match(argument)
+        if not mo:
+            return _never
+        a, b, number = mo.groups()
+        if number is not None:
+            a, b = 0, int(number)
+        else:
+            a = int({u'': 1, u'+': 1, u'-': -1}.get(a, a))
+            b = int(b or 0)
+
+    def test(element):
+        offset = _position(element, sibling, ofType) - b
+        if a == 0:
+            return offset == 0
+        return offset % a == 0 and offset / a >= 0
+    return test
+
+def _empty(element):
+    for node in element.childNodes:
+        if node.nodeType == _ELEMENT_NODE or \
+           node.nodeType not in (xml.dom.Node.COMMENT_NODE,
+                                 xml.dom.Node.PROCESSING_INSTRUCTION_NODE) \
+           and node.nodeValue != u'':
+            return False
+    return True
+
+def _langTest(lang):
+    lang = lang.lower()
+
+    def test(element):
+        node = element
+        while node is not None and node.nodeType == _ELEMENT_NODE:
+            if node.hasAttributeNS(xml.dom.XML_NAMESPACE, 'lang'):
+                value = node.getAttributeNS(xml.dom.XML_NAMESPACE, 'lang')
+            elif node.hasAttribute('lang'):
+                value = node.getAttribute('lang')
+            else:
+                node = node.parentNode
+                continue
+            value = value.lower()
+            return value == lang or value.startswith(lang + u'-')
+        return False
+    return test
+
+_PSEUDO_CLASSES = {
+    u'root': lambda element: element.parentNode is not None and
+                             element.parentNode.nodeType == _DOCUMENT_NODE,
+    u'empty': _empty,
+    u'first-child': lambda element: _previousElement(element) is None,
+    u'last-child': lambda element: _nextElement(element) is None,
+    u'only-child': lambda element: _previousElement(element) is None and
+                                   _nextElement(element) is None,
+    u'first-of-type': lambda element:
+        _position(element, 'previousSibling', True) == 1,
+    u'last-of-type': lambda element:
+        _position(element, 'nextSibling', True) == 1,
+    u'only-of-type': lambda element:
+        _position(element, 'previousSibling', True) == 1 and
+        _position(element, 'nextSibling', True) == 1,
+    }
+
+_NTH_CLASSES = {
+    u'nth-child': ('previousSibling', False),
+    u'nth-last-child': ('nextSibling', False),
+    u'nth-of-type': ('previousSibling', True),
+    u'nth-last-of-type': ('nextSibling', True),
+    }
+
+def _pseudoClassTest(namespaces, name, argument):
+    if argument is None:
+        # dynamic pseudo-classes (:hover, :link, ...) never match
+        return _PSEUDO_CLASSES.get(name, _never)
+    elif name in _NTH_CLASSES:
+        return _nthTest(argument, *_NTH_CLASSES[name])
+    elif name == u'lang':
+        return _langTest(argument)
+    return _never
+
+def _notTest(namespaces, simples):
+    test = _compound(simples, namespaces)
+    return lambda element: not test(element)
+
+def _pseudoElementTest(namespaces, name):
+    return _never
+
+_SIMPLES = {
+    'type': _typeTest,
+    'id': _idTest,
+    'class': _classTest,
+    'attrib': _attribTest,
+    'pseudo-class': _pseudoClassTest,
+    'not': _notTest,
+    'pseudo-element': _pseudoElementTest,
+    }
+
+def _parentElement(element):
+    node = element.parentNode
+    if node is not None and node.nodeType == _ELEMENT_NODE:
+        return node
+    return None
+
+def _descendant(left, test):
+    def match(element):
+        if not test(element):
+            return False
+        node = _parentElement(element)
+        while node is not None:
+            if left(node):
+                return True
+            node = _parentElement(node)
+        return False
+    return match
+
+def _child(left, test):
+    def match(element):
+        if not test(element):
+            return False
+        node = _parentElement(element)
+        return node is not None and left(node)
+    return match
+
+def _adjacent(left, test):
+    def match(element):
+        if not test(element):
+            return False
+        node = _previousElement(element)
+        return node is not None and left(node)
+    return match
+
+def _sibling(left, test):
+    def match(element):
+        if not test(element):
+            return False
+        node = _previousElement(element)
+        while node is not None:
+            if left(node):
+                return True
+            node = _previousElement(node)
+        return False
+    return match
+
+_COMBINATORS = {
+    u' ': _descendant,
+    u'>': _child,
+    u'+': _adjacent,
+    u'~': _sibling,
+    }
@@ -13,6 +13,7 @@ log
 
     - raiseExceptions = [False, True]
     - setloglevel(loglevel)
+    - setcounting(counting) to count messages instead of logging them
 """
 __all__ = ['ErrorHandler']
 __docformat__ = 'restructuredtext'
@@ -23,9 +24,29 @@ __version__ = '$LastChangedRevision: 503 $'
 import logging
 import xml.dom
 
+# the methods of the handler and the level of their messages
+_LEVELS = [(u'debug', logging.DEBUG),
+           (u'info', logging.INFO),
+           (u'warn', logging.WARNING),
+           (u'error', logging.ERROR),
+           (u'critical', logging.CRITICAL),
+           (u'fatal', logging.FATAL)]
+
 class _ErrorHandler(object):
     """
     handles all errors and log messages
+
+    Each level has a method, e.g. ``log.warn(msg, token=None,
+    error=xml.dom.SyntaxErr, neverraise=False, args=None)``. The message
+    is only formatted (``msg % args``) if it is logged or raised, the log
+    is asked whether it handles the level of each message first, so its
+    level may also be changed directly. The methods are set again by
+    setlog, setloglevel, setcounting and setting raiseExceptions.
+
+    counts
+        a dict of (level, category): number of messages counted, the
+        category of a message is its text up to the first ":", e.g.
+        u"CSSValue"
     """
 
     def __init__(self, log,
@@ -54,44 +75,100 @@ class _ErrorHandler(object):
             self._log.addHandler(hdlr)
             self._log.setLevel(defaultloglevel)
 
+        self.counts = {}
+        self._counting = False
         self.raiseExceptions = raiseExceptions
 
 
-    def __getattr__(self, name):
-        # here if new log has been set
-        _logcalls = {
-            u'debug': self._log.debug,
-            u'info': self._log.info,
-            u'warn': self._log.warn,
-            u'critical': self._log.critical,
-            u'fatal': self._log.fatal,
-            u'error': self._log.error
-            }
-
-        if name in _logcalls.keys():
-            self._logcall = _logcalls[name]
-            return self.__handle
-        else:
-            raise AttributeError(
-                '(errorhandler) No Attribute "%s" found' % name)
+    def _getRaiseExceptions(self):
+        return self._raiseExceptions
+
+    def _setRaiseExceptions(self, raiseExceptions):
+        self._raiseExceptions = raiseExceptions
+        self._setlevels()
+
+    raiseExceptions = property(_getRaiseExceptions, _setRaiseExceptions,
+        doc="if True errors raise exceptions instead of being logged")
 
 
     def setlog(self, log):
         """set log of errorhandler's log"""
         self._log = log
+        self._setlevels()
 
 
     def setloglevel(self, level):
         """set level of errorhandler's log"""
         self._log.setLevel(level)
+        self._setlevels()
+
+
+    def setcounting(self, counting=True):
+        """
+        if ``counting`` messages are counted in counts instead of being
+        logged, whatever their level and the level of the log, counts is
+        reset each time counting is switched on
+        """
+        if counting and not self._counting:
+            self.counts = {}
+        self._counting = counting
+        self._setlevels()
+
+
+    def _setlevels(self):
+        "sets the method of each level"
+        for name, level in _LEVELS:
+            if self._counting:
+                report = self.__counter(name)
+            else:
+                report = self.__logger(getattr(self._log, name), level)
+            setattr(self, name, self.__handler(report))
+
+
+    def __logger(self, logcall, level):
+        "returns a function logging a message if the log handles ``level``"
+        enabled = getattr(self._log, 'isEnabledFor', None)
+        if enabled is None:
+            def log(msg, token, args):
+                logcall(self.__format(msg, token, args))
+        else:
+            def log(msg, token, args):
+                if enabled(level):
+                    logcall(self.__format(msg, token, args))
+        return log
+
+
+    def __counter(self, name):
+        "returns a function counting a message as level ``name``"
+        counts = self.counts
+        def count(msg, token, args):
+            key = (name, msg.split(u':', 1)[0])
+            counts[key] = counts.get(key, 0) + 1
+        return count
 
 
-    def __handle(self, msg=u'', token=None, error=xml.dom.SyntaxErr,
-                 neverraise=False):
+    def __handler(self, report):
         """
-        handles all calls
-        logs or raises exception
+        returns the method of a level, raising messages or reporting them
+        with ``report``
         """
+        def handle(msg=u'', token=None, error=xml.dom.SyntaxErr,
+                   neverraise=False, args=None):
+            """
+            handles all calls
+            logs or raises exception
+            """
+            if error and self._raiseExceptions and not neverraise:
+                raise error(self.__format(msg, token, args))
+            else:
+                report(msg, token, args)
+        return handle
+
+
+    def __format(self, msg, token, args):
+        "returns the message for msg, token and args"
+        if args is not None:
+            msg = msg % args
         if token:
             if isinstance(token, tuple):
                 msg = u'%s [%s:%s: %s]' % (
@@ -99,11 +176,7 @@ class _ErrorHandler(object):
             else:
                 msg = u'%s [%s:%s: %s]' % (
                     msg, token.line, token.col, token.value)
-
-        if error and self.raiseExceptions and not neverraise:
-            raise error(msg)
-        else:
-            self._logcall(msg)
+        return msg
 
 
 class ErrorHandler(_ErrorHandler):
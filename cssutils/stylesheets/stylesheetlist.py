@@ -37,3 +37,23 @@ class StyleSheetList(list):
             return self[index]
         except IndexError:
             return None
+
+    def matchingRules(self, element):
+        """
+        (cssutils)
+        returns a list of (selector, rule) pairs of the style rules of all
+        enabled CSSStyleSheets in this list which match DOM element
+        ``element``, in cascading order: by specificity, then by the order
+        of the sheets in this list and of the rules in each sheet. Only
+        the rules ``CSSStyleSheet.ruleIndex`` gives as candidates are
+        tested.
+        """
+        matching = []
+        for i, sheet in enumerate(self):
+            if not sheet.disabled and hasattr(sheet, 'ruleIndex'):
+                for specificity, position, selector, rule in \
+                        sheet.ruleIndex._matching(element):
+                    matching.append((specificity, i, position, selector, rule))
+        matching.sort()
+        return [(selector, rule) for specificity, i, position, selector, rule
+                in matching]
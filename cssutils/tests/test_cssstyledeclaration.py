@@ -3,6 +3,7 @@ __author__ = '$LastChangedBy: cthedot $'
 __date__ = '$LastChangedDate: 2007-11-24 23:34:27 +0100 (Sa, 24 Nov 2007) $'
 __version__ = '$LastChangedRevision: 683 $'
 
+import gc
 import xml.dom
 import basetest
 import cssutils
@@ -344,6 +345,59 @@ color: green;''': 'voice-family: inherit;\ncolor: green',
         self.assertEqual(1, s.length)
         s.setProperty('left', '1px')
 
+    def test_effective(self):
+        "CSSStyleDeclaration effective properties index"
+        s = cssutils.css.CSSStyleDeclaration(cssText=
+            u'color: red; left: 0; COLOR: green; /*x*/')
+        self.assertEqual(u'green', s.getPropertyValue('color'))
+        self.assertEqual(u'green', s.color)
+        self.assertEqual([u'left', u'color'], [s.item(0), s.item(1)])
+
+        # removing the effective property makes the earlier one effective
+        self.assertEqual(u'green', s.removeProperty('color'))
+        self.assertEqual(u'red', s.color)
+        self.assertEqual([u'color', u'left'], [s.item(0), s.item(1)])
+
+        # set and seq changes
+        s.setProperty('top', '1px')
+        self.assertEqual(u'1px', s.top)
+        self.assertEqual(3, s.length)
+        s.seq.append(cssutils.css.Property('top', '2px'))
+        self.assertEqual(u'2px', s.top)
+        s.seq = []
+        self.assertEqual(u'', s.top)
+        self.assertEqual(0, s.length)
+
+        # renaming a property in place
+        s = cssutils.css.CSSStyleDeclaration(cssText=u'color: red; left: 0')
+        s.seq[0].name = 'top'
+        self.assertEqual(u'red', s.getPropertyValue('top'))
+        self.assertEqual(u'', s.getPropertyValue('color'))
+
+        # replacing an item of seq
+        s.seq[1] = cssutils.css.Property('right', '1px')
+        self.assertEqual(u'1px', s.getPropertyValue('right'))
+        self.assertEqual(u'', s.left)
+
+        # properties shared by many declarations
+        shared = [cssutils.css.Property('color', 'red'),
+                  cssutils.css.Property('left', '0')]
+        for i in range(1000):
+            s = cssutils.css.CSSStyleDeclaration()
+            s.seq = shared
+            self.assertEqual(u'red', s.color)
+        kept = cssutils.css.CSSStyleDeclaration()
+        kept.seq = shared
+        self.assertEqual(u'0', kept.left)
+        del s
+        gc.collect()
+        # do not keep the declarations alive
+        self.assertEqual([kept.seq], shared[0]._seqs.values())
+        self.assertEqual([kept.seq], shared[1]._seqs.values())
+        shared[0].name = 'top'
+        self.assertEqual(u'red', kept.top)
+        self.assertEqual(u'', kept.color)
+
     def test_nameParameter(self):
         "CSSStyleDeclaration.XXX(name)"
         s = cssutils.css.CSSStyleDeclaration()
@@ -129,6 +129,55 @@ class CSSValueTestCase(basetest.BaseTestCase):
             self.assertEqual(v.valid, exp)
             self.assert_(v.wellformed, True)
 
+    def test_cache(self):
+        "CSSValue parsed value cache"
+        cssvalue = cssutils.css.cssvalue
+        v1 = cssutils.css.CSSValue(cssText=u'1px', _propertyName='left')
+        v2 = cssutils.css.CSSValue(cssText=u'1px', _propertyName='left')
+        self.assert_(v1._parsed is v2._parsed)
+        self.assert_(v1.seq is not v2.seq)
+        self.assertEqual(v1.CSS_PX, v1.primitiveType)
+        self.assertEqual(v1.CSS_PX, v2._parsed[cssvalue._PRIMITIVETYPE])
+        self.assertEqual(v2.CSS_PX, v2.primitiveType)
+        v2.cssText = u'2px'
+        self.assertEqual(u'1px', v1.cssText)
+
+        # validity depends on the property
+        v3 = cssutils.css.CSSValue(cssText=u'1px', _propertyName='color')
+        self.assertEqual((True, False), (v1.valid, v3.valid))
+        self.assert_(v3.wellformed)
+        v3 = cssutils.css.CSSValue(cssText=u'1px', _propertyName='color')
+        self.assertEqual(False, v3.valid)
+
+        # lists get new items
+        l1 = cssutils.css.CSSValue(cssText=u'1px 2px')
+        l2 = cssutils.css.CSSValue(cssText=u'1px 2px')
+        self.assertEqual(l1.CSS_VALUE_LIST, l2.cssValueType)
+        self.assertEqual(2, l2.length)
+        self.assert_(l1.item(0) is not l2.item(0))
+
+        # and their own comments
+        c1 = cssutils.css.CSSValue(cssText=u'1px /*a*/ 2px')
+        c2 = cssutils.css.CSSValue(cssText=u'1px /*a*/ 2px')
+        comments = [x for x in c1.seq + c2.seq
+                    if isinstance(x, cssutils.css.CSSComment)]
+        self.assertEqual(2, len(comments))
+        comments[0].cssText = u'/*b*/'
+        self.assertEqual(u'/*b*/', comments[0].cssText)
+        self.assertEqual(u'/*a*/', comments[1].cssText)
+        c3 = cssutils.css.CSSValue(cssText=u'1px /*a*/ 2px')
+        self.assertEqual(u'1px /*a*/ 2px', c3.cssText)
+
+        # not wellformed values are not cached
+        self.assertRaises(xml.dom.SyntaxErr, cssutils.css.CSSValue,
+                          cssText=u'url(a')
+        self.assert_((None, u'url(a') not in cssvalue._parsedValues)
+
+        for i in range(cssvalue._PARSED_VALUES + 1):
+            cssutils.css.CSSValue(cssText=u'%spx' % i)
+        self.assertEqual(cssvalue._PARSED_VALUES, len(cssvalue._parsedValues))
+        self.assert_((None, u'0px') not in cssvalue._parsedValues)
+
     def test_cssValueType(self):
         "CSSValue.cssValueType .cssValueTypeString"
         tests = [
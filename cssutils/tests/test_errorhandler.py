@@ -0,0 +1,123 @@
+"""Testcases for cssutils.errorhandler._ErrorHandler."""
+__author__ = '$LastChangedBy$'
+__date__ = '$LastChangedDate$'
+__version__ = '$LastChangedRevision$'
+
+import logging
+import StringIO
+import xml.dom
+import basetest
+import cssutils
+
+class Value(object):
+    "counts how often it is formatted"
+    formatted = 0
+    def __repr__(self):
+        Value.formatted += 1
+        return 'value'
+
+class ErrorHandlerTestCase(basetest.BaseTestCase):
+
+    def setUp(self):
+        self.out = StringIO.StringIO()
+        log = logging.Logger('test')
+        hdlr = logging.StreamHandler(self.out)
+        hdlr.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        log.addHandler(hdlr)
+        log.setLevel(logging.WARNING)
+        self.h = cssutils.errorhandler._ErrorHandler(log)
+        Value.formatted = 0
+
+    def test_levels(self):
+        "_ErrorHandler level methods"
+        self.h.debug(u'debug')
+        self.h.info(u'info')
+        self.h.warn(u'warn')
+        self.h.error(u'error')
+        self.assertEqual(u'WARNING warn\nERROR error\n', self.out.getvalue())
+        self.assertRaises(AttributeError, getattr, self.h, 'x')
+
+    def test_loglevel(self):
+        "_ErrorHandler with the level of the log changed directly"
+        self.h._log.setLevel(logging.DEBUG)
+        self.h.debug(u'debug')
+        logging.disable(logging.ERROR)
+        try:
+            self.h.error(u'error')
+        finally:
+            logging.disable(logging.NOTSET)
+        parent = logging.Logger('parent')
+        parent.setLevel(logging.ERROR)
+        self.h._log.parent = parent
+        self.h._log.setLevel(logging.NOTSET)
+        self.h.warn(u'warn')
+        self.h.error(u'error')
+        self.assertEqual(u'DEBUG debug\nERROR error\n', self.out.getvalue())
+
+    def test_setloglevel(self):
+        "_ErrorHandler.setloglevel()"
+        self.h.setloglevel(logging.DEBUG)
+        self.h.debug(u'debug')
+        self.h.setloglevel(logging.FATAL)
+        self.h.error(u'error')
+        self.assertEqual(u'DEBUG debug\n', self.out.getvalue())
+
+    def test_setlog(self):
+        "_ErrorHandler.setlog()"
+        out = StringIO.StringIO()
+        log = logging.Logger('test2')
+        log.addHandler(logging.StreamHandler(out))
+        self.h.setlog(log)
+        self.h.debug(u'debug')
+        self.assertEqual(u'debug\n', out.getvalue())
+        self.assertEqual(u'', self.out.getvalue())
+
+    def test_args(self):
+        "_ErrorHandler lazy args"
+        self.h.info(u'info %r', args=(Value(),))
+        self.assertEqual(0, Value.formatted)
+        self.h.warn(u'warn %r', args=(Value(),),
+                    token=('IDENT', u'a', 1, 2))
+        self.assertEqual(1, Value.formatted)
+        self.assertEqual(u'WARNING warn value [1:2: a]\n',
+                         self.out.getvalue())
+
+    def test_raiseExceptions(self):
+        "_ErrorHandler.raiseExceptions"
+        self.h.raiseExceptions = True
+        # raised even if the level is not logged
+        self.assertRaisesMsg(xml.dom.SyntaxErr, u'info value',
+                             self.h.info, u'info %r', args=(Value(),))
+        self.h.info(u'info', neverraise=True)
+        self.assertRaises(xml.dom.IndexSizeErr, self.h.warn, u'warn',
+                          error=xml.dom.IndexSizeErr)
+        self.h.raiseExceptions = False
+        self.h.info(u'info')
+        self.h.warn(u'warn')
+        self.assertEqual(u'WARNING warn\n', self.out.getvalue())
+
+    def test_setcounting(self):
+        "_ErrorHandler.setcounting()"
+        self.h.setcounting()
+        self.h.warn(u'CSSValue: invalid %r', args=(Value(),))
+        self.h.warn(u'CSSValue: unknown')
+        self.h.error(u'Property: invalid')
+        # counted whatever the level of the log
+        self.h.info(u'Property: info')
+        self.assertEqual({(u'warn', u'CSSValue'): 2,
+                          (u'error', u'Property'): 1,
+                          (u'info', u'Property'): 1}, self.h.counts)
+        self.assertEqual(0, Value.formatted)
+        self.assertEqual(u'', self.out.getvalue())
+
+        self.h.setcounting(False)
+        self.h.warn(u'CSSValue: logged')
+        self.assertEqual(2, self.h.counts[(u'warn', u'CSSValue')])
+        self.assertEqual(u'WARNING CSSValue: logged\n', self.out.getvalue())
+
+        self.h.setcounting()
+        self.assertEqual({}, self.h.counts)
+
+if __name__ == '__main__':
+    import unittest
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+tests for css.RuleIndex
+"""
+__author__ = '$LastChangedBy$'
+__date__ = '$LastChangedDate$'
+__version__ = '$LastChangedRevision$'
+
+import xml.dom.minidom
+import basetest
+import cssutils
+
+class RuleIndexTestCase(basetest.BaseTestCase):
+
+    def setUp(self):
+        super(RuleIndexTestCase, self).setUp()
+        self.doc = xml.dom.minidom.parseString(u'''<html><body>
+            <div id="main" class="x y"><p>1</p><p class="x">2</p></div>
+            </body></html>''')
+        self.div = self.doc.getElementsByTagName('div')[0]
+        self.p1, self.p2 = self.doc.getElementsByTagName('p')
+        self.s = cssutils.css.CSSStyleSheet()
+        self.s.cssText = u'''
+            p { color: red }
+            #main { color: green }
+            .x { color: blue }
+            * { color: black }
+            div > p.x, #main p { color: white }
+            a:hover { color: yellow }
+            '''
+
+    def _selectors(self, pairs):
+        return [selector.selectorText for selector, rule in pairs]
+
+    def test_init(self):
+        "RuleIndex.__init__()"
+        index = cssutils.css.RuleIndex(self.s)
+        self.assertEqual({}, index.namespaces)
+        self.assert_(self.s.ruleIndex is self.s.ruleIndex)
+
+    def test_candidates(self):
+        "RuleIndex.candidates()"
+        index = self.s.ruleIndex
+        # candidates only, div>p.x does not match
+        self.assertEqual([u'*', u'#main', u'.x', u'div>p.x'],
+                         self._selectors(index.candidates(self.div)))
+        self.assertEqual([u'*', u'p', u'#main p'],
+                         self._selectors(index.candidates(self.p1)))
+        self.assertEqual([u'*', u'.x', u'div>p.x', u'p', u'#main p'],
+                         self._selectors(index.candidates(self.p2)))
+
+    def test_matchingRules(self):
+        "RuleIndex.matchingRules()"
+        index = self.s.ruleIndex
+        self.assertEqual([u'*', u'.x', u'#main'],
+                         self._selectors(index.matchingRules(self.div)))
+        self.assertEqual([u'*', u'p', u'#main p'],
+                         self._selectors(index.matchingRules(self.p1)))
+        # the selector of a rule with the highest specificity is used
+        self.assertEqual([u'*', u'p', u'.x', u'#main p'],
+                         self._selectors(index.matchingRules(self.p2)))
+
+    def test_insertRule(self):
+        "RuleIndex after CSSStyleSheet.insertRule()"
+        index = self.s.ruleIndex
+        self.s.insertRule(u'p { color: gray }')
+        self.s.insertRule(u'body p { color: gray }', 0)
+        self.assertEqual([u'*', u'p', u'p', u'body p', u'#main p'],
+                         self._selectors(index.matchingRules(self.p1)))
+
+    def test_deleteRule(self):
+        "RuleIndex after CSSStyleSheet.deleteRule()"
+        index = self.s.ruleIndex
+        self.s.deleteRule(0)
+        self.s.deleteRule(-2)
+        self.assertEqual([u'*'],
+                         self._selectors(index.matchingRules(self.p1)))
+
+    def test_selectorText(self):
+        "RuleIndex after setting CSSStyleRule.selectorText"
+        index = self.s.ruleIndex
+        self.s.cssRules[0].selectorText = u'div'
+        self.assertEqual([u'*', u'#main p'],
+                         self._selectors(index.matchingRules(self.p1)))
+        self.assertEqual([u'*', u'div', u'.x', u'#main'],
+                         self._selectors(index.matchingRules(self.div)))
+
+    def test_cssText(self):
+        "RuleIndex after setting CSSStyleSheet.cssText"
+        self.s.ruleIndex
+        self.s.cssText = u'div { color: red }'
+        self.assertEqual([u'div'],
+                         self._selectors(self.s.ruleIndex.matchingRules(self.div)))
+
+    def test_namespaces(self):
+        "RuleIndex.namespaces"
+        doc = xml.dom.minidom.parseString(u'<a xmlns="uri"/>')
+        a = doc.documentElement
+        self.s.cssText = u'@namespace n "uri"; n|a { color: red }'
+        index = self.s.ruleIndex
+        self.assertEqual({u'n': u'uri'}, index.namespaces)
+        self.assertEqual([u'n|a'], self._selectors(index.matchingRules(a)))
+        self.s.deleteRule(0)
+        self.assertEqual({}, index.namespaces)
+        self.assertEqual([], index.matchingRules(a))
+
+    def test_StyleSheetList(self):
+        "StyleSheetList.matchingRules()"
+        s2 = cssutils.css.CSSStyleSheet()
+        s2.cssText = u'p { color: red } .x { color: red }'
+        sheets = cssutils.stylesheets.StyleSheetList([self.s, s2])
+        self.assertEqual([u'*', u'p', u'p', u'.x', u'.x', u'#main p'],
+                         self._selectors(sheets.matchingRules(self.p2)))
+        s2.disabled = True
+        self.assertEqual([u'*', u'p', u'.x', u'#main p'],
+                         self._selectors(sheets.matchingRules(self.p2)))
+
+if __name__ == '__main__':
+    import unittest
+    unittest.main()
@@ -11,6 +11,7 @@ __date__ = '$LastChangedDate: 2007-12-25 21:52:43 +0100 (Di, 25 Dez 2007) $'
 __version__ = '$LastChangedRevision: 721 $'
 
 import xml.dom
+import xml.dom.minidom
 import basetest
 import cssutils
 
@@ -223,6 +224,116 @@ class SelectorTestCase(basetest.BaseTestCase):
         
         self.assertEqual(set('ab'), s.prefixes)
 
+    def test_specificity(self):
+        "Selector.specificity"
+        tests = {
+            u'*': (0, 0, 0),
+            u'li': (0, 0, 1),
+            u'ul li': (0, 0, 2),
+            u'ul ol+li': (0, 0, 3),
+            u'h1 + *[rel=up]': (0, 1, 1),
+            u'ul ol li.red': (0, 1, 3),
+            u'li.red.level': (0, 2, 1),
+            u'#x34y': (1, 0, 0),
+            u'#s12:not(FOO)': (1, 0, 1),
+            u'a:hover': (0, 1, 1),
+            u'p::first-line': (0, 0, 2),
+            }
+        for test, exp in tests.items():
+            s = cssutils.css.Selector(test)
+            self.assertEqual(exp, s.specificity)
+
+    def _doc(self):
+        return xml.dom.minidom.parseString(u'''<html xml:lang="en-GB"><body>
+            <div id="a" class="x y"><p>1</p><p class="q">2</p><span/>
+            <p lang="fr" title="hello world">3</p></div>
+            <ul><li>a</li><li>b</li><li>c</li><li>d</li><li>e</li></ul>
+            <em></em></body></html>''')
+
+    def test_match(self):
+        "Selector.match()"
+        doc = self._doc()
+        elements = doc.getElementsByTagName('*')
+        def matching(selectorText, namespaces=None):
+            s = cssutils.css.Selector(selectorText)
+            return [i for i, e in enumerate(elements)
+                    if s.match(e, namespaces)]
+
+        # 0 html, 1 body, 2 div, 3-4 p, 5 span, 6 p, 7 ul, 8-12 li, 13 em
+        tests = {
+            u'*': range(14),
+            u'p': [3, 4, 6],
+            u'div p': [3, 4, 6],
+            u'body > p': [],
+            u'p + p': [4],
+            u'p ~ p': [4, 6],
+            u'span ~ p': [6],
+            u'.x': [2],
+            u'.x.q': [],
+            u'#a.x.y': [2],
+            u'body /*x*/ > div': [2],
+            u'[title]': [6],
+            u'[title=hello]': [],
+            u'[title~=world]': [6],
+            u'[title^=hel]': [6],
+            u'[title$="rld"]': [6],
+            u'[title*="o w"]': [6],
+            u'[lang|=fr]': [6],
+            u':root': [0],
+            u'em:empty': [13],
+            u'p:empty': [],
+            u'p:first-child': [3],
+            u'p:last-child': [6],
+            u'span:only-of-type': [5],
+            u'p:first-of-type': [3],
+            u'p:nth-of-type(2)': [4],
+            u'li:nth-child(odd)': [8, 10, 12],
+            u'li:nth-child(2n)': [9, 11],
+            u'li:nth-child( -n + 2 )': [8, 9],
+            u'li:nth-last-child(2)': [11],
+            u'p:lang(en)': [3, 4],
+            u'p:lang(fr)': [6],
+            u'p:not(.q)': [3, 6],
+            u'body *:not(li):not(p)': [2, 5, 7, 13],
+            u'a:hover': [],
+            u'p::first-line': [],
+            }
+        for test, exp in tests.items():
+            self.assertEqual((test, exp), (test, matching(test)))
+
+    def test_matchNamespaces(self):
+        "Selector.match(namespaces)"
+        doc = xml.dom.minidom.parseString(u'''<r xmlns="uri" xmlns:o="other"
+            ><a o:x="1"/><o:a x="1"/></r>''')
+        a, oa = doc.documentElement.childNodes
+        ns = {u'n': u'uri', u'o': u'other'}
+        tests = [
+            (u'a', None, [a, oa]),
+            (u'a', {u'': u'other'}, [oa]),
+            (u'n|a', ns, [a]),
+            (u'n|a', None, []),
+            (u'*|a', ns, [a, oa]),
+            (u'|a', ns, []),
+            (u'o|*', ns, [oa]),
+            (u'[o|x]', ns, [a]),
+            (u'[x]', ns, [oa]),
+            (u'[*|x]', ns, [a, oa]),
+            ]
+        for test, namespaces, exp in tests:
+            s = cssutils.css.Selector(test)
+            self.assertEqual(exp, [e for e in (a, oa)
+                                   if s.match(e, namespaces)])
+
+    def test_matchChanged(self):
+        "Selector.match() after setting selectorText"
+        doc = self._doc()
+        s = cssutils.css.Selector(u'span')
+        span = doc.getElementsByTagName('span')[0]
+        self.assertEqual(True, s.match(span))
+        s.selectorText = u'p'
+        self.assertEqual(False, s.match(span))
+        self.assertEqual(False, cssutils.css.Selector().match(span))
+
 if __name__ == '__main__':
     import unittest
     unittest.main()
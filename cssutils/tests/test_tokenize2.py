@@ -513,6 +513,33 @@ class TokenizerTestCase(basetest.BaseTestCase):
         "Tokenizer line + col"
         pass
 
+    def test_grammarcache(self):
+        "Tokenizer() compiles each macros and productions set only once"
+        import cssutils.cssproductions, cssutils.css2productions
+        t1 = Tokenizer()
+        t2 = Tokenizer(cssutils.cssproductions.MACROS,
+                       cssutils.cssproductions.PRODUCTIONS)
+        self.assert_(t1.tokenmatches is t2.tokenmatches)
+        self.assert_(t1._dispatch is t2._dispatch)
+        t3 = Tokenizer(cssutils.css2productions.MACROS,
+                       cssutils.css2productions.PRODUCTIONS)
+        self.assert_(t1.tokenmatches is not t3.tokenmatches)
+
+    def test_tokenizelong(self):
+        "Tokenizer().tokenize() of long and non ASCII input"
+        css = u'a { color: red; }\n' * 1000
+        tokens = list(self.tokenizer.tokenize(css))
+        self.assertEqual(css, u''.join([t[1] for t in tokens]))
+        self.assertEqual(('CHAR', u'}', 1000, 17), tokens[-2])
+        self.assertEqual(('S', u'\n', 1000, 18), tokens[-1])
+
+        tokens = list(self.tokenizer.tokenize(u'\xe4b c\xe4(\xe4', fullsheet=True))
+        self.assertEqual([('IDENT', u'\xe4b', 1, 1),
+                          ('S', u' ', 1, 3),
+                          ('FUNCTION', u'c\xe4(', 1, 4),
+                          ('IDENT', u'\xe4', 1, 7),
+                          ('EOF', u'', 1, 8)], tokens)
+
     def test_tokenize(self):
         "cssutils Tokenizer().tokenize()"
         import cssutils.cssproductions
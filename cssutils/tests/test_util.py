@@ -58,6 +58,21 @@ class BaseTestCase(basetest.BaseTestCase):
             # static too
             self.assertEqual(Base._normalize(test), exp)
 
+        # cached and interned
+        self.assert_(Base._normalize(u'COLOR') is Base._normalize(u'c\\olor'))
+        self.assertEqual(u'', Base._normalize(u''))
+        self.assertEqual(None, Base._normalize(None))
+
+        # bounded
+        max = Base._NORMALIZEDMAX
+        try:
+            Base._NORMALIZEDMAX = 10
+            for i in range(100):
+                self.assertEqual(u'x%d' % i, Base._normalize(u'X%d' % i))
+            self.assert_(len(Base._Base__normalized) <= 20)
+        finally:
+            Base._NORMALIZEDMAX = max
+
     def test_tokenupto(self):
         "Base._tokensupto2()"
 
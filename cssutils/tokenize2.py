@@ -10,6 +10,8 @@ __version__ = '$LastChangedRevision: 300 $'
 
 import os
 import re
+import sre_constants
+import sre_parse
 import string
 import xml.dom
 import cssutils
@@ -42,21 +44,78 @@ class Tokenizer(object):
             compiled.append((key, re.compile('^(?:%s)' % value, re.U).match))
         return compiled
 
+    def _compile_dispatch(self, expanded_productions):
+        """
+        compile productions into one alternation per first character
+
+        Each alternation contains (in production order) only the productions
+        a token starting with that character may match, as a named group
+        ``_<index>`` so the matching production can be found from
+        ``match.lastgroup``. Returns a dict of char to match method and the
+        match method used for all other (non ASCII) characters.
+        """
+        firsts = [_firstchars(value) for key, value in expanded_productions]
+
+        def alternation(test):
+            indexes = tuple([i for i, chars in enumerate(firsts)
+                             if chars is None or test(chars)])
+            if indexes not in alternations:
+                alternations[indexes] = re.compile(u'|'.join(
+                    [u'(?P<_%d>%s)' % (i, expanded_productions[i][1])
+                     for i in indexes]), re.U).match
+            return alternations[indexes]
+
+        alternations = {}
+        dispatch = {}
+        for i in range(128):
+            c = unichr(i)
+            dispatch[c] = alternation(lambda chars: c in chars)
+        other = alternation(
+            lambda chars: [c for c in chars if ord(c) > 127])
+        return dispatch, other
+
+    def _compile(self, macros, productions):
+        """
+        returns the compiled grammar for macros and productions, a tuple of
+        (tokenmatches, commentmatcher, urimatcher, names, charindex,
+        dispatch, othermatch)
+        """
+        expanded = self._expand_macros(macros, productions)
+        tokenmatches = self._compile_productions(expanded)
+        commentmatcher = [x[1] for x in tokenmatches if x[0] == 'COMMENT'][0]
+        urimatcher = [x[1] for x in tokenmatches if x[0] == 'URI'][0]
+        names = dict([('_%d' % i, (i, key))
+                      for i, (key, value) in enumerate(expanded)])
+        charindex = None
+        for i, (key, value) in enumerate(expanded):
+            if key == 'CHAR':
+                charindex = i
+        dispatch, othermatch = self._compile_dispatch(expanded)
+        return (tokenmatches, commentmatcher, urimatcher, names, charindex,
+                dispatch, othermatch)
+
     def __init__(self, macros=None, productions=None):
         """
         inits tokenizer with given macros and productions which default to
         cssutils own macros and productions
+
+        The compiled grammar is cached for the whole process so tokenizers
+        for the same macros and productions are cheap to create.
         """
         self.log = cssutils.log
         if not macros:
             macros = MACROS
         if not productions:
             productions = PRODUCTIONS
-        self.tokenmatches = self._compile_productions(
-                self._expand_macros(macros, productions))
-        self.commentmatcher = [x[1] for x in self.tokenmatches if x[0] == 'COMMENT'][0]
-        self.urimatcher = [x[1] for x in self.tokenmatches if x[0] == 'URI'][0]
-        self.unicodesub = re.compile(RE_UNICODE).sub
+        key = (tuple(sorted(macros.items())), tuple(productions))
+        try:
+            grammar = _grammars[key]
+        except KeyError:
+            grammar = _grammars[key] = self._compile(macros, productions)
+        (self.tokenmatches, self.commentmatcher, self.urimatcher,
+         self._names, self._charindex,
+         self._dispatch, self._othermatch) = grammar
+        self.unicodesub = _unicodesub
 
     def tokenize(self, text, fullsheet=False):
         """
@@ -77,72 +136,140 @@ class Tokenizer(object):
         """
         line = col = 1
 
-        tokens = []
-        while text:
-            for name, matcher in self.tokenmatches:
-
-                if fullsheet and name == 'CHAR' and text.startswith(u'/*'):
-                    # after all tokens except CHAR have been tested
-                    # test for incomplete comment
-                    possiblecomment = u'%s*/' % text
-                    match = self.commentmatcher(possiblecomment)
-                    if match:
-                        yield ('COMMENT', possiblecomment, line, col)
-                        text = None
-                        break
-
-                # default
-                match = matcher(text)
-                if match:
-                    found = match.group(0)
-
-                    if fullsheet:
-                        # check if tokens may be completed
-                        if 'INVALID' == name and text == found:
-                            # complete INVALID to STRING
-                            name = 'STRING'
-                            found = '%s%s' % (found, found[0])
-                        
-                        elif 'FUNCTION' == name and\
-                             u'url(' == util.Base._normalize(found):
-                            # FUNCTION url( is fixed to URI if fullsheet
-                            # FUNCTION production MUST BE after URI production!
-                            for end in (u"')", u'")', u')'):
-                                possibleuri = '%s%s' % (text, end)
-                                match = self.urimatcher(possibleuri)
-                                if match:
-                                    name = 'URI'
-                                    found = match.group(0)
-                                    break
-
-                    if name in ('URI', 'FUNCTION', 'ATKEYWORD', 'IDENT', 'STRING', 
-                                'INVALID', 'HASH', 'DIMENSION', 'COMMENT'):
-                        # may contain unicode escape, replace with normal char
-                        def repl(m):
-                            num = int(m.group(0)[1:], 16)
-                            if num < 0x10000:
-                                return unichr(num)
-                            else:
-                                return m.group(0)
-                        value = self.unicodesub(repl, found)
-                    else:
-                        # should not contain unicodes
-                        value = found
-
-                    yield (name, value, line, col)
-                    text = text[len(found):]
-                    nls = found.count(self._linesep)
-                    line += nls
-                    if nls:
-                        col = len(found[found.rfind(self._linesep):])
-                    else:
-                        col += len(found)
+        if text:
+            dispatch, othermatch = self._dispatch, self._othermatch
+            names, charindex = self._names, self._charindex
+            linesep = self._linesep
+            pos, end = 0, len(text)
+        else:
+            pos = end = 0
+        while pos < end:
+            match = dispatch.get(text[pos], othermatch)(text, pos)
+            if match:
+                index, name = names[match.lastgroup]
+            else:
+                index = name = None
+
+            if fullsheet and charindex is not None and \
+               (match is None or index >= charindex) and \
+               text.startswith(u'/*', pos):
+                # all tokens except CHAR have been tested,
+                # test for incomplete comment
+                possiblecomment = u'%s*/' % text[pos:]
+                if self.commentmatcher(possiblecomment):
+                    yield ('COMMENT', possiblecomment, line, col)
                     break
 
-            else:
+            if not match:
                 # should not happen at all
-                raise xml.dom.SyntaxErr('no token match "%s(...)"' % text[:10])
-                text = text[1:]
+                raise xml.dom.SyntaxErr('no token match "%s(...)"' %
+                                        text[pos:pos+10])
+
+            found = match.group()
+            if fullsheet:
+                # check if tokens may be completed
+                if 'INVALID' == name and match.end() == end:
+                    # complete INVALID to STRING
+                    name = 'STRING'
+                    found = '%s%s' % (found, found[0])
+
+                elif 'FUNCTION' == name and\
+                     u'url(' == util.Base._normalize(found):
+                    # FUNCTION url( is fixed to URI if fullsheet
+                    # FUNCTION production MUST BE after URI production!
+                    for uriend in (u"')", u'")', u')'):
+                        possibleuri = '%s%s' % (text[pos:], uriend)
+                        urimatch = self.urimatcher(possibleuri)
+                        if urimatch:
+                            name = 'URI'
+                            found = urimatch.group(0)
+                            break
+
+            if u'\\' in found and name in _ESCAPED:
+                # may contain unicode escape, replace with normal char
+                value = self.unicodesub(_unicoderepl, found)
+            else:
+                # should not contain unicodes
+                value = found
+
+            yield (name, value, line, col)
+            pos += len(found)
+            nls = found.count(linesep)
+            line += nls
+            if nls:
+                col = len(found) - found.rfind(linesep)
+            else:
+                col += len(found)
 
         if fullsheet:
             yield ('EOF', u'', line, col)
+
+
+# compiled grammars by (macros, productions), see Tokenizer.__init__
+_grammars = {}
+
+_unicodesub = re.compile(RE_UNICODE).sub
+
+# tokens which may contain unicode escapes
+_ESCAPED = frozenset(('URI', 'FUNCTION', 'ATKEYWORD', 'IDENT', 'STRING',
+                      'INVALID', 'HASH', 'DIMENSION', 'COMMENT'))
+
+def _unicoderepl(m):
+    num = int(m.group(0)[1:], 16)
+    if num < 0x10000:
+        return unichr(num)
+    else:
+        return m.group(0)
+
+def _firstchars(pattern):
+    """
+    returns the set of characters a match of regular expression `pattern`
+    may start with or None if it may start with any character (or match
+    the empty string)
+    """
+    chars, nullable = _first(sre_parse.parse(pattern, re.U))
+    if nullable:
+        return None
+    return chars
+
+def _first(subpattern):
+    """returns (set of first characters or None, may match empty string)"""
+    chars = set()
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL:
+            chars.add(unichr(av))
+            return chars, False
+        elif op is sre_constants.IN:
+            for inop, inav in av:
+                if inop is sre_constants.LITERAL:
+                    chars.add(unichr(inav))
+                elif inop is sre_constants.RANGE and inav[1] - inav[0] < 256:
+                    chars.update([unichr(c) for c in range(inav[0], inav[1] + 1)])
+                else:
+                    # NEGATE, CATEGORY or a large range
+                    return None, False
+            return chars, False
+        elif op is sre_constants.SUBPATTERN:
+            first, nullable = _first(av[1])
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            first, nullable = _first(av[2])
+            nullable = nullable or av[0] == 0
+        elif op is sre_constants.BRANCH:
+            first, nullable = set(), False
+            for branch in av[1]:
+                bfirst, bnullable = _first(branch)
+                if bfirst is None:
+                    return None, False
+                first.update(bfirst)
+                nullable = nullable or bnullable
+        elif op is sre_constants.AT:
+            continue
+        else:
+            # ANY, NOT_LITERAL, CATEGORY, GROUPREF, ASSERT...
+            return None, False
+        if first is None:
+            return None, False
+        chars.update(first)
+        if not nullable:
+            return chars, False
+    return chars, True
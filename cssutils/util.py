@@ -170,6 +170,10 @@ class Base(object):
     # all unicode (see cssproductions "unicode")
     __unicodes = re.compile(ur'\\[0-9a-fA-F]{1,6}[\t|\r|\n|\f|\x20]?').sub
 
+    # cache of normalized names, cleared when _NORMALIZEDMAX is reached
+    __normalized = {}
+    _NORMALIZEDMAX = 10000
+
     @staticmethod
     def _normalize(x):
         """
@@ -179,12 +183,29 @@ class Base(object):
           x=="c\olor\" return "color" (unicode escape sequences should have
           been resolved by the tokenizer already)
         - lowercase
+
+        Results are cached, a normalized name is returned as the same
+        (interned) object for any of its spellings.
         """
         if x:
-            def removeescape(matchobj):
-                return matchobj.group(0)[1:]
-            x = Base.__escapes(removeescape, x)
-            return x.lower()        
+            normalized = Base.__normalized
+            try:
+                return normalized[x]
+            except KeyError:
+                pass
+            nx = x
+            if '\\' in nx:
+                def removeescape(matchobj):
+                    return matchobj.group(0)[1:]
+                nx = Base.__escapes(removeescape, nx)
+            nx = nx.lower()
+            if len(normalized) >= Base._NORMALIZEDMAX:
+                normalized.clear()
+            if '\\' not in nx:
+                # a normalized name without escapes normalizes to itself
+                nx = normalized.setdefault(nx, nx)
+            normalized[x] = nx
+            return nx
         else:
             return x
 
@@ -1,4 +1,5 @@
 import xml.dom.minidom as dom
+import HTMLParser, htmlentitydefs, codecs
 
 
 from twisted.web import microdom
@@ -19,20 +20,161 @@ def getDocument(document_start):
     return microdom.parseString
     
 
+# Elements which never have content, so are never left open
+EMPTY_ELEMENTS = set([
+    'area', 'base', 'basefont', 'br', 'col', 'frame', 'hr', 'img',
+    'input', 'isindex', 'link', 'meta', 'param'
+    ])
+
+class IncrementalTreeBuilder(HTMLParser.HTMLParser):
+    """ Builds a DOM tree from HTML fed to it in chunks, as it arrives.
+    Unlike TidyDomDocument.parse, each call to feed only parses the data it is
+    given (plus whatever incomplete markup was left over from the last chunk)
+    and appends the resulting nodes to the tree built so far.
+
+    Works with any DOM Level 2 Document (minidom, pxdom or domhtml).
+    """
+
+    def __init__(self, document, encoding='utf8'):
+        HTMLParser.HTMLParser.__init__(self)
+        self.document = document
+        self._decoder = codecs.getincrementaldecoder(encoding)('replace')
+        # The currently open elements, innermost last
+        self._open = []
+        # Roots of the subtrees added by the current feed, and the ids of all
+        # the nodes it created
+        self._new = []
+        self._built = set()
+
+    def feed(self, data):
+        """ Parse the newly arrived data and return the roots of the subtrees
+        it added to the document, in document order.
+        """
+        HTMLParser.HTMLParser.feed(self, self._decoder.decode(data))
+        return self._collect()
+
+    def close(self):
+        """ Parse any data still buffered and close all open elements.
+        Returns the new subtrees like feed.
+        """
+        HTMLParser.HTMLParser.feed(self, self._decoder.decode('', True))
+        HTMLParser.HTMLParser.close(self)
+        del self._open[:]
+        return self._collect()
+
+    def _collect(self):
+        new = self._new
+        self._new = []
+        self._built.clear()
+        return new
+
+    def _append(self, node):
+        """ Add node to the innermost open element and note if it is the root
+        of a new subtree, that is if its parent was not built by this feed.
+        """
+        if self._open:
+            parent = self._open[-1]
+        elif self.document.documentElement is not None:
+            parent = self.document.documentElement
+        else:
+            parent = self.document
+        parent.appendChild(node)
+        if id(parent) not in self._built:
+            self._new.append(node)
+        self._built.add(id(node))
+
+    def handle_starttag(self, tag, attrs):
+        element = self.document.createElement(tag)
+        for name, value in attrs:
+            if value is None:
+                value = name
+            element.setAttribute(name, value)
+        self._append(element)
+        if tag not in EMPTY_ELEMENTS:
+            self._open.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in EMPTY_ELEMENTS:
+            self._open.pop()
+
+    def handle_endtag(self, tag):
+        # Close the innermost open element with this name and anything left
+        # open inside it; stray end tags are ignored
+        for i in range(len(self._open)-1, -1, -1):
+            if self._open[i].tagName == tag:
+                del self._open[i:]
+                break
+
+    def handle_data(self, data):
+        # Whitespace outside the root element is dropped, as is any text
+        # before there is a root element to hold it
+        if self._open or (data.strip() and
+                          self.document.documentElement is not None):
+            self._append(self.document.createTextNode(data))
+
+    def handle_charref(self, name):
+        try:
+            if name[:1] in 'xX':
+                char = unichr(int(name[1:], 16))
+            else:
+                char = unichr(int(name))
+        except ValueError:
+            char = u'&#%s;' % name
+        self.handle_data(char)
+
+    def handle_entityref(self, name):
+        if name in htmlentitydefs.name2codepoint:
+            self.handle_data(unichr(htmlentitydefs.name2codepoint[name]))
+        else:
+            self.handle_data(u'&%s;' % name)
+
+    def handle_comment(self, data):
+        self._append(self.document.createComment(data))
+
+
 class TidyDomDocument:
     """ A browser DOM Document interface. Handles converting HTML and XML
     into a DOM tree. Uses utidylib to convert whatever is passed in into
-    valid xhtml before parsing it. Can handle incremental loading, but who
-    knows how well.."""
+    valid xhtml before parsing it.
+
+    In incremental mode tidy is not used; each chunk passed to write is
+    parsed on its own by an IncrementalTreeBuilder and appended to the
+    document, which may be any DOM Level 2 Document (a minidom one by
+    default, or e.g. a domhtml.HTMLDocument to lay it out).
+    """
     
-    def __init__(self):
+    def __init__(self, incremental=False, document=None):
         self._buffer = ''
-        self.parse()
+        self._builder = None
+        if incremental:
+            if document is None:
+                document = dom.getDOMImplementation().createDocument(
+                    None, None, None)
+            self.dom = document
+            self._builder = IncrementalTreeBuilder(document,
+                                                   tidy_options['char_encoding'])
+        else:
+            self.parse()
 
     def write(self, data):
-        """ Adds data to the internal representation of the document """
+        """ Adds data to the internal representation of the document.
+        Returns the list of the roots of the subtrees this added to the
+        document, in document order, for boxmodel.layout.PageLayout.addSubtrees
+        """
+        if self._builder:
+            return self._builder.feed(data)
         self._buffer += data
         self.parse()
+        return [self.dom.documentElement]
+
+    def close(self):
+        """ Signals the end of the document. Returns any subtrees which were
+        still waiting on more data, like write.
+        """
+        if self._builder:
+            return self._builder.close()
+        return []
 
     def parse(self):
         """ Parses the internal file buffer into a DOM tree.
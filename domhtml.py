@@ -38,11 +38,19 @@ import pxdom as dom
 
 from cssutils import css
 
-import urlparse, string, re
+import urlparse, string, re, types, xml.dom
+from collections import OrderedDict
+from xml.parsers import expat
 
 def parseString(str, uri=''):
+    return _parse(str, uri, {})
+
+def _parse(str, uri, parameters):
+    """ Parse str with an LSParser with the given configuration parameters """
     di = getDOMImplementation()
     parser = di.createLSParser(di.MODE_SYNCHRONOUS, None)
+    for name, value in parameters.items():
+        parser.domConfig.setParameter(name, value)
     input = di.createLSInput()
 
     input.stringData = str
@@ -53,6 +61,237 @@ def parseString(str, uri=''):
                             parser.ACTION_REPLACE_CHILDREN)
     return document
 
+def parseFast(str, uri=''):
+    """ Parse a complete document into an HTMLDocument like parseString, but
+    from expat's stream of parse events, building the nodes directly with the
+    parser's default configuration hard-wired.
+
+    The external DTD isn't read (pxdom-resolve-resources is off), so
+    references to the entities it would declare are left as empty entity
+    reference nodes and there are no default attributes. Documents the events
+    can't reproduce (an internal subset, such a reference in an attribute
+    value, an unbound prefix, anything expat rejects) are parsed by LSParser,
+    configured the same way.
+    """
+    try:
+        return _FastBuilder(uri).parse(str)
+    except (_Unsupported, expat.ExpatError):
+        return _parse(str, uri, {'pxdom-resolve-resources': False})
+
+class _Unsupported(Exception):
+    """ Raised by _FastBuilder for documents it can't build """
+
+# References to entities other than the predefined ones
+_entityrefs = re.compile(r'&(?!#|(?:amp|lt|gt|quot|apos);)[^\s&;<>\'"=]+;')
+
+# An attribute of a start tag, from the whitespace before it to its value
+_attribute = re.compile(r'(\s+)([^\s=]+)(\s*=\s*(?:"[^"]*"|\'[^\']*\'))')
+
+class _FastBuilder:
+    """ Builds an HTMLDocument from expat events for parseFast, with nodes
+    located where LSParser locates them: elements and attributes after their
+    names, attribute text after the closing quote, comments and processing
+    instructions where they end, and other text (queued until the next event)
+    where the markup after it has been read up to - just past the '<' of a
+    start tag, at the '<' of an end tag, or at the end of a comment,
+    processing instruction or entity reference.
+    """
+    def __init__(self, uri):
+        self._document = HTMLDocument()
+        self._document._documentURI = uri
+        self._document._xmlStandalone = None
+        self._node = self._document
+        self._namespaces = [dom.FIXEDNS]
+        self._text = []
+        self._skipped = 0
+
+    def parse(self, str):
+        document = self._document
+        if isinstance(str, unicode):
+            str = str.encode('utf-8')
+            document._inputEncoding = 'utf-16'
+        else:
+            document._inputEncoding = 'utf-8'
+        self._source = str
+        # LSParser reads string data as UTF-8 whatever the declaration says
+        parser = self._parser = expat.ParserCreate('utf-8')
+        parser.ordered_attributes = True
+        parser.buffer_text = True
+        parser.XmlDeclHandler = self.xmlDecl
+        parser.StartDoctypeDeclHandler = self.doctype
+        parser.StartElementHandler = self.startElement
+        parser.EndElementHandler = self.endElement
+        parser.CharacterDataHandler = self._text.append
+        parser.CommentHandler = self.comment
+        parser.ProcessingInstructionHandler = self.processingInstruction
+        parser.SkippedEntityHandler = self.skippedEntity
+        parser.Parse(str, True)
+        # references expat didn't report were in attribute values (or
+        # comments, CDATA sections and processing instructions)
+        if len(_entityrefs.findall(str)) != self._skipped:
+            raise _Unsupported()
+        return document
+
+    def _flush(self, location):
+        """ Add any queued text as a Text node at the given location """
+        if self._text:
+            text = dom.Text(self._document)
+            text._data = u''.join(self._text)
+            del self._text[:]
+            text._setLocation(location)
+            self._append(text)
+
+    def _location(self, skip=0):
+        """ Return the location skip characters on from the start of the
+        current event
+        """
+        return (self._parser.CurrentLineNumber,
+                self._parser.CurrentColumnNumber + 1 + skip)
+
+    def _end(self, close):
+        """ Return the location just past the markup of the current event,
+        which ends with close
+        """
+        start = self._parser.CurrentByteIndex
+        end = self._source.index(close, start) + len(close)
+        return self._advance(self._location(), self._source[start:end])
+
+    def _advance(self, (line, column), markup):
+        """ Return the location reached reading markup from location """
+        markup = markup.decode('utf-8')
+        if '\n' not in markup and '\r' not in markup:
+            return (line, column + len(markup))
+        markup = dom.NEWLINERE('\n', markup)
+        return (line + markup.count('\n'), len(markup) - markup.rindex('\n'))
+
+    def _attributeLocations(self, name, count):
+        """ Return the locations of the first count attributes of the start
+        tag of the current event, named name: after the name of each and
+        after its value (where its text is located)
+        """
+        source = self._source
+        location = self._location(1 + len(name))
+        index = self._parser.CurrentByteIndex + 1 + len(name.encode('utf-8'))
+        locations = []
+        for i in range(count):
+            match = _attribute.match(source, index)
+            location = self._advance(location, match.group(1) + match.group(2))
+            locations.append(location)
+            location = self._advance(location, match.group(3))
+            locations.append(location)
+            index = match.end()
+        return locations
+
+    def _append(self, node):
+        parent = self._node
+        children = parent._childNodes._list
+        node._childIndex = len(children)
+        node._containerNode = parent
+        children.append(node)
+
+    def xmlDecl(self, version, encoding, standalone):
+        document = self._document
+        document._xmlVersion = version or '1.0'
+        document._xmlEncoding = encoding
+        if standalone != -1:
+            document._xmlStandalone = standalone == 1
+
+    def doctype(self, name, systemId, publicId, internalSubset):
+        if internalSubset:
+            raise _Unsupported()
+        doctype = dom.DocumentType(self._document, name, publicId, systemId)
+        if systemId is not None:
+            doctype._processed = False
+        doctype._recurse(True, readonly=True)
+        self._append(doctype)
+
+    def startElement(self, name, attributes):
+        self._flush(self._location(1))
+        document = self._document
+        namespaces = self._namespaces[-1]
+        for i in range(0, len(attributes), 2):
+            prefix, localName = dom._splitName(attributes[i])
+            if 'xmlns' in (prefix, attributes[i]):
+                if namespaces is self._namespaces[-1]:
+                    namespaces = namespaces.copy()
+                namespaces[[localName, None][prefix is None]] = \
+                    attributes[i + 1] or None
+        self._namespaces.append(namespaces)
+
+        element = _lookup_html_element(name)(document, dom.NONS, name, None)
+        element._setLocation(self._location(1 + len(name)))
+        element._prefix, element._localName = self._resolve(
+            element, name, namespaces)
+        items = element._attributes._list
+        if attributes:
+            locations = self._attributeLocations(name, len(attributes) / 2)
+        for i in range(0, len(attributes), 2):
+            name, value = attributes[i], attributes[i + 1]
+            attr = dom.Attr(document, dom.NONS, name, None, True)
+            attr._setLocation(locations[i])
+            if value:
+                text = dom.Text(document)
+                text._data = value
+                text._setLocation(locations[i + 1])
+                text._childIndex = 0
+                text._containerNode = attr
+                attr._childNodes._list.append(text)
+            attr._prefix, attr._localName = self._resolve(
+                attr, name, namespaces)
+            attr._containerNode = element
+            items.append(attr)
+        if items:
+            element._attributes._reindex()
+        self._append(element)
+        self._node = element
+
+    def _resolve(self, node, name, namespaces):
+        """ Set the namespaceURI of an element or attribute from its name,
+        returning its (prefix, localName) """
+        prefix, localName = dom._splitName(name)
+        if localName is None:
+            raise _Unsupported()
+        if node.nodeType == dom.Node.ATTRIBUTE_NODE and prefix is None:
+            if localName == 'xmlns':
+                node._namespaceURI = dom.NSNS
+            else:
+                node._namespaceURI = None
+        elif namespaces.has_key(prefix):
+            node._namespaceURI = namespaces[prefix]
+        elif prefix is None:
+            node._namespaceURI = None
+        else:
+            raise _Unsupported()
+        return prefix, localName
+
+    def endElement(self, name):
+        self._flush(self._location())
+        self._namespaces.pop()
+        self._node = self._node._containerNode
+
+    def comment(self, data):
+        location = self._end('-->')
+        self._flush(location)
+        comment = dom.Comment(self._document)
+        comment._data = data
+        comment._setLocation(location)
+        self._append(comment)
+
+    def processingInstruction(self, target, data):
+        location = self._end('?>')
+        self._flush(location)
+        pi = dom.ProcessingInstruction(self._document, target)
+        pi._data = data
+        pi._setLocation(location)
+        self._append(pi)
+
+    def skippedEntity(self, name, isParameterEntity):
+        self._flush(self._end(';'))
+        self._skipped += 1
+        reference = dom.EntityReference(self._document, name)
+        reference._readonly = True
+        self._append(reference)
+
 
 class HTMLDOMImplementation(dom.DOMImplementation):
     """ Add the View, HTML, and CSS/Style (not yet implemented) features """
@@ -99,20 +338,118 @@ def getDOMImplementationList(features= ''):
     implementationList.readonly= True
     return implementationList
 
-# Some constants for use below
-_KEY  = 0
-_TYPE = 1
-_PERMISSIONS = 2
+class _Attribute(object):
+    """ Class level descriptor for a DOM HTML attribute of type 'string',
+    reflecting the content attribute key of the element.
+
+    Descriptors are generated from the _html_attributes table of each class, which
+    maps attribute names to [key, type, permissions] lists, see
+    _define_attributes.
+    """
+    def __init__(self, name, key, writable):
+        self.name = name
+        self.key = key
+        self.writable = writable
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return self.get(instance)
+
+    def __set__(self, instance, value):
+        if not self.writable:
+            raise dom.NoModificationAllowedErr(instance, self.name)
+        self.set(instance, value)
+
+    def get(self, instance):
+        return instance.getAttribute(self.key)
+
+    def set(self, instance, value):
+        instance.setAttribute(self.key, value)
+
+class _BoolAttribute(_Attribute):
+    """ 'bool': true if the content attribute is present """
+    def get(self, instance):
+        return instance.hasAttribute(self.key)
+
+    def set(self, instance, value):
+        if value:
+            instance.setAttribute(self.key, '')
+        else:
+            instance.removeAttribute(self.key)
+
+class _LongAttribute(_Attribute):
+    """ 'long': the content attribute as a number, 0 if it isn't one """
+    def get(self, instance):
+        try:
+            return int(instance.getAttribute(self.key))
+        except ValueError:
+            return 0
+
+    def set(self, instance, value):
+        try:
+            value = int(value)
+        except ValueError:
+            value = 0
+        instance.setAttribute(self.key, value)
+
+class _LocalAttribute(_Attribute):
+    """ 'local_string': the instance variable key """
+    def get(self, instance):
+        try:
+            return instance.__dict__[self.key]
+        except KeyError:
+            raise AttributeError, self.name
+
+    def set(self, instance, value):
+        instance.__dict__[self.key] = value
+
+class _LocalBoolAttribute(_LocalAttribute):
+    """ 'local_bool': the instance variable key, stored as a bool """
+    def set(self, instance, value):
+        instance.__dict__[self.key] = bool(value)
+
+class _LocalLongAttribute(_LocalAttribute):
+    """ 'local_long': the instance variable key as a number """
+    def get(self, instance):
+        try:
+            return int(_LocalAttribute.get(self, instance))
+        except ValueError:
+            return 0
+
+    def set(self, instance, value):
+        try:
+            value = int(value)
+        except ValueError:
+            value = 0
+        instance.__dict__[self.key] = value
+
+_ATTRIBUTE_TYPES = {
+    'string': _Attribute, 'bool': _BoolAttribute, 'long': _LongAttribute,
+    'local_string': _LocalAttribute, 'local_bool': _LocalBoolAttribute,
+    'local_long': _LocalLongAttribute
+    }
+
+def _define_attributes(cls):
+    """ Turn the _html_attributes table defined by class cls (if any) into
+    descriptors on the class. Unknown types are treated as 'string'.
+    """
+    table = cls.__dict__.get('_html_attributes', {})
+    for name, (key, type, permissions) in table.items():
+        attribute = _ATTRIBUTE_TYPES.get(type, _Attribute)
+        setattr(cls, name, attribute(name, key, 'w' in permissions))
+
 class DOMObject:
-    def __init__(self, readonly= False):
-        self.__dict__['_attr'] = {
-            'id':        ['id', 'string', 'rw'],
-            'title':     ['title', 'string', 'rw'],
-            'lang':      ['lang', 'string', 'rw'],
-            'dir':       ['dir', 'string', 'rw'],
-            'className': ['class', 'string', 'rw'],
-            'computed_style': ['_computed_style', 'local_string', 'rw']
+    _html_attributes = {
+        'id':        ['id', 'string', 'rw'],
+        'title':     ['title', 'string', 'rw'],
+        'lang':      ['lang', 'string', 'rw'],
+        'dir':       ['dir', 'string', 'rw'],
+        'className': ['class', 'string', 'rw'],
+        'computed_style': ['_computed_style', 'local_string', 'rw']
         }
+
+    def __init__(self, readonly= False):
         self._readonly= readonly
         self._sub_element = None
 
@@ -122,29 +459,6 @@ class DOMObject:
         self._readonly= value
     
     def __getattr__(self, key):
-        attr = self._attr.get(key)
-        if attr and 'r' in attr[_PERMISSIONS]:
-            if attr[_TYPE] == 'string':
-                return self.getAttribute(attr[_KEY])
-            elif attr[_TYPE] == 'bool':
-                return self.hasAttribute(attr[_KEY])
-            elif attr[_TYPE] == 'long':
-                try:
-                    return int(self.getAttribute(attr[_KEY]))
-                except ValueError:
-                    return 0
-            elif attr[_TYPE] == 'local_string':
-                return self.__dict__[attr[_KEY]]
-            elif attr[_TYPE] == 'local_bool':
-                return self.__dict__[attr[_KEY]]
-            elif attr[_TYPE] == 'local_long':
-                try:
-                    return int(self.__dict__[attr[_KEY]])
-                except ValueError:
-                    return 0
-            else:
-                return self.getAttribute(attr[_KEY])
-        
         if key[:1]=='_':
             raise AttributeError, key
         try:
@@ -156,41 +470,15 @@ class DOMObject:
         return getter()
 
     def __setattr__(self, key, value):
-        attr = self._attr.get(key)
-        if attr:
-            if 'w' in attr[_PERMISSIONS]:
-                if attr[_TYPE] == 'string':
-                    self.setAttribute(attr[_KEY], value)
-                elif attr[_TYPE] == 'bool':
-                    if value:
-                        self.setAttribute(attr[_KEY], '')
-                    else:
-                        self.removeAttribute(attr[_KEY])
-                elif attr[_TYPE] == 'long':
-                    try:
-                        val = int(value)
-                    except ValueError:
-                        val = 0
-                    self.setAttribute(attr[_KEY], val)
-                elif attr[_TYPE] == 'local_string':
-                    self.__dict__[attr[_KEY]] = value
-                elif attr[_TYPE] == 'local_bool':
-                    if value:
-                        self.__dict__[attr[_KEY]] = True
-                    else:
-                        self.__dict__[attr[_KEY]] = False
-                elif attr[_TYPE] == 'local_long':
-                    try:
-                        val = int(value)
-                    except ValueError:
-                        val = 0
-                    self.__dict__[attr[_KEY]] = val
-                else:
-                    self.setAttribute(attr[_KEY], value)
-            else:
-                raise NoModificationAllowedErr(self, key)
-            
-        if key[:1]=='_' or hasattr(self, key):
+        if key[:1]=='_':
+            self.__dict__[key]= value
+            return
+        # old-style instances don't call __set__ on class level descriptors
+        attribute = getattr(self.__class__, key, None)
+        if isinstance(attribute, _Attribute):
+            attribute.__set__(self, value)
+            return
+        if hasattr(self, key):
             self.__dict__[key]= value
             return
     
@@ -210,27 +498,38 @@ class DOMObject:
 class FilterCollection(dom.NodeListByTagName):
     """ Works just like NodeListByTagName, but rather than just filtering by
     tagName, it takes a list of functions to run the check each node against
+
+    A collection of the whole document shares its document's ElementIndex
+    with the other collections made with the same checks, which may look at
+    the node's name and attributes but nothing else. Checks that are
+    closures (of a name to look for, say) are taken to differ every time, so
+    those collections walk the document instead, and so do checks that are
+    methods bound to an object, which the function alone does not identify.
     """
+    _testsAttributes = True
+
     def __init__(self, ownerNode, namespaceURI, *checks):
         dom.NodeListByTagName.__init__(self, ownerNode, namespaceURI, '')
         self._checks = checks
 
-    def _walk(self, element):
-        """ Recursively add a node's child elements to the internal node list
-        when they match the conditions passed to the constructor
+    def _key(self):
+        key = ['filter']
+        for check in self._checks:
+            if getattr(check, 'func_closure', True) is not None:
+                return None
+            if getattr(check, 'im_self', None) is not None:
+                return None
+            key.append((check.func_code, check.func_defaults))
+        return tuple(key)
+
+    def _match(self, element):
+        """ Return whether an element passes all the checks passed to the
+        constructor
         """
-        for childNode in element.childNodes:
-            if childNode.nodeType==dom.Node.ELEMENT_NODE:
-                passed = True
-                for check in self._checks:
-                    check_passed = check(childNode)
-                    if not check_passed:
-                        passed = False
-                if passed:
-                    self._list.append(childNode)
-            if childNode.nodeType in (dom.Node.ELEMENT_NODE,
-                                      dom.Node.ENTITY_REFERENCE_NODE):
-                self._walk(childNode)
+        for check in self._checks:
+            if not check(element):
+                return False
+        return True
 
 class TableRowCollection(dom.NodeListByTagName):
     """ Works like NodeListByTagName, but gets the rows of a table in
@@ -378,32 +677,29 @@ class _HTMLFormValueElement(_HTMLFormControlElement):
         self.value = self.defaultValue
         
 class HTMLHtmlElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'version': ['version', 'string', 'rw']})
+    _html_attributes = {'version': ['version', 'string', 'rw']}
 
 class HTMLHeadElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'profile': ['profile', 'string', 'rw']})
+    _html_attributes = {'profile': ['profile', 'string', 'rw']}
 
 class HTMLLinkElement(_HTMLDisabledElement):
+    _html_attributes = {
+        # DOM HTML Attributes
+        'charset':  ['charset', 'string', 'rw'],
+        'href':     ['href', 'string', 'rw'],
+        'hreflang': ['hreflang', 'string', 'rw'],
+        'media':    ['media', 'string', 'rw'],
+        'rel':      ['rel', 'string', 'rw'],
+        'rev':      ['rev', 'string', 'rw'],
+        'target':   ['target', 'string', 'rw'],
+        'type':     ['type', 'string', 'rw'],
+        # DOM StyleSheet Attributes, only for rel="stylesheet"
+        'sheet':    ['_sheet', 'local_string', 'r']
+        }
+
     def __init__(self, *args, **kwargs):
         _HTMLDisabledElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            # DOM HTML Attributes
-            'charset':  ['charset', 'string', 'rw'],
-            'href':     ['href', 'string', 'rw'],
-            'hreflang': ['hreflang', 'string', 'rw'],
-            'media':    ['media', 'string', 'rw'],
-            'rel':      ['rel', 'string', 'rw'],
-            'rev':      ['rev', 'string', 'rw'],
-            'target':   ['target', 'string', 'rw'],
-            'type':     ['type', 'string', 'rw']
-            })
         if self.getAttribute('rel') == 'stylesheet':
-            self._attr.update({'sheet':     ['_sheet', 'local_string', 'r']})
-
             if self.getAttribute('type') == 'text/css':
                 self._sheet = CSSStyleSheet(self)
             else:
@@ -413,62 +709,53 @@ class HTMLTitleElement(_HTMLTextElement):
     pass
 
 class HTMLMetaElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'content':   ['content', 'string', 'rw'],
-            'httpEquiv': ['http-equiv', 'string', 'rw'],
-            'name':      ['name', 'string', 'rw'],
-            'scheme':    ['scheme', 'string', 'rw']
-            })
+    _html_attributes = {
+        'content':   ['content', 'string', 'rw'],
+        'httpEquiv': ['http-equiv', 'string', 'rw'],
+        'name':      ['name', 'string', 'rw'],
+        'scheme':    ['scheme', 'string', 'rw']
+        }
     
 class HTMLBaseElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'href':     ['href', 'string', 'rw'],
-            'target':   ['target', 'string', 'rw'],
-            })
+    _html_attributes = {
+        'href':     ['href', 'string', 'rw'],
+        'target':   ['target', 'string', 'rw'],
+        }
 
 class HTMLIsIndexElement(_HTMLBaseFormElement):
-    def __init__(self, *args, **kwargs):
-        _HTMLBaseFormElement.__init__(self, *args, **kwargs)
-        self._attr.update({'prompt': ['prompt', 'string', 'rw']})
+    _html_attributes = {'prompt': ['prompt', 'string', 'rw']}
     
 class HTMLStyleElement(_HTMLDisabledElement):
+    _html_attributes = {
+        'media':    ['media', 'string', 'rw'],
+        'type':     ['type', 'string', 'rw'],
+        # DOM StyleSheet Attributes
+        'sheet':     ['_sheet', 'local_string', 'r']
+        }
+
     def __init__(self, *args, **kwargs):
         _HTMLDisabledElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'media':    ['media', 'string', 'rw'],
-            'type':     ['type', 'string', 'rw'],
-            # DOM StyleSheet Attributes
-            'sheet':     ['_sheet', 'local_string', 'r']
-            })
         self._sheet = StyleSheet(self)
 
 class HTMLBodyElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'aLink':         ['alink', 'string', 'rw'],
-            'background':    ['background', 'string', 'rw'],
-            'bgColor':       ['bgcolor', 'string', 'rw'],
-            'link':          ['link', 'string', 'rw'],
-            'text':          ['text', 'string', 'rw'],
-            'vLink':         ['vlink', 'string', 'rw'],
-            })
+    _html_attributes = {
+        'aLink':         ['alink', 'string', 'rw'],
+        'background':    ['background', 'string', 'rw'],
+        'bgColor':       ['bgcolor', 'string', 'rw'],
+        'link':          ['link', 'string', 'rw'],
+        'text':          ['text', 'string', 'rw'],
+        'vLink':         ['vlink', 'string', 'rw'],
+        }
     
 class HTMLFormElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'name':          ['name', 'string', 'rw'],
-            'acceptCharset': ['accept-charset', 'string', 'rw'],
-            'action':        ['action', 'string', 'rw'],
-            'enctype':       ['enctype', 'string', 'rw'],
-            'method':        ['method', 'string', 'rw'],
-            'target':        ['target', 'string', 'rw']
-            })
+    _html_attributes = {
+        'name':          ['name', 'string', 'rw'],
+        'acceptCharset': ['accept-charset', 'string', 'rw'],
+        'action':        ['action', 'string', 'rw'],
+        'enctype':       ['enctype', 'string', 'rw'],
+        'method':        ['method', 'string', 'rw'],
+        'target':        ['target', 'string', 'rw']
+        }
         
     def _get_elements(self):
         """ Returns a collection of all form control elements in the form. """
@@ -491,15 +778,13 @@ class HTMLFormElement(HTMLElement):
             element._reset()
         
 class HTMLSelectElement(_HTMLFormControlElement):
-    def __init__(self, *args, **kwargs):
-        _HTMLFormControlElement.__init__(self, *args, **kwargs)        
-        self._attr.update({
-            'name':     ['name', 'string', 'rw'],
-            'disabled': ['disabled', 'bool', 'rw'],
-            'multiple': ['multiple', 'bool', 'rw'], 
-            'size':     ['size', 'long', 'rw'],
-            'tabIndex': ['tabindex', 'long', 'rw']
-            })
+    _html_attributes = {
+        'name':     ['name', 'string', 'rw'],
+        'disabled': ['disabled', 'bool', 'rw'],
+        'multiple': ['multiple', 'bool', 'rw'],
+        'size':     ['size', 'long', 'rw'],
+        'tabIndex': ['tabindex', 'long', 'rw']
+        }
 
     def _get_type(self):
         if self.muliple:
@@ -553,22 +838,21 @@ class HTMLSelectElement(_HTMLFormControlElement):
             self.removeChild(option)
 
 class HTMLOptGroupElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'disabled': ['disabled', 'bool', 'rw'],        
-            'label':    ['label', 'string', 'rw'],        
-            })
+    _html_attributes = {
+        'disabled': ['disabled', 'bool', 'rw'],
+        'label':    ['label', 'string', 'rw'],
+        }
 
 class HTMLOptionElement(_HTMLBaseFormElement,_HTMLTextElement):
+    _html_attributes = {
+        'disabled': ['disabled', 'bool', 'rw'],
+        'label':    ['label', 'string', 'rw'],
+        }
+
     def __init__(self, *args, **kwargs):
         _HTMLBaseFormElement.__init__(self, *args, **kwargs)
         self.defaultSelected = self.hasAttribute('selected')
         self._selected = self.defaultSelected
-        self._attr.update({
-            'disabled': ['disabled', 'bool', 'rw'],        
-            'label':    ['label', 'string', 'rw'],        
-            })
 
     def _reset(self):
         self.selected = self.defaultSelected
@@ -605,26 +889,27 @@ class HTMLOptionElement(_HTMLBaseFormElement,_HTMLTextElement):
 
 class HTMLInputElement(_HTMLFormValueElement,_HTMLFocusBlurElement,
                        _HTMLClickElement,_HTMLSelectElement):
+    _html_attributes = {
+        'accept':   ['accept', 'string', 'rw'],
+        'accessKey': ['accesskey', 'string', 'rw'],
+        'align':    ['align', 'string', 'rw'],
+        'alt':      ['alt', 'string', 'rw'],
+        'checked':  ['_checked', 'local_bool', 'rw'],
+        'disabled': ['disabled', 'bool', 'rw'],
+        'maxLength': ['maxlength', 'long', 'rw'],
+        'name':      ['name', 'string', 'rw'],
+        'readOnly':  ['readonly', 'boolean', 'rw'],
+        'size':      ['size', 'long', 'rw'],
+        'src':       ['src', 'string', 'rw'],
+        'tabIndex':  ['tabindex', 'long', 'rw'],
+        'type':      ['type', 'string', 'rw'],
+        'useMap':    ['usemap', 'string', 'rw'],
+        'value':     ['_value', 'local_string', 'rw']
+        }
+
     def __init__(self, *args, **kwargs):
         _HTMLFormValueElement.__init__(self, *args, **kwargs)
 
-        self._attr.update({
-            'accept':   ['accept', 'string', 'rw'],        
-            'accessKey': ['accesskey', 'string', 'rw'],        
-            'align':    ['align', 'string', 'rw'],        
-            'alt':      ['alt', 'string', 'rw'],
-            'checked':  ['_checked', 'local_bool', 'rw'],            
-            'disabled': ['disabled', 'bool', 'rw'],
-            'maxLength': ['maxlength', 'long', 'rw'],            
-            'name':      ['name', 'string', 'rw'],        
-            'readOnly':  ['readonly', 'boolean', 'rw'],        
-            'size':      ['size', 'long', 'rw'],        
-            'src':       ['src', 'string', 'rw'],        
-            'tabIndex':  ['tabindex', 'long', 'rw'],        
-            'type':      ['type', 'string', 'rw'],        
-            'useMap':    ['usemap', 'string', 'rw'],        
-            'value':     ['_value', 'local_string', 'rw']
-            })
         self.__dict__['defaultChecked'] = False
         self.__dict__['_checked'] = False
 
@@ -646,21 +931,22 @@ class HTMLInputElement(_HTMLFormValueElement,_HTMLFocusBlurElement,
 
 class HTMLTextAreaElement(_HTMLFormControlElement,_HTMLFocusBlurElement,
                           _HTMLSelectElement):
+    _html_attributes = {
+        'accessKey': ['accesskey', 'string', 'rw'],
+        'cols':     ['cols', 'long', 'rw'],
+        'disabled': ['disabled', 'bool', 'rw'],
+        'name':      ['name', 'string', 'rw'],
+        'readOnly':  ['readonly', 'boolean', 'rw'],
+        'rows':      ['rows', 'long', 'rw'],
+        'tabIndex':  ['tabindex', 'long', 'rw'],
+        'type':      ['type', 'string', 'rw'],
+        }
+
     def __init__(self, *args, **kwargs):
         _HTMLFormControlElement.__init__(self, *args, **kwargs)
         self.defaultValue = self.textContent
         self.value = self.defaultValue
 
-        self._attr.update({
-            'accessKey': ['accesskey', 'string', 'rw'],        
-            'cols':     ['cols', 'long', 'rw'],        
-            'disabled': ['disabled', 'bool', 'rw'],
-            'name':      ['name', 'string', 'rw'],        
-            'readOnly':  ['readonly', 'boolean', 'rw'],        
-            'rows':      ['rows', 'long', 'rw'],        
-            'tabIndex':  ['tabindex', 'long', 'rw'],        
-            'type':      ['type', 'string', 'rw'],        
-            })
         
     def _reset(self):
         """ Basic function to reset form value """
@@ -670,273 +956,222 @@ class HTMLTextAreaElement(_HTMLFormControlElement,_HTMLFocusBlurElement,
         return 'textarea'
 
 class HTMLButtonElement(_HTMLBaseFormElement):
-    def __init__(self, *args, **kwargs):
-        _HTMLBaseFormElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'accessKey': ['accesskey', 'string', 'rw'],        
-            'disabled': ['disabled', 'bool', 'rw'],
-            'name':     ['name', 'string', 'rw'],        
-            'tabIndex': ['tabindex', 'long', 'rw'],        
-            'type':     ['type', 'string', 'r'],
-            'value':    ['value', 'string', 'rw']
-            })
+    _html_attributes = {
+        'accessKey': ['accesskey', 'string', 'rw'],
+        'disabled': ['disabled', 'bool', 'rw'],
+        'name':     ['name', 'string', 'rw'],
+        'tabIndex': ['tabindex', 'long', 'rw'],
+        'type':     ['type', 'string', 'r'],
+        'value':    ['value', 'string', 'rw']
+        }
     
 class HTMLLabelElement(_HTMLBaseFormElement):
-    def __init__(self, *args, **kwargs):
-        _HTMLBaseFormElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'accessKey': ['accesskey', 'string', 'rw'],        
-            'htmlFor':  ['for', 'string', 'rw']
-            })
+    _html_attributes = {
+        'accessKey': ['accesskey', 'string', 'rw'],
+        'htmlFor':  ['for', 'string', 'rw']
+        }
 
 class HTMLFieldSetElement(_HTMLBaseFormElement):pass
 
 class HTMLLegendElement(_HTMLBaseFormElement):
-    def __init__(self, *args, **kwargs):
-        _HTMLBaseFormElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'accessKey': ['accesskey', 'string', 'rw'],        
-            'align':    ['align', 'string', 'rw']
-            })    
+    _html_attributes = {
+        'accessKey': ['accesskey', 'string', 'rw'],
+        'align':    ['align', 'string', 'rw']
+        }
 
 class HTMLULstElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'compact': ['compact', 'bool', 'rw'],        
-            'type':    ['type', 'string', 'rw']
-            })
+    _html_attributes = {
+        'compact': ['compact', 'bool', 'rw'],
+        'type':    ['type', 'string', 'rw']
+        }
 
 class HTMLOLstElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'compact': ['compact', 'bool', 'rw'],
-            'start':   ['start', 'long', 'rw'],
-            'type':    ['type', 'string', 'rw']
-            })
+    _html_attributes = {
+        'compact': ['compact', 'bool', 'rw'],
+        'start':   ['start', 'long', 'rw'],
+        'type':    ['type', 'string', 'rw']
+        }
         
 class HTMLDListElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'compact': ['compact', 'bool', 'rw']})
+    _html_attributes = {'compact': ['compact', 'bool', 'rw']}
 
 class HTMLDirectoryElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'compact': ['compact', 'bool', 'rw']})
+    _html_attributes = {'compact': ['compact', 'bool', 'rw']}
 
 class HTMLMenuElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'compact': ['compact', 'bool', 'rw']})
+    _html_attributes = {'compact': ['compact', 'bool', 'rw']}
 
 class HTMLLIElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'type':  ['type', 'string', 'rw'],
-            'value': ['value', 'long', 'rw']
-            })
+    _html_attributes = {
+        'type':  ['type', 'string', 'rw'],
+        'value': ['value', 'long', 'rw']
+        }
 
 class HTMLDivElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'align': ['align', 'string', 'rw']})
+    _html_attributes = {'align': ['align', 'string', 'rw']}
 
 class HTMLParagraphElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'align': ['align', 'string', 'rw']})
+    _html_attributes = {'align': ['align', 'string', 'rw']}
 
 class HTMLHeadingElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'align': ['align', 'string', 'rw']})
+    _html_attributes = {'align': ['align', 'string', 'rw']}
 
 class HTMLQuoteElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'cite': ['cite', 'string', 'rw']})
+    _html_attributes = {'cite': ['cite', 'string', 'rw']}
         
 class HTMLPreElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'width': ['width', 'long', 'rw']})
+    _html_attributes = {'width': ['width', 'long', 'rw']}
 
 class HTMLBRElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'clear': ['clear', 'string', 'rw']})
+    _html_attributes = {'clear': ['clear', 'string', 'rw']}
         
 class HTMLBaseFontElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'color':  ['color', 'string', 'rw'],
-            'face':   ['face', 'string', 'rw'],
-            'size':   ['size', 'long', 'rw']
-            })
+    _html_attributes = {
+        'color':  ['color', 'string', 'rw'],
+        'face':   ['face', 'string', 'rw'],
+        'size':   ['size', 'long', 'rw']
+        }
         
 class HTMLFontElement(HTMLBaseFontElement):pass
 
 class HTMLHRElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'align':   ['align', 'string', 'rw'],
-            'noShade': ['noshade', 'boolean', 'rw'],
-            'size':    ['size', 'string', 'rw'],
-            'width':   ['width', 'string', 'rw']
-            })
+    _html_attributes = {
+        'align':   ['align', 'string', 'rw'],
+        'noShade': ['noshade', 'boolean', 'rw'],
+        'size':    ['size', 'string', 'rw'],
+        'width':   ['width', 'string', 'rw']
+        }
         
 class HTMLModElement(HTMLElement):
-   def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'cite':     ['cite', 'string', 'rw'],
-            'dateTime': ['datetime', 'string', 'rw']
-            })
+    _html_attributes = {
+        'cite':     ['cite', 'string', 'rw'],
+        'dateTime': ['datetime', 'string', 'rw']
+        }
         
 class HTMLAnchorElement(_HTMLFocusBlurElement):
-    def __init__(self, *args, **kwargs):
-        _HTMLFocusBlurElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'accessKey': ['accesskey', 'string', 'rw'],
-            'charset':   ['charset', 'string', 'rw'],
-            'coords':    ['coords', 'string', 'rw'],
-            'href':      ['href', 'string', 'rw'],
-            'hreflang':  ['hreflang', 'string', 'rw'],
-            'name':      ['name', 'string', 'rw'],
-            'rel':       ['rel', 'string', 'rw'],
-            'rev':       ['rev', 'string', 'rw'],
-            'shape':     ['shape', 'string', 'rw'],
-            'tabIndex':  ['tabindex', 'long', 'rw'],
-            'target':    ['target', 'string', 'rw'],
-            'type':      ['type', 'string', 'rw']
-            })
+    _html_attributes = {
+        'accessKey': ['accesskey', 'string', 'rw'],
+        'charset':   ['charset', 'string', 'rw'],
+        'coords':    ['coords', 'string', 'rw'],
+        'href':      ['href', 'string', 'rw'],
+        'hreflang':  ['hreflang', 'string', 'rw'],
+        'name':      ['name', 'string', 'rw'],
+        'rel':       ['rel', 'string', 'rw'],
+        'rev':       ['rev', 'string', 'rw'],
+        'shape':     ['shape', 'string', 'rw'],
+        'tabIndex':  ['tabindex', 'long', 'rw'],
+        'target':    ['target', 'string', 'rw'],
+        'type':      ['type', 'string', 'rw']
+        }
         
 class HTMLImageElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'name':     ['name', 'string', 'rw'],
-            'align':    ['align', 'string', 'rw'],
-            'alt':      ['alt', 'string', 'rw'],
-            'border':   ['border', 'string', 'rw'],
-            'height':   ['height', 'long', 'rw'],
-            'hspace':   ['hspace', 'long', 'rw'],
-            'isMap':    ['ismap', 'bool', 'rw'],
-            'longDesc': ['longdesc', 'string', 'rw'],
-            'src':      ['src', 'string', 'rw'],
-            'useMap':   ['usemap', 'string', 'rw'],
-            'vspace':   ['vspace', 'long', 'rw'],
-            'width':    ['width', 'long', 'rw']
-            })
+    _html_attributes = {
+        'name':     ['name', 'string', 'rw'],
+        'align':    ['align', 'string', 'rw'],
+        'alt':      ['alt', 'string', 'rw'],
+        'border':   ['border', 'string', 'rw'],
+        'height':   ['height', 'long', 'rw'],
+        'hspace':   ['hspace', 'long', 'rw'],
+        'isMap':    ['ismap', 'bool', 'rw'],
+        'longDesc': ['longdesc', 'string', 'rw'],
+        'src':      ['src', 'string', 'rw'],
+        'useMap':   ['usemap', 'string', 'rw'],
+        'vspace':   ['vspace', 'long', 'rw'],
+        'width':    ['width', 'long', 'rw']
+        }
         
 class HTMLObjectElement(_HTMLBaseFormElement):
+    _html_attributes = {
+        'code':     ['code', 'string', 'rw'],
+        'align':    ['align', 'string', 'rw'],
+        'archive':  ['archive', 'string', 'rw'],
+        'border':   ['border', 'string', 'rw'],
+        'codeBase': ['codebase', 'string', 'rw'],
+        'codeType': ['codetype', 'string', 'rw'],
+        'data':     ['data', 'string', 'rw'],
+        'declare':  ['declare', 'bool', 'rw'],
+        'height':   ['height', 'string', 'rw'],
+        'hspace':   ['hspace', 'long', 'rw'],
+        'name':     ['name', 'string', 'rw'],
+        'standby':  ['standby', 'string', 'rw'],
+        'tabIndex': ['tabindex', 'long', 'rw'],
+        'type':     ['type', 'string', 'rw'],
+        'useMap':   ['usemap', 'string', 'rw'],
+        'vspace':   ['vspace', 'long', 'rw'],
+        'width':    ['width', 'long', 'rw']
+        }
+
     def __init__(self, *args, **kwargs):
         _HTMLBaseFormElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'code':     ['code', 'string', 'rw'],
-            'align':    ['align', 'string', 'rw'],
-            'archive':  ['archive', 'string', 'rw'],
-            'border':   ['border', 'string', 'rw'],
-            'codeBase': ['codebase', 'string', 'rw'],
-            'codeType': ['codetype', 'string', 'rw'],
-            'data':     ['data', 'string', 'rw'],
-            'declare':  ['declare', 'bool', 'rw'],
-            'height':   ['height', 'string', 'rw'],
-            'hspace':   ['hspace', 'long', 'rw'],
-            'name':     ['name', 'string', 'rw'],
-            'standby':  ['standby', 'string', 'rw'],
-            'tabIndex': ['tabindex', 'long', 'rw'],
-            'type':     ['type', 'string', 'rw'],
-            'useMap':   ['usemap', 'string', 'rw'],
-            'vspace':   ['vspace', 'long', 'rw'],
-            'width':    ['width', 'long', 'rw']
-            })
         self._contentDocument = None
         
     def _get_contentDocument(self):
         return self._contentDocument
         
 class HTMLParamElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'name':      ['name', 'string', 'rw'],
-            'type':      ['type', 'string', 'rw'],
-            'value':     ['value', 'string', 'rw'],
-            'valueType': ['valuetype', 'string', 'rw']
-            })
+    _html_attributes = {
+        'name':      ['name', 'string', 'rw'],
+        'type':      ['type', 'string', 'rw'],
+        'value':     ['value', 'string', 'rw'],
+        'valueType': ['valuetype', 'string', 'rw']
+        }
         
 class HTMLAppletElement         (HTMLElement):
-    def __init__(self, *args, **kwargs):
-        _HTMLBaseFormElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'align':    ['align', 'string', 'rw'],
-            'alt':      ['alt', 'string', 'rw'],
-            'archive':  ['archive', 'string', 'rw'],
-            'code':     ['code', 'string', 'rw'],
-            'codeBase': ['codebase', 'string', 'rw'],
-            'height':   ['height', 'string', 'rw'],
-            'hspace':   ['hspace', 'long', 'rw'],
-            'name':     ['name', 'string', 'rw'],
-            'object':   ['object', 'string', 'rw'],
-            'vspace':   ['vspace', 'long', 'rw'],
-            'width':    ['width', 'long', 'rw']
-            })
+    _html_attributes = {
+        'align':    ['align', 'string', 'rw'],
+        'alt':      ['alt', 'string', 'rw'],
+        'archive':  ['archive', 'string', 'rw'],
+        'code':     ['code', 'string', 'rw'],
+        'codeBase': ['codebase', 'string', 'rw'],
+        'height':   ['height', 'string', 'rw'],
+        'hspace':   ['hspace', 'long', 'rw'],
+        'name':     ['name', 'string', 'rw'],
+        'object':   ['object', 'string', 'rw'],
+        'vspace':   ['vspace', 'long', 'rw'],
+        'width':    ['width', 'long', 'rw']
+        }
 
 class HTMLMapElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'name': ['name', 'string', 'rw']})
+    _html_attributes = {'name': ['name', 'string', 'rw']}
 
     def _get_areas(self):
         return self.getElementsByTagName('area')
         
 class HTMLAreaElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'accessKey': ['accesskey', 'string', 'rw'],
-            'alt':       ['alt', 'string', 'rw'],
-            'coords':    ['coords', 'string', 'rw'],
-            'href':      ['href', 'string', 'rw'],
-            'noHref':    ['nohref', 'bool', 'rw'],
-            'shape':     ['shape', 'string', 'rw'],
-            'tabIndex':  ['tabindex', 'long', 'rw'],
-            'target':    ['target', 'string', 'rw']
-            })
+    _html_attributes = {
+        'accessKey': ['accesskey', 'string', 'rw'],
+        'alt':       ['alt', 'string', 'rw'],
+        'coords':    ['coords', 'string', 'rw'],
+        'href':      ['href', 'string', 'rw'],
+        'noHref':    ['nohref', 'bool', 'rw'],
+        'shape':     ['shape', 'string', 'rw'],
+        'tabIndex':  ['tabindex', 'long', 'rw'],
+        'target':    ['target', 'string', 'rw']
+        }
         
 class HTMLScriptElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'text':    ['text', 'string', 'rw'],
-            'htmlFor': ['for', 'string', 'rw'],
-            'event':   ['event', 'string', 'rw'],
-            'charset': ['charset', 'string', 'rw'],
-            'defer':   ['defer', 'bool', 'rw'],
-            'src':     ['src', 'string', 'rw'],
-            'type':    ['type', 'string', 'rw']
-            })
+    _html_attributes = {
+        'text':    ['text', 'string', 'rw'],
+        'htmlFor': ['for', 'string', 'rw'],
+        'event':   ['event', 'string', 'rw'],
+        'charset': ['charset', 'string', 'rw'],
+        'defer':   ['defer', 'bool', 'rw'],
+        'src':     ['src', 'string', 'rw'],
+        'type':    ['type', 'string', 'rw']
+        }
         
 class HTMLTableElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'align':       ['align', 'string', 'rw'],
-            'bgColor':     ['bgcolor', 'string', 'rw'],
-            'border':      ['border', 'string', 'rw'],
-            'cellPadding': ['cellpadding', 'string', 'rw'],
-            'cellSpacing': ['cellspacing', 'bool', 'rw'],
-            'frame':       ['frame', 'string', 'rw'],
-            'rules':       ['rules', 'string', 'rw'],
-            'summary':     ['summary', 'string', 'rw'],
-            'width':       ['width', 'string', 'rw']
-            })
+    _html_attributes = {
+        'align':       ['align', 'string', 'rw'],
+        'bgColor':     ['bgcolor', 'string', 'rw'],
+        'border':      ['border', 'string', 'rw'],
+        'cellPadding': ['cellpadding', 'string', 'rw'],
+        'cellSpacing': ['cellspacing', 'bool', 'rw'],
+        'frame':       ['frame', 'string', 'rw'],
+        'rules':       ['rules', 'string', 'rw'],
+        'summary':     ['summary', 'string', 'rw'],
+        'width':       ['width', 'string', 'rw']
+        }
 
     def _get_caption(self):
         caps = self.getElementsByTagName('caption')
@@ -1041,31 +1276,25 @@ class HTMLTableElement(HTMLElement):
         self.removeChild(oldrow)
             
 class HTMLTableCaptionElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({'align': ['align', 'string', 'rw']})
+    _html_attributes = {'align': ['align', 'string', 'rw']}
         
 class HTMLTableColElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'align':  ['align', 'string', 'rw'],
-            'ch':     ['char', 'string', 'rw'],
-            'chOff':  ['charoff', 'string', 'rw'],
-            'span':   ['span', 'long', 'rw'],
-            'vAlign': ['valign', 'string', 'rw'],
-            'width':  ['width', 'string', 'rw']
-            })
+    _html_attributes = {
+        'align':  ['align', 'string', 'rw'],
+        'ch':     ['char', 'string', 'rw'],
+        'chOff':  ['charoff', 'string', 'rw'],
+        'span':   ['span', 'long', 'rw'],
+        'vAlign': ['valign', 'string', 'rw'],
+        'width':  ['width', 'string', 'rw']
+        }
         
 class HTMLTableSectionElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'align':  ['align', 'string', 'rw'],
-            'ch':     ['char', 'string', 'rw'],
-            'chOff':  ['charoff', 'string', 'rw'],
-            'vAlign': ['valign', 'string', 'rw']
-            })
+    _html_attributes = {
+        'align':  ['align', 'string', 'rw'],
+        'ch':     ['char', 'string', 'rw'],
+        'chOff':  ['charoff', 'string', 'rw'],
+        'vAlign': ['valign', 'string', 'rw']
+        }
 
     def _get_rows(self):
         return self.getElementsByTagName('tr')
@@ -1101,15 +1330,13 @@ def _find_self(self, list):
             return i
 
 class HTMLTableRowElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'align':   ['align', 'string', 'rw'],
-            'bgColor': ['bgcolor', 'string', 'rw'],
-            'ch':      ['char', 'string', 'rw'],
-            'chOff':   ['charoff', 'string', 'rw'],
-            'vAlign':  ['valign', 'string', 'rw'],
-            })
+    _html_attributes = {
+        'align':   ['align', 'string', 'rw'],
+        'bgColor': ['bgcolor', 'string', 'rw'],
+        'ch':      ['char', 'string', 'rw'],
+        'chOff':   ['charoff', 'string', 'rw'],
+        'vAlign':  ['valign', 'string', 'rw'],
+        }
 
     def _get_rowIndex(self):
         table = _up_to(self, ('table',))
@@ -1142,24 +1369,22 @@ class HTMLTableRowElement(HTMLElement):
         self.removeChild(oldcell)      
         
 class HTMLTableCellElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'abbr':    ['abbr', 'string', 'rw'],
-            'align':   ['align', 'string', 'rw'],
-            'axis':    ['axis', 'string', 'rw'],
-            'bgColor': ['bgcolor', 'string', 'rw'],
-            'ch':      ['char', 'string', 'rw'],
-            'chOff':   ['charoff', 'string', 'rw'],
-            'colSpan': ['colspan', 'long', 'rw'],
-            'headers': ['headers', 'string', 'rw'],
-            'height':  ['height', 'string', 'rw'],
-            'noWrap':  ['nowrap', 'bool', 'rw'],
-            'rowSpan': ['rowspan', 'long', 'rw'],
-            'scope':   ['scope', 'string', 'rw'],
-            'vAlign':  ['valign', 'string', 'rw'],
-            'width':   ['width', 'string', 'rw']
-            })
+    _html_attributes = {
+        'abbr':    ['abbr', 'string', 'rw'],
+        'align':   ['align', 'string', 'rw'],
+        'axis':    ['axis', 'string', 'rw'],
+        'bgColor': ['bgcolor', 'string', 'rw'],
+        'ch':      ['char', 'string', 'rw'],
+        'chOff':   ['charoff', 'string', 'rw'],
+        'colSpan': ['colspan', 'long', 'rw'],
+        'headers': ['headers', 'string', 'rw'],
+        'height':  ['height', 'string', 'rw'],
+        'noWrap':  ['nowrap', 'bool', 'rw'],
+        'rowSpan': ['rowspan', 'long', 'rw'],
+        'scope':   ['scope', 'string', 'rw'],
+        'vAlign':  ['valign', 'string', 'rw'],
+        'width':   ['width', 'string', 'rw']
+        }
         
     def _get_cellIndex(self):
         row = _up_to(self, ('tr'))
@@ -1167,45 +1392,45 @@ class HTMLTableCellElement(HTMLElement):
         return index
         
 class HTMLFrameSetElement(HTMLElement):
-    def __init__(self, *args, **kwargs):
-        HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'cols': ['cols', 'string', 'rw'],
-            'rows': ['rows', 'string', 'rw']
-            })
+    _html_attributes = {
+        'cols': ['cols', 'string', 'rw'],
+        'rows': ['rows', 'string', 'rw']
+        }
         
 class HTMLFrameElement(HTMLElement):
+    _html_attributes = {
+        'contentDocument':  ['_contentDocument', 'local_string', 'r'],
+        'frameBorder':      ['frameborder', 'string', 'rw'],
+        'longDesc':         ['longdesc', 'string', 'rw'],
+        'marginHeight':     ['marginheight', 'string', 'rw'],
+        'marginWidth':      ['marginwidth', 'string', 'rw'],
+        'name':             ['name', 'string', 'rw'],
+        'noResize':         ['noresize', 'bool', 'rw'],
+        'scrolling':        ['scrolling', 'string', 'rw'],
+        'src':              ['src', 'string', 'rw']
+        }
+
     def __init__(self, *args, **kwargs):
         HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'contentDocument':  ['_contentDocument', 'local_string', 'r'],
-            'frameBorder':      ['frameborder', 'string', 'rw'],
-            'longDesc':         ['longdesc', 'string', 'rw'],
-            'marginHeight':     ['marginheight', 'string', 'rw'],
-            'marginWidth':      ['marginwidth', 'string', 'rw'],
-            'name':             ['name', 'string', 'rw'],
-            'noResize':         ['noresize', 'bool', 'rw'],
-            'scrolling':        ['scrolling', 'string', 'rw'],
-            'src':              ['src', 'string', 'rw']
-            })
         self._contentDocument = None
 
 class HTMLIFrameElement(HTMLElement):
+    _html_attributes = {
+        'contentDocument':  ['_contentDocument', 'local_string', 'r'],
+        'align':            ['align', 'string', 'rw'],
+        'frameBorder':      ['frameborder', 'string', 'rw'],
+        'height':           ['height', 'string', 'rw'],
+        'longDesc':         ['longdesc', 'string', 'rw'],
+        'marginHeight':     ['marginheight', 'string', 'rw'],
+        'marginWidth':      ['marginwidth', 'string', 'rw'],
+        'name':             ['name', 'string', 'rw'],
+        'scrolling':        ['scrolling', 'string', 'rw'],
+        'src':              ['src', 'string', 'rw'],
+        'width':            ['width', 'string', 'rw']
+        }
+
     def __init__(self, *args, **kwargs):
         HTMLElement.__init__(self, *args, **kwargs)
-        self._attr.update({
-            'contentDocument':  ['_contentDocument', 'local_string', 'r'],
-            'align':            ['align', 'string', 'rw'],
-            'frameBorder':      ['frameborder', 'string', 'rw'],
-            'height':           ['height', 'string', 'rw'],
-            'longDesc':         ['longdesc', 'string', 'rw'],
-            'marginHeight':     ['marginheight', 'string', 'rw'],
-            'marginWidth':      ['marginwidth', 'string', 'rw'],
-            'name':             ['name', 'string', 'rw'],
-            'scrolling':        ['scrolling', 'string', 'rw'],
-            'src':              ['src', 'string', 'rw'],
-            'width':            ['width', 'string', 'rw']
-            })
         self._contentDocument = None
 
 
@@ -1261,13 +1486,20 @@ def _lookup_html_element(tagName):
 
 def _copy_and_extend(source_node, dest_node, owner_document):
     """ Walk through the DOM tree of the provided source_node and copy the whole
-    structure into the dest_node. Also take any HTML-specific elements found and
-    extend them into their HTML-specific version before copying
+    structure into the dest_node, attributes and text included. HTML-specific
+    elements are created as their HTML-specific version directly while
+    copying (see HTMLDocument._createNodeLike), so the tree is only built once
+
+    The copy is built in bulk, so the ancestors of dest_node and of the copied
+    nodes are only marked as changed once, at the end.
     """
-    for childNode in source_node.childNodes:
-        newChildNode = owner_document.createElement(childNode.tagName)
-        dest_node.appendChild(newChildNode)
-        _copy_and_extend(childNode, newChildNode, owner_document)
+    owner_document._beginBuild()
+    try:
+        for childNode in source_node.childNodes:
+            dest_node.appendChild(childNode._recurse(
+                True, clone=True, ownerDocument=owner_document))
+    finally:
+        owner_document._endBuild()
 
 #        if self._current_node.childNodes:
 #            self._current_node = self._current_node.firstChild
@@ -1307,16 +1539,20 @@ class HTMLDocument(dom.Document):
 
         self._referrer = referrer
 
+        # A document only ever has the one view
+        self._defaultView = ViewCSS(self)
+
         if document:
             # copy the original document
             document._cloneTo(self)
+            self._ownerDocument = self
             self._documentURI = self._documentURI or uri
 
             # Convert the DOM over to HTML and copy children over
             _copy_and_extend(document, self, self)
 
     def _get_defaultView(self):
-        return ViewCSS(self)
+        return self._defaultView
 
     def _get_styleSheets(self):
         return self._styleSheets
@@ -1332,6 +1568,12 @@ class HTMLDocument(dom.Document):
             return self
         return None
 
+    def _createNodeLike(self, node):
+        """ Copy elements into their HTML-specific classes """
+        if node.nodeType == dom.Node.ELEMENT_NODE:
+            return _lookup_html_element(node.localName or node.nodeName)()
+        return dom.Document._createNodeLike(self, node)
+
     def createElement(self, tagName):
         element = _lookup_html_element(tagName)(self, dom.NONS, tagName, None)
         element._setDefaultAttributes()
@@ -1460,6 +1702,14 @@ class HTMLDocument(dom.Document):
 # ------------------
 
 class StyleSheet(DOMObject):
+    _html_attributes = {
+        'disabled':         ['_disabled', 'local_bool', 'rw'],
+        'ownerNode':        ['_ownerNode', 'local_string', 'r'],
+        'parentStyleSheet': ['_parentStyleSheet', 'local_string', 'r'],
+
+        'media':             ['_media', 'local_string', 'r']
+        }
+
     def __init__(self, ownerNode, parentSheet=None):
         DOMObject.__init__(self)
 
@@ -1467,13 +1717,6 @@ class StyleSheet(DOMObject):
         self._parentStyleSheet = parentSheet
         self._disabled = False
         
-        self._attr.update({
-            'disabled':         ['_disabled', 'local_bool', 'rw'],
-            'ownerNode':        ['ownerNode', 'local_string', 'r'],
-            'parentStyleSheet': ['parentStypeSheet', 'local_string', 'r'],
-
-            'media':             ['_media', 'local_string', 'r']
-            })
         # We only ever need a single instance of this MediaList
         if self._ownerNode:
             media = self._ownerNode.media
@@ -1582,57 +1825,366 @@ class MediaList(DOMObject):
 #        StyleSheet.__init__(self, ownerNode, parentSheet)
 #        self._sub_element = css.CSSStyleSheet(
 
+# The user agent's default style. It is parsed only once; every computed style
+# starts out from its properties.
+_DEFAULT_CSS = u"""
+    position: static;
+    display: inline;
+    visibility: visible;
+    z-index: auto;
+    overflow: visible;
+    white-space: normal;
+    clip: auto;
+    float: none;
+    clear: none;
+
+    width: auto;
+    height: auto;
+    top: auto;
+    right: auto;
+    bottom: auto;
+    left: auto;
+
+    margin-top:    0px;
+    margin-bottom: 0px;
+    margin-right:  0px;
+    margin-left:   0px;
+
+    padding-top:    0px;
+    padding-bottom: 0px;
+    padding-right:  0px;
+    padding-left:   0px;
+
+    border-top-width:    0px;
+    border-bottom-width: 0px;
+    border-right-width:  0px;
+    border-left-width:   0px;
+
+    border-top-color:    #000000;
+    border-bottom-color: #000000;
+    border-right-color:  #000000;
+    border-left-color:   #000000;
+
+    border-top-style:    none;
+    border-bottom-style: none;
+    border-right-style:  none;
+    border-left-style:   none;
+    """
+
+# Properties whose computed value is taken from the parent's computed style
+# (CSS 2.1 "Inherited: yes")
+INHERITED_PROPERTIES = set([
+    'azimuth', 'border-collapse', 'border-spacing', 'caption-side', 'color',
+    'cursor', 'direction', 'elevation', 'empty-cells', 'font-family',
+    'font-size', 'font-style', 'font-variant', 'font-weight', 'letter-spacing',
+    'line-height', 'list-style-image', 'list-style-position',
+    'list-style-type', 'orphans', 'pitch-range', 'pitch', 'quotes',
+    'richness', 'speak-header', 'speak-numeral', 'speak-punctuation', 'speak',
+    'speech-rate', 'stress', 'text-align', 'text-indent', 'text-transform',
+    'visibility', 'voice-family', 'volume', 'white-space', 'widows',
+    'word-spacing'
+    ])
+
+_default_style = css.CSSStyleDeclaration(cssText=_DEFAULT_CSS, readonly=True)
+_default_properties = {}
+for _property in _default_style.getProperties():
+    _default_properties[_property.normalname] = _property
+del _property
+
+def _make_style(parent_properties, style_text=''):
+    """ Build a read-only computed style from the default style, the inherited
+    properties of parent_properties and the declarations in style_text (the
+    element's style attribute). Properties are shared with the declarations
+    they come from rather than copied.
+
+    Returns the (style, properties) pair, properties mapping normalized names
+    to the effective Property objects of style.
+    """
+    properties = _default_properties.copy()
+    for name, property in parent_properties.iteritems():
+        if name in INHERITED_PROPERTIES:
+            properties[name] = property
+    if style_text:
+        try:
+            inline = css.CSSStyleDeclaration(cssText=style_text)
+        except xml.dom.DOMException:
+            # Invalid declarations in a style attribute are ignored
+            inline = None
+        if inline is not None:
+            for property in inline.getProperties():
+                properties[property.normalname] = property
+
+    style = css.CSSStyleDeclaration(readonly=True)
+    seq = [properties[p.normalname] for p in _default_style.seq]
+    for name, property in properties.iteritems():
+        if name not in _default_properties:
+            seq.append(property)
+    style.seq = seq
+    return style, properties
+
+# Resolved styles
+# ---------------
+
+# The keywords of the properties ComputedStyle keeps as enumerations, the
+# initial value first. A resolved value is always the string in its tuple.
+DISPLAYS = ('inline', 'block', 'list-item', 'run-in', 'inline-block',
+            'table', 'inline-table', 'table-row-group', 'table-header-group',
+            'table-footer-group', 'table-row', 'table-column-group',
+            'table-column', 'table-cell', 'table-caption', 'none')
+POSITIONS = ('static', 'relative', 'absolute', 'fixed')
+FLOATS = ('none', 'left', 'right')
+WHITE_SPACES = ('normal', 'pre', 'nowrap', 'pre-wrap', 'pre-line')
+
+# The fields of a ComputedStyle, in the order they are resolved: font-size
+# first as em lengths depend on it, border styles before border widths.
+# Each is (field, property, kind, initial value), kind being one of the
+# enumerations above, 'length', 'border-width', 'font-size', 'keyword' (lower
+# cased) or 'text' (as is).
+_LAYOUT_FIELDS = [
+    ('fontSize', 'font-size', 'font-size', 16.0),
+    ('display', 'display', DISPLAYS, 'inline'),
+    ('position', 'position', POSITIONS, 'static'),
+    ('cssFloat', 'float', FLOATS, 'none'),
+    ('whiteSpace', 'white-space', WHITE_SPACES, 'normal'),
+    ('clear', 'clear', 'keyword', 'none'),
+    ('visibility', 'visibility', 'keyword', 'visible'),
+    ('overflow', 'overflow', 'keyword', 'visible'),
+    ('color', 'color', 'text', '#000000'),
+    ('fontFamily', 'font-family', 'text', ''),
+    ('fontStyle', 'font-style', 'keyword', 'normal'),
+    ('fontVariant', 'font-variant', 'keyword', 'normal'),
+    ('fontWeight', 'font-weight', 'keyword', 'normal'),
+    ('textAlign', 'text-align', 'keyword', 'left'),
+    ]
+for _name in ('width', 'height', 'top', 'right', 'bottom', 'left'):
+    _LAYOUT_FIELDS.append((_name, _name, 'length', None))
+for _side in ('Top', 'Right', 'Bottom', 'Left'):
+    _property = _side.lower()
+    _LAYOUT_FIELDS.extend([
+        ('margin' + _side, 'margin-' + _property, 'length', 0.0),
+        ('padding' + _side, 'padding-' + _property, 'length', 0.0),
+        ('border%sStyle' % _side, 'border-%s-style' % _property,
+         'keyword', 'none'),
+        ('border%sWidth' % _side, 'border-%s-width' % _property,
+         'border-width', 3.0),
+        ('border%sColor' % _side, 'border-%s-color' % _property,
+         'text', '#000000'),
+        ])
+del _name, _side, _property
+
+_ENUMERATIONS = {}
+for _values in (DISPLAYS, POSITIONS, FLOATS, WHITE_SPACES):
+    _ENUMERATIONS[_values] = dict([(_value, _value) for _value in _values])
+del _values, _value
+
+_length = re.compile(r'^([-+]?(?:\d+(?:\.\d*)?|\.\d+))([a-z]*)$')
+
+# CSS 2.1 absolute units at 96 pixels per inch
+_PX_PER_UNIT = {'px': 1.0, 'in': 96.0, 'cm': 96 / 2.54, 'mm': 96 / 25.4,
+                'pt': 96 / 72.0, 'pc': 16.0}
+_FONT_SIZES = {'xx-small': 9.0, 'x-small': 10.0, 'small': 13.0,
+               'medium': 16.0, 'large': 18.0, 'x-large': 24.0,
+               'xx-large': 32.0}
+_BORDER_WIDTHS = {'thin': 1.0, 'medium': 3.0, 'thick': 5.0}
+
+def _px(text, font_size):
+    """ Return the length text in pixels, em and ex being relative to
+    font_size, or None if it is not a length (auto, a percentage...) """
+    mo = _length.match(text)
+    if mo is None:
+        return None
+    number, unit = float(mo.group(1)), mo.group(2)
+    if unit in _PX_PER_UNIT:
+        return number * _PX_PER_UNIT[unit]
+    elif unit == 'em':
+        return number * font_size
+    elif unit == 'ex':
+        return number * font_size / 2
+    elif unit == '' and number == 0:
+        return 0.0
+    return None
+
+def _font_size(text, parent_size):
+    """ Return the font size text in pixels, given the parent's """
+    if text in _FONT_SIZES:
+        return _FONT_SIZES[text]
+    elif text == 'larger':
+        return parent_size * 1.2
+    elif text == 'smaller':
+        return parent_size / 1.2
+    elif text.endswith('%'):
+        try:
+            return float(text[:-1]) * parent_size / 100
+        except ValueError:
+            return parent_size
+    size = _px(text, parent_size)
+    if size is None:
+        return parent_size
+    return size
+
+class ComputedStyle(object):
+    """ A read-only computed style with its values resolved for layout, see
+    ViewCSS.getLayoutStyle.
+
+    The fields are named like the CSS2Properties attributes (see
+    _LAYOUT_FIELDS). Lengths are numbers of pixels, or None for auto and
+    percentages, which depend on the containing block. display, position,
+    cssFloat and whiteSpace are keywords from DISPLAYS, POSITIONS, FLOATS and
+    WHITE_SPACES; other keywords are lower case strings.
+    """
+    __slots__ = tuple(field for field, name, kind, initial in _LAYOUT_FIELDS)
+
+    def __init__(self, properties, parent_properties=None, parent=None):
+        """ Resolve the Property objects in properties (see _make_style),
+        given the properties and the ComputedStyle of the parent, if any.
+        """
+        if parent_properties is None:
+            parent_properties = {}
+        for field, name, kind, initial in _LAYOUT_FIELDS:
+            property = properties.get(name)
+            if property is None:
+                text = None
+            elif name in INHERITED_PROPERTIES and \
+                    property is parent_properties.get(name):
+                # the parent's computed value is inherited, not its text
+                text = 'inherit'
+            else:
+                text = property.value.strip()
+                if kind != 'text':
+                    text = text.lower()
+
+            if text == 'inherit' or text is None and \
+                    name in INHERITED_PROPERTIES:
+                if parent is None:
+                    value = initial
+                else:
+                    value = getattr(parent, field)
+            elif text is None:
+                value = initial
+            elif kind in ('keyword', 'text'):
+                value = text
+            elif kind == 'length':
+                value = _px(text, self.fontSize)
+            elif kind == 'border-width':
+                if getattr(self, field[:-5] + 'Style') in ('none', 'hidden'):
+                    value = 0.0
+                elif text in _BORDER_WIDTHS:
+                    value = _BORDER_WIDTHS[text]
+                else:
+                    value = _px(text, self.fontSize)
+                    if value is None:
+                        value = initial
+            elif kind == 'font-size':
+                if parent is None:
+                    value = _font_size(text, initial)
+                else:
+                    value = _font_size(text, parent.fontSize)
+            else:
+                value = _ENUMERATIONS[kind].get(text, initial)
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise dom.NoModificationAllowedErr(self, name)
+
+    def __delattr__(self, name):
+        raise dom.NoModificationAllowedErr(self, name)
+
+_default_computed = (_default_style, _default_properties,
+                     ComputedStyle(_default_properties))
+
+# Computed styles are shared between nodes with the same parent style, name,
+# class and style attribute, as siblings and cousins often have. Each document
+# keeps the _SHARED_STYLES most recently used of them.
+_SHARED_STYLES = 256
+
+def _shared_style(document, key, parent_computed, style_text):
+    """ Return the computed style shared by the nodes of document with key,
+    building it if there is none, given the parent's computed style. """
+    try:
+        shared = document._shared_styles
+    except AttributeError:
+        shared = document._shared_styles = OrderedDict()
+    try:
+        computed = shared.pop(key)
+    except KeyError:
+        parent_style, parent_properties, parent_resolved = parent_computed
+        style, properties = _make_style(parent_properties, style_text)
+        resolved = ComputedStyle(properties, parent_properties,
+                                 parent_resolved)
+        computed = (style, properties, resolved)
+        if len(shared) >= _SHARED_STYLES:
+            shared.popitem(last=False)
+    shared[key] = computed
+    return computed
+
+def _computed(node):
+    """ Return the cached computed style of node, recalculating it if needed.
+    A computed style is a (style, properties, resolved) tuple: the read-only
+    CSSStyleDeclaration and properties of _make_style and their
+    ComputedStyle.
+
+    The cache is stamped with the document's and the node's _sequence. While
+    neither has changed the cached style is returned straight away. Otherwise
+    the parent's style is revalidated first, and the node's own style is only
+    rebuilt if the parent's style or the node's style attribute changed, so
+    that unaffected nodes keep handing out the same style object. A rebuilt
+    style is shared with other nodes where possible, see _shared_style.
+    """
+    document = node._ownerDocument or node
+    stamp = (document, document._sequence, node._sequence)
+    cache = node.__dict__.get('_computed')
+    if cache is not None and cache[0] == stamp:
+        return cache[1]
+
+    nodeType = node.nodeType
+    if nodeType in (dom.Node.DOCUMENT_NODE, dom.Node.DOCUMENT_FRAGMENT_NODE):
+        return _default_computed
+
+    parent = node._containerNode
+    if parent is None:
+        parent_computed = _default_computed
+    else:
+        parent_computed = _computed(parent)
+    parent_style = parent_computed[0]
+
+    style_text = class_name = ''
+    if nodeType == dom.Node.ELEMENT_NODE:
+        style_text = node.getAttribute('style')
+        class_name = node.getAttribute('class')
+
+    if cache is not None and cache[2] is parent_style and \
+            cache[3] == style_text:
+        node._computed = (stamp,) + cache[1:]
+        return cache[1]
+
+    # Only elements get styles of their own; text and other nodes get the
+    # style of an anonymous inline box inside their parent. There are no
+    # author style sheets yet, so no rules to match: nodes with the same
+    # parent style, name, class and style attribute have the same style.
+    key = (parent_style, node.nodeName, class_name, style_text)
+    computed = _shared_style(document, key, parent_computed, style_text)
+    node._computed_style = computed[0]
+    node._computed = (stamp, computed, parent_style, style_text)
+    return computed
+
 class ViewCSS(AbstractView):
     def getComputedStyle(self, elt, psuedoElt):
-        """ Return a CSSStyleDeclaration with the computed style of the element
-        (or psuedo element if psuedoElt is not None)
+        """ Return a read-only CSSStyleDeclaration with the computed style of
+        the element (or psuedo element if psuedoElt is not None)
 
-        This is just a dummy version for now which returns the very minimum
-        basic styles.
+        Computed styles are cached on the nodes, see _computed. Pseudo
+        elements are not supported yet.
         """
-        return css.CSSStyleDeclaration(cssText =
-                                       """
-                                       position: static;
-                                       display: inline;
-                                       visibility: visible;
-                                       z-index: auto;
-                                       overflow: visible;
-                                       white-space: normal;
-                                       clip: auto;
-                                       float: none;
-                                       clear: none;
-
-                                       width: auto;
-                                       height: auto;
-                                       top: auto;
-                                       right: auto;
-                                       bottom: auto;
-                                       left: auto;
-                                       
-                                       margin-top:    0px;
-                                       margin-bottom: 0px;
-                                       margin-right:  0px;
-                                       margin-left:   0px;
-                                       
-                                       padding-top:    0px;
-                                       padding-bottom: 0px;
-                                       padding-right:  0px;
-                                       padding-left:   0px;
-
-                                       border-top-width:    0px;
-                                       border-bottom-width: 0px;
-                                       border-right-width:  0px;
-                                       border-left-width:   0px;
-                                       
-                                       border-top-color:    #000000;
-                                       border-bottom-color: #000000;
-                                       border-right-color:  #000000;
-                                       border-left-color:   #000000;
-                                       
-                                       border-top-style:    none;
-                                       border-bottom-style: none;
-                                       border-right-style:  none;
-                                       border-left-style:   none;
-
-                                       """
-                                       )
+        return _computed(elt)[0]
+
+    def getLayoutStyle(self, elt):
+        """ Return the read-only ComputedStyle of the element, its computed
+        style with the values resolved for layout (not part of DOM CSS).
+        """
+        return _computed(elt)[2]
+
+# Generate the attribute descriptors of every class, once
+for _class in globals().values():
+    if isinstance(_class, types.ClassType) and issubclass(_class, DOMObject):
+        _define_attributes(_class)
+del _class
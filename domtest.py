@@ -0,0 +1,187 @@
+""" Regression tests for pxdom and domhtml.
+
+Run them with
+
+    python domtest.py
+"""
+import StringIO
+import unittest
+
+import pxdom
+import domhtml
+
+class IdIndexTest(unittest.TestCase):
+    """ getElementById while the document changes """
+
+    def setUp(self):
+        self.document = pxdom.parseString(
+            '<!DOCTYPE a [<!ATTLIST b id ID #IMPLIED>]>'
+            '<a><b id="x"/><c id="y"/><b id="z"/></a>')
+        self.root = self.document.documentElement
+
+    def assertIds(self):
+        """ The index finds what a walk of the document finds """
+        for elementId in ('x', 'y', 'z', 'w', 'ww'):
+            self.assertTrue(
+                self.document.getElementById(elementId) is
+                self.document._getElementById(self.document, elementId),
+                elementId)
+
+    def test_children(self):
+        x = self.document.getElementById('x')
+        self.assertEqual('b', x.nodeName)
+        self.assertEqual(None, self.document.getElementById('y'))
+        w = self.document.createElement('b')
+        w.setAttribute('id', 'w')
+        self.assertEqual(None, self.document.getElementById('w'))
+        self.root.appendChild(w)
+        self.assertTrue(self.document.getElementById('w') is w)
+        self.root.removeChild(x)
+        self.assertEqual(None, self.document.getElementById('x'))
+        # the first element in document order wins
+        z = self.document.getElementById('z')
+        w.setAttribute('id', 'z')
+        self.assertTrue(self.document.getElementById('z') is z)
+        self.root.insertBefore(w, z)
+        self.assertTrue(self.document.getElementById('z') is w)
+        self.assertIds()
+
+    def test_attributes(self):
+        x = self.document.getElementById('x')
+        x.setAttribute('id', 'w')
+        self.assertEqual(None, self.document.getElementById('x'))
+        self.assertTrue(self.document.getElementById('w') is x)
+        x.getAttributeNode('id').firstChild.appendData('w')
+        self.assertTrue(self.document.getElementById('ww') is x)
+        x.removeAttribute('id')
+        self.assertEqual(None, self.document.getElementById('ww'))
+        c = self.root.childNodes[1]
+        c.setIdAttribute('id', True)
+        self.assertTrue(self.document.getElementById('y') is c)
+        c.setIdAttribute('id', False)
+        self.assertEqual(None, self.document.getElementById('y'))
+        self.assertIds()
+
+    def test_mixed(self):
+        for i in range(50):
+            element = self.document.createElement('bc'[i % 2])
+            element.setAttribute('id', 'xyzw'[i % 4])
+            parent = self.root.childNodes[i % len(self.root.childNodes)]
+            if i % 3:
+                parent.appendChild(element)
+            else:
+                self.root.insertBefore(element, parent)
+            self.assertIds()
+            if i % 5 == 0:
+                self.root.removeChild(self.root.firstChild)
+                self.assertIds()
+            if i % 7 == 0:
+                self.root.lastChild.setAttribute('id', 'w')
+                self.assertIds()
+
+class InputBufferTest(unittest.TestCase):
+    """ Reading documents a window at a time """
+
+    def setUp(self):
+        self.window = pxdom.BUFFERWINDOW
+        pxdom.BUFFERWINDOW = 1
+
+    def tearDown(self):
+        pxdom.BUFFERWINDOW = self.window
+
+    def parse(self, **kwargs):
+        input = pxdom.LSInput()
+        for name, value in kwargs.items():
+            setattr(input, name, value)
+        return pxdom.LSParser().parse(input)
+
+    def test_bom(self):
+        text = u'<a>caf\xe9</a>'
+        for encoding in ('utf-16', 'utf-16-le', 'utf-16-be', 'utf-8'):
+            data = text.encode(encoding)
+            if encoding != 'utf-16':
+                data = u'\ufeff'.encode(encoding) + data
+            document = self.parse(byteStream=StringIO.StringIO(data))
+            self.assertEqual(text[3:-4], document.documentElement.textContent)
+
+    def test_errorContext(self):
+        try:
+            self.parse(stringData='<a>' + 'x' * 100 + '<b c="1" c="2"/></a>')
+        except pxdom.ParseErr, e:
+            # the 30 characters before the error survive being swallowed
+            self.assertEqual(['x' * 20 + '<b c="1" c="2"/></a>', ' ' * 30 + '^'],
+                             str(e).split('\n')[2:])
+        else:
+            self.fail('no ParseErr')
+
+    def test_missingSystemId(self):
+        # the DOM error, not one from cleaning up after a parse never begun
+        self.assertRaises(pxdom.IOErrorErr, self.parse,
+                          systemId='/nonexistent/file.xml')
+
+class FilterCollectionTest(unittest.TestCase):
+    """ FilterCollections sharing the document's element indexes """
+
+    class Named:
+        def __init__(self, name):
+            self.name = name
+        def check(self, element):
+            return element.tagName == self.name
+
+    def test_boundMethods(self):
+        document = domhtml.parseString(
+            '<html><body><p/><div/><div/></body></html>')
+        ps = domhtml.FilterCollection(
+            document, pxdom.NONS, self.Named('p').check)
+        divs = domhtml.FilterCollection(
+            document, pxdom.NONS, self.Named('div').check)
+        self.assertEqual(1, ps.length)
+        self.assertEqual(2, divs.length)
+        self.assertEqual(['div', 'div'], [node.tagName for node in divs])
+
+class ParseFastTest(unittest.TestCase):
+    """ parseFast builds what LSParser builds """
+
+    documents = [
+        '<a>hello <b>x</b>\n  tail <!--c--> more<?p q?>end</a>',
+        '<a>x&lt;y &amp; z<b/>\r\n  t&#65;u</a>',
+        '<a>caf\xc3\xa9 t<b/></a>',
+        '<a\n  b = \'x&lt;\n&#65;\'\tc="\xc3\xa9>"><d e=""/></a>',
+        u'<a>caf\xe9 t<b/></a>',
+        '<?xml version="1.0"?>\n<!DOCTYPE a SYSTEM "a.dtd">\n'
+        '<!--a\r\nb--><?p\n q\r\n?>\n<a xmlns:x="u" x:y="1">t<!--\n x-->'
+        'u<?q\n?>v<x:b>w&nbsp;y</x:b>z</a>\n<!--e-->',
+        ]
+
+    def nodes(self, node, found):
+        """ The nodes under node, in document order, described by their
+        type, name, value and location
+        """
+        location = node.pxdomLocation
+        found.append((node.nodeType, node.nodeName, node.nodeValue,
+                      node.namespaceURI,
+                      location.lineNumber, location.columnNumber))
+        if node.attributes is not None:
+            for attr in node.attributes:
+                self.nodes(attr, found)
+        for child in node.childNodes:
+            self.nodes(child, found)
+        return found
+
+    def test_parseFast(self):
+        parse = domhtml._parse
+        def fallback(*args):
+            self.fail('parseFast fell back to LSParser')
+        for text in self.documents:
+            expected = self.nodes(parse(text, 'http://localhost/', {
+                'pxdom-resolve-resources': False}), [])
+            domhtml._parse = fallback
+            try:
+                found = self.nodes(
+                    domhtml.parseFast(text, 'http://localhost/'), [])
+            finally:
+                domhtml._parse = parse
+            self.assertEqual(expected, found)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+""" Regression tests for boxmodel.layout.
+
+Run them with
+
+    python layouttest.py
+"""
+import unittest
+
+import domhtml
+from document import TidyDomDocument
+from boxmodel.box import TextBox
+from boxmodel.layout import PageLayout
+
+class FixedRenderer:
+    """ Measures text as if every character were 8 by 16 pixels """
+    def text_size(self, text, elem):
+        return (8 * len(text), 16)
+
+    def font_key(self, elem):
+        return None
+
+class Browser:
+    def __init__(self):
+        self.renderer = FixedRenderer()
+
+def texts(box, found):
+    """ The text of the TextBoxes in box, in order """
+    if isinstance(box, TextBox):
+        found.append(box.text)
+    for child in box.childBoxes:
+        texts(child, found)
+    return found
+
+class IncrementalLayoutTest(unittest.TestCase):
+    """ PageLayout fed a document chunk by chunk """
+
+    def layout(self, chunks):
+        """ Lay out what there is after each chunk, returning the text laid
+        out
+        """
+        document = TidyDomDocument(incremental=True,
+                                   document=domhtml.HTMLDocument())
+        layout = None
+        found = []
+        for chunk in chunks:
+            roots = document.write(chunk)
+            if layout is None:
+                layout = PageLayout(Browser(), document.dom, 800, 600)
+            else:
+                layout.addSubtrees(roots)
+            box = layout.nextBox()
+            while box is not None:
+                texts(box, found)
+                box = layout.nextBox()
+        return found
+
+    def test_chunks(self):
+        # text split across chunks is added as two text nodes
+        self.assertEqual(['one', 'two', 'th', 'ree'], self.layout([
+            '<html><body><p>one</p>', '<p>two</p><p>th', 'ree</p>',
+            '</body></html>']))
+
+    def test_hiddenAtEnd(self):
+        # a chunk ending in an element that is not displayed
+        self.assertEqual(['one', 'two', 'three'], self.layout([
+            '<html><body><p>one</p><div style="display: none">x</div>',
+            '<p>two</p><p>three</p><div style="display: none">y</div>',
+            '</body></html>']))
+
+class IncrementalTreeBuilderTest(unittest.TestCase):
+    """ Building a document chunk by chunk """
+
+    def test_entities(self):
+        document = TidyDomDocument(incremental=True)
+        for chunk in ['<p>a &amp; b &nb', 'sp; &bogus; &#65;</p>']:
+            document.write(chunk)
+        document.close()
+        self.assertEqual(u'a & b \xa0 &bogus; A', u''.join(
+            [node.data for node in document.dom.documentElement.childNodes]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,7 +15,7 @@ __all__    = [
 # Setup, utility functions
 # ============================================================================
 
-import os, sys, string, StringIO, urlparse, urllib, httplib
+import os, sys, re, string, bisect, StringIO, urlparse, urllib, httplib
 r= string.replace
 
 def _insertMethods():
@@ -92,6 +92,44 @@ if unicode is not None:
     (0x2FF0,0x3001), (0xE000,0xF900), (0xFDD0,0xFDF0), (0xFFFE, 0x10000)
   )
 
+# Compiled forms of the character classes for the low-level parsing methods,
+# which match them at an index into the input buffer. The U versions are for
+# unicode input and include the non-ASCII classes; WFNAME matches a complete
+# well-formed name for _checkName. NEWLINE matches the line separators the
+# InputBuffer normalises to LF. UPTORES caches searches for the delimiters
+# passed to LSParser._upto, with the length of the longest.
+#
+def _charClass(chars, ranges= ()):
+  """ Make the body of a regex character class from a string of characters
+      and a list of half-open (start, end) code point ranges.
+  """
+  def escape(c):
+    if ord(c)<256:
+      return '\\x%02x' % ord(c)
+    return c
+  members= map(escape, chars)
+  for c0, c1 in ranges:
+    members.append(escape(unichr(c0))+'-'+escape(unichr(c1-1)))
+  return string.join(members, '')
+
+_notName= _charClass(string.join(list(NOTNAME)+list(NOTCHAR), ''))
+_notFirst= _charClass(string.join(list(NOTFIRST), ''))
+WHITERE= re.compile('[%s]*' % _charClass(WHITE)).match
+FIRSTRE= re.compile('[^%s]' % _notFirst).match
+NAMERE= re.compile('[^%s]+' % _notName).match
+WFNAMERE= re.compile('(?![%s])[^%s]+\\Z' % (_notFirst, _notName)).match
+if unicode is not None:
+  _notNameU= _notName+_charClass(string.join(list(NOTCHARU), ''), NOTNAMEU)
+  _notFirstU= _notFirst+_charClass('', NOTFIRSTU)
+  WHITEURE= re.compile(u'[%s]*' % _charClass(WHITE+WHITEU)).match
+  FIRSTURE= re.compile(u'[^%s]' % _notFirstU).match
+  NAMEURE= re.compile(u'[^%s]+' % _notNameU).match
+  WFNAMEURE= re.compile(u'(?![%s])[^%s]+\\Z' % (_notFirstU, _notNameU)).match
+NEWLINERE= re.compile('\r\n?').sub
+if unicode is not None:
+  NEWLINEURE= re.compile(u'\r\n?|[%s]' % string.join(LSU, '')).sub
+UPTORES= {}
+
 # Unicode character normalisation (>=2.3). Also includes a kludge for
 # composing-characters that we can't check through unicodedata, see
 # 'Character Model for the World Wide Web', Appendix C
@@ -115,6 +153,14 @@ REPR_MAX_LIST=3
 
 # Special namespace URIs
 #
+# Number of characters of a document InputBuffer reads at a time
+#
+BUFFERWINDOW= 65536
+
+# Number of characters either side of a parse error quoted in its message
+#
+ERRORCONTEXT= 30
+
 XMNS= 'http://www.w3.org/XML/1998/namespace'
 NSNS= 'http://www.w3.org/2000/xmlns/'
 HTNS= 'http://www.w3.org/1999/xhtml'
@@ -150,23 +196,29 @@ def _checkName(name, nc= False):
   """ Check name string, raise exception if not well-formed. Optionally check
       it also matches NCName (no colons).
   """
-  if name=='':
-    raise InvalidCharacterErr(name, '')
-  if name[0] in NOTFIRST:
-    raise InvalidCharacterErr(name, name[0])
   if isinstance(name, Unicode):
-    for c0, c1 in NOTFIRSTU:
-      if ord(name[0])>=c0 and ord(name[0])<c1:
-        raise InvalidCharacterErr(name, char)
-  for char in name:
-    if char in NOTNAME or char in NOTCHAR:
-      raise InvalidCharacterErr(name, char)
-    if isinstance(char, Unicode):
-      if char in NOTCHARU:
+    wellFormed= WFNAMEURE(name)
+  else:
+    wellFormed= WFNAMERE(name)
+  if not wellFormed:
+    # find the offending character to report
+    if name=='':
+      raise InvalidCharacterErr(name, '')
+    if name[0] in NOTFIRST:
+      raise InvalidCharacterErr(name, name[0])
+    if isinstance(name, Unicode):
+      for c0, c1 in NOTFIRSTU:
+        if ord(name[0])>=c0 and ord(name[0])<c1:
+          raise InvalidCharacterErr(name, name[0])
+    for char in name:
+      if char in NOTNAME or char in NOTCHAR:
         raise InvalidCharacterErr(name, char)
-      for c0, c1 in NOTNAMEU:
-        if ord(char)>=c0 and ord(char)<c1:
+      if isinstance(char, Unicode):
+        if char in NOTCHARU:
           raise InvalidCharacterErr(name, char)
+        for c0, c1 in NOTNAMEU:
+          if ord(char)>=c0 and ord(char)<c1:
+            raise InvalidCharacterErr(name, char)
   if nc and ':' in name:
       raise NamespaceErr(name, None)
 
@@ -323,13 +375,28 @@ class ChildNodeList(NodeList):
   def __delitem__(self, index):
     self._ownerNode.removeChild(self._list[index])
 
+  def _renumber(self, index):
+    """ Update the cached _childIndex of the children from index onwards.
+    """
+    list= self._list
+    for i in range(index, len(list)):
+      list[i]._childIndex= i
+
 
 class NodeListByTagName(NodeList):
   """ A NodeList returned by an Element.getElementsByTagName[NS] method. This
       is still 'live' - the internal _list acts only as a cache, and is
       recalculated if the owner Element's contents have changed since it was
       last built.
+
+      Lists of a whole Document don't walk the tree: they share an
+      ElementIndex, kept by the document under the list's _key() and updated
+      as elements are inserted and removed.
   """
+  # Whether _match looks at an element's attributes, not just its name
+  #
+  _testsAttributes= False
+
   def __init__(self, ownerNode, namespaceURI, localName):
     NodeList.__init__(self, ownerNode)
     self._namespaceURI= namespaceURI
@@ -363,9 +430,24 @@ class NodeListByTagName(NodeList):
     """ Recalculate the list. This method does the actual work of the
         Element.getElementsByTagName call.
     """
-    self._list= []
-    self._walk(self._ownerNode)
-    self._sequence= self._ownerNode._sequence
+    ownerNode= self._ownerNode
+    key= None
+    if ownerNode.nodeType==Node.DOCUMENT_NODE and not ownerNode._building:
+      key= self._key()
+    if key is not None:
+      self._list= ownerNode._getElementIndex(
+        key, self._match, self._testsAttributes
+      )._list
+    else:
+      self._list= []
+      self._walk(ownerNode)
+    self._sequence= ownerNode._sequence
+
+  def _key(self):
+    """ Return the key of the document's ElementIndex that holds this list, or
+        None if it can't be shared with other lists.
+    """
+    return ('tag', self._namespaceURI, self._localName)
 
   def _walk(self, element):
     """ Recursively add a node's child elements to the internal node list when
@@ -373,35 +455,217 @@ class NodeListByTagName(NodeList):
     """
     for childNode in element.childNodes:
       if childNode.nodeType==Node.ELEMENT_NODE:
-        if (
-          self._localName=='*' and
-          self._namespaceURI in ('*', NONS, childNode.namespaceURI)
-        ) or (
-          self._namespaceURI=='*' and
-          self._localName==childNode.localName
-        ) or (
-          self._namespaceURI is NONS and
-          self._localName==childNode.nodeName
-        ) or (
-          self._namespaceURI==childNode.namespaceURI and
-          self._localName==childNode.localName
-        ):
+        if self._match(childNode):
           self._list.append(childNode)
       if childNode.nodeType in (Node.ELEMENT_NODE,Node.ENTITY_REFERENCE_NODE):
         self._walk(childNode)
 
+  def _match(self, element):
+    """ Return whether an element meets the conditions passed to
+        Element.getElementsByTagName.
+    """
+    return (
+      self._localName=='*' and
+      self._namespaceURI in ('*', NONS, element.namespaceURI)
+    ) or (
+      self._namespaceURI=='*' and
+      self._localName==element.localName
+    ) or (
+      self._namespaceURI is NONS and
+      self._localName==element.nodeName
+    ) or (
+      self._namespaceURI==element.namespaceURI and
+      self._localName==element.localName
+    )
+
+
+class ElementIndex:
+  """ The elements of a document passing a test, in document order. Kept by
+      the Document for its live lists, and updated by it as nodes are inserted
+      and removed, and (if testsAttributes) as attributes change, so keeping
+      it up to date costs in proportion to the change, not the document.
+  """
+  def __init__(self, test, testsAttributes):
+    self._test= test
+    self._testsAttributes= testsAttributes
+    self._list= []
+
+  def _collect(self, node, elements):
+    """ Add the elements passing the test within node (not node itself) to a
+        list, in document order.
+    """
+    for child in node._childNodes._list:
+      if isinstance(child, Element):
+        if self._test(child):
+          elements.append(child)
+        self._collect(child, elements)
+      elif isinstance(child, EntityReference):
+        self._collect(child, elements)
+
+  def _subtree(self, node):
+    """ Return the elements passing the test in node and its descendants.
+    """
+    elements= []
+    if isinstance(node, Element) and self._test(node):
+      elements.append(node)
+    if isinstance(node, Element) or isinstance(node, EntityReference):
+      self._collect(node, elements)
+    return elements
+
+  def _find(self, node):
+    """ Return the index in the list that node, which must be in the document,
+        is or would be at. Positions are compared as paths of child indexes
+        from the document down.
+    """
+    position= _getPosition(node)
+    low= 0
+    high= len(self._list)
+    while low<high:
+      middle= (low+high)/2
+      if _getPosition(self._list[middle])<position:
+        low= middle+1
+      else:
+        high= middle
+    return low
+
+  def inserted(self, node):
+    """ node has been inserted into the document.
+    """
+    elements= self._subtree(node)
+    if elements:
+      index= self._find(elements[0])
+      self._list[index:index]= elements
+
+  def removing(self, node):
+    """ node is about to be removed from the document.
+    """
+    elements= self._subtree(node)
+    if elements:
+      index= self._find(elements[0])
+      del self._list[index:index+len(elements)]
+
+  def retest(self, element):
+    """ An attribute of element, which is in the document, has changed.
+    """
+    if self._testsAttributes and isinstance(element, Element):
+      index= self._find(element)
+      present= index<len(self._list) and self._list[index] is element
+      if self._test(element):
+        if not present:
+          self._list.insert(index, element)
+      elif present:
+        del self._list[index]
+
+def _getPosition(node):
+  """ Return the position of a node within its document as a list of child
+      indexes from the top.
+  """
+  position= []
+  while node._containerNode is not None:
+    position.append(node._getChildIndex())
+    node= node._containerNode
+  position.reverse()
+  return position
+
+
+class IdIndex(ElementIndex):
+  """ The elements of a document with ID attributes, by ID. Kept with the
+      Document's element indexes and updated the same way. Each ID maps to
+      the elements with it in document order, the first being the one
+      getElementById returns. Inserting or removing a doctype can change which
+      attributes are IDs, after which the index is built again when next used.
+  """
+  def __init__(self):
+    ElementIndex.__init__(self, lambda element: True, True)
+    self._ids= None
+    self._elements= {}
+
+  def _build(self, document):
+    self._ids= {}
+    self._elements= {}
+    elements= []
+    self._collect(document, elements)
+    for element in elements:
+      self._add(element)
+
+  def get(self, document, elementId):
+    if self._ids is None:
+      self._build(document)
+    elements= self._ids.get(elementId)
+    if elements:
+      return elements[0]
+    return None
+
+  def _add(self, element):
+    values= []
+    for attr in element._attributes._list:
+      if attr.isId:
+        values.append(attr.value)
+    if not values:
+      return
+    self._elements[id(element)]= values
+    for value in values:
+      elements= self._ids.setdefault(value, [])
+      if not elements:
+        elements.append(element)
+      else:
+        position= _getPosition(element)
+        index= 0
+        while index<len(elements) and _getPosition(elements[index])<position:
+          index= index+1
+        elements.insert(index, element)
+
+  def _remove(self, element):
+    for value in self._elements.pop(id(element), []):
+      elements= self._ids[value]
+      elements.remove(element)
+      if not elements:
+        del self._ids[value]
+
+  def inserted(self, node):
+    if self._ids is not None:
+      if node.nodeType==Node.DOCUMENT_TYPE_NODE:
+        self._ids= None
+      else:
+        for element in self._subtree(node):
+          self._add(element)
+
+  def removing(self, node):
+    if self._ids is not None:
+      if node.nodeType==Node.DOCUMENT_TYPE_NODE:
+        self._ids= None
+      else:
+        for element in self._subtree(node):
+          self._remove(element)
+
+  def retest(self, element):
+    if self._ids is not None and isinstance(element, Element):
+      self._remove(element)
+      self._add(element)
+
 
 class NamedNodeMap(NodeList):
   """ Dictionary-style object used for mappings. Must be initialised with a
       nodeType for nodes it wishes to handle.
+
+      Alongside the list, dictionaries from (namespaceURI, localName) and from
+      nodeName give the first item in the list with that key, kept up to date
+      by _writeItem. Code that renames an item in place must _reindex.
   """
   def __init__(self, ownerNode, childType):
     NodeList.__init__(self, ownerNode)
     self._childTypes= (childType,)
+    self._namesNS= {}
+    self._names= {}
+    self._shared= False
 
   def getNamedItemNS(self, namespaceURI, localName):
     if namespaceURI=='':
       namespaceURI= None
+    if namespaceURI is NONS:
+      return self._names.get(localName)
+    if localName is not None:
+      return self._namesNS.get((namespaceURI, localName))
     for node in self._list:
       if (
         (namespaceURI is NONS and localName==node.nodeName) or
@@ -459,6 +723,67 @@ class NamedNodeMap(NodeList):
       self._list[index:index+1]= [newItem]
     else:
       self._list[index:index+1]= []
+    if oldItem is not None:
+      self._unindexItem(oldItem)
+    if newItem is not None:
+      self._indexItem(newItem, index)
+    # Declarations in the doctype decide which attributes are IDs
+    #
+    document= self._ownerNode._ownerDocument
+    if document is not None and document._lists.has_key(('id',)):
+      if not isinstance(self._ownerNode, Element):
+        document._lists[('id',)]._ids= None
+
+  def _append(self, value):
+    NodeList._append(self, value)
+    self._indexItem(value, len(self._list)-1)
+
+  def _keys(self, item):
+    """ Return the index keys of an item: its nodeName and, if it has a
+        localName, its (namespaceURI, localName).
+    """
+    localName= item.localName
+    if localName is None:
+      return (item.nodeName, None)
+    return (item.nodeName, (item.namespaceURI, localName))
+
+  def _indexItem(self, item, index):
+    """ Add an item now at position index in the list to the dictionaries,
+        unless an item earlier in the list already has the same key.
+    """
+    name, nameNS= self._keys(item)
+    for key, names in [(name, self._names), (nameNS, self._namesNS)]:
+      if key is not None:
+        other= names.get(key)
+        if other is None:
+          names[key]= item
+        elif other is not item:
+          self._shared= True
+          if self._list.index(other)>index:
+            names[key]= item
+
+  def _unindexItem(self, item):
+    """ Remove an item no longer in the list from the dictionaries. If any
+        items have ever shared a key, look for the next item with its key.
+    """
+    name, nameNS= self._keys(item)
+    for key, names in [(name, self._names), (nameNS, self._namesNS)]:
+      if key is not None and names.get(key) is item:
+        del names[key]
+        if self._shared:
+          for other in self._list:
+            if key in self._keys(other):
+              names[key]= other
+              break
+
+  def _reindex(self):
+    """ Rebuild the dictionaries after items have been renamed or reordered.
+    """
+    self._namesNS= {}
+    self._names= {}
+    self._shared= False
+    for index in range(len(self._list)-1, -1, -1):
+      self._indexItem(self._list[index], index)
 
   # Python dictionary-style methods for minidom compatibility. This is
   # inconsistent with how Python dictionaries normally work, and is subject
@@ -540,6 +865,10 @@ class AttrMap(NamedNodeMap):
                 )
               ):
                 declaration._createAttribute(self._ownerNode)
+    document= self._ownerNode._ownerDocument
+    if document is not None and document._lists:
+      if document._getIndexContext(self._ownerNode) is document:
+        document._retestIndexes(self._ownerNode)
 
 
 # Core non-node classes
@@ -662,6 +991,7 @@ class DOMConfiguration(DOMObject):
     'pxdom-assume-element-content':              (False, True ),
     'pxdom-resolve-resources':                   (True,  True ),
     'pxdom-html-compatible':                     (False, True ),
+    'pxdom-lazy-locations':                      (False, True ),
     # Switches to make required normalizeDocument operations optional
     'pxdom-normalize-text':                      (True,  True ),
     'pxdom-reset-identity':                      (True,  True ),
@@ -925,6 +1255,7 @@ class Node(DOMObject):
     self._userData= {}
     self._childNodes.readonly= True
     self._sequence= 0
+    self._childIndex= 0
     self._row= -1
     self._col= -1
   def _cloneTo(self, node):
@@ -959,36 +1290,50 @@ class Node(DOMObject):
   # Hierarchy access
   #
   def _get_firstChild(self):
-    if self.childNodes.length>0:
-      return self.childNodes.item(0)
+    if self._childNodes._list:
+      return self._childNodes._list[0]
     return None
 
   def _get_lastChild(self):
-    if self.childNodes.length>0:
-      return self._childNodes.item(self.childNodes.length-1)
+    if self._childNodes._list:
+      return self._childNodes._list[-1]
     return None
 
   def _get_previousSibling(self):
-    if self.parentNode is None:
-      return None
-    try:
-      index= self.parentNode.childNodes._index(self)
-    except ValueError:
-      return None
-    if index<1:
+    index= self._getChildIndex()
+    if index is None or index<1:
       return None
-    return self.parentNode.childNodes.item(index-1)
+    return self._containerNode._childNodes._list[index-1]
 
   def _get_nextSibling(self):
-    if self.parentNode is None:
+    index= self._getChildIndex()
+    if index is None:
       return None
+    siblings= self._containerNode._childNodes._list
+    if index>=len(siblings)-1:
+      return None
+    return siblings[index+1]
+
+  def _getChildIndex(self):
+    """ Return the position of the node in its parent's childNodes, or None if
+        it has no parent. Positions are cached in _childIndex, kept up to date
+        by _writeChild; they are checked before use since some internal
+        operations (cloning) build child lists directly, in which case all
+        the siblings are renumbered at once.
+    """
+    parent= self._get_parentNode()
+    if parent is None:
+      return None
+    siblings= parent._childNodes._list
+    index= self._childIndex
+    if index<len(siblings) and siblings[index] is self:
+      return index
     try:
-      index= self.parentNode.childNodes._index(self)
+      index= siblings.index(self)
     except ValueError:
       return None
-    if index>=self.parentNode.childNodes.length-1:
-      return None
-    return self.parentNode.childNodes.item(index+1)
+    parent._childNodes._renumber(0)
+    return index
 
   def hasAttributes(self):
     if self._attributes is not None:
@@ -1030,7 +1375,10 @@ class Node(DOMObject):
   def _writeChild(self, newChild, oldChild, removeOld):
     if self._readonly:
       raise NoModificationAllowedErr(self, 'Child')
-    if oldChild is not None and oldChild not in self._childNodes:
+    if oldChild is not None and (
+      oldChild._get_parentNode() is not self or
+      oldChild._getChildIndex() is None
+    ):
       raise NotFoundErr(self, oldChild.namespaceURI, oldChild.localName)
     if oldChild is newChild:
       return
@@ -1038,11 +1386,17 @@ class Node(DOMObject):
     if newChild is not None:
       if newChild.ownerDocument not in (self._ownerDocument, None):
         raise WrongDocumentErr(newChild, self._ownerDocument)
-      ancestor= self
-      while ancestor is not None:
-        if newChild is ancestor:
-          raise HierarchyRequestErr(newChild, self)
-        ancestor= ancestor.parentNode
+      # A childless node can only be its own ancestor, so only walk up the
+      # tree for nodes with children
+      #
+      if newChild is self:
+        raise HierarchyRequestErr(newChild, self)
+      if newChild._childNodes._list:
+        ancestor= self.parentNode
+        while ancestor is not None:
+          if newChild is ancestor:
+            raise HierarchyRequestErr(newChild, self)
+          ancestor= ancestor.parentNode
       if newChild.nodeType==Node.DOCUMENT_FRAGMENT_NODE:
         newNodes= list(newChild._childNodes._list)
       else:
@@ -1053,12 +1407,19 @@ class Node(DOMObject):
         if node.parentNode is not None:
           node.parentNode.removeChild(node)
 
+    context= None
+    document= self._ownerDocument
+    if document is not None and document._lists:
+      context= document._getIndexContext(self)
     self._childNodes.readonly= False
     if oldChild is None:
-      index= self._childNodes.length
+      index= len(self._childNodes._list)
     else:
-      index= self._childNodes._index(oldChild)
+      index= oldChild._getChildIndex()
     if removeOld:
+      if context is document:
+        for elementIndex in document._lists.values():
+          elementIndex.removing(oldChild)
       oldChild._containerNode= None
       del self._childNodes._list[index]
     if newChild is not None:
@@ -1067,8 +1428,16 @@ class Node(DOMObject):
       self._childNodes._insertseq(index, newNodes)
       for node in newNodes:
         node._containerNode= self
+    self._childNodes._renumber(index)
     self._childNodes.readonly= True
-    self._changed()
+    if context is document:
+      if newChild is not None:
+        for elementIndex in document._lists.values():
+          for node in newNodes:
+            elementIndex.inserted(node)
+    elif context is not None:
+      document._retestIndexes(context)
+    self._changed(True)
 
   # DOM 3 UserData
   #
@@ -1097,18 +1466,34 @@ class Node(DOMObject):
     return None
 
   def _get_pxdomLocation(self):
-    return DOMLocator(self, self._row, self._col)
+    row, col= self._row, self._col
+    if isinstance(row, LineIndex):
+      row, col= row.getLocation(col)
+    return DOMLocator(self, row, col)
   def _setLocation(self, (row, col)):
+    """ Set the location the node was parsed from, either as (line, column)
+        or (LineIndex, offset) to work the line and column out when needed.
+    """
     self._row= row
     self._col= col
 
   def _renameNode(self, namespaceURI, qualifiedName):
     raise NotSupportedErr(self, 'renameNode')
 
-  def _changed(self):
+  def _changed(self, indexed= False):
+    """ Count a change to the node and its containers. Unless the change has
+        been indexed (see Document._getElementIndex), the document's element
+        indexes are thrown away.
+    """
+    document= self._ownerDocument
+    if not indexed and document is not None and document._lists:
+      document._lists= {}
     self._sequence= self._sequence+1
     if self._containerNode is not None:
-      self._containerNode._changed()
+      if document is not None and document._building:
+        document._built.append(self._containerNode)
+      else:
+        self._containerNode._changed(True)
 
   def _getDescendants(self, descendants):
     for child in self._childNodes:
@@ -1224,6 +1609,9 @@ class Document(Node):
     self._documentURI= None
     self._strictErrorChecking= True
     self._domConfig= DOMConfiguration()
+    self._building= 0
+    self._built= []
+    self._lists= {}
   def _cloneTo(self, node):
     Node._cloneTo(self, node)
     node._xmlStandalone= self._xmlStandalone
@@ -1234,12 +1622,71 @@ class Document(Node):
     node._strictErrorChecking= self._strictErrorChecking
     node._domConfig= DOMConfiguration(self._domConfig)
 
+  def _createNodeLike(self, node):
+    """ Return a new node of the class to copy node into when it is cloned
+        into this document (by importNode, say). Subclasses can use their own
+        classes for the nodes they hold.
+    """
+    return node.__class__()
+
   def _get_nodeType(self):
     return Node.DOCUMENT_NODE
   def _get_nodeName(self):
     return '#document'
   def _get_ownerDocument(self):
     return None
+
+  # Bulk building. Between _beginBuild and _endBuild (which may be nested) a
+  # change only counts against the node changed; the containers it would have
+  # been passed up to are remembered, and are told about the changes once
+  # each, along with their ancestors, when the outermost build ends.
+  #
+  def _beginBuild(self):
+    self._building= self._building+1
+    self._lists= {}
+  def _endBuild(self):
+    self._building= self._building-1
+    if self._building==0:
+      built= self._built
+      self._built= []
+      done= {}
+      for node in built:
+        while node is not None and not done.has_key(id(node)):
+          done[id(node)]= True
+          node._sequence= node._sequence+1
+          node= node._containerNode
+
+  # Element indexes for live lists of the whole document, by list key. Child
+  # and attribute changes in the document update them; other changes that
+  # could affect them (renaming, normalizing, building) throw them all away.
+  #
+  def _getElementIndex(self, key, test, testsAttributes):
+    elementIndex= self._lists.get(key)
+    if elementIndex is None:
+      elementIndex= ElementIndex(test, testsAttributes)
+      elementIndex._collect(self, elementIndex._list)
+      self._lists[key]= elementIndex
+    return elementIndex
+
+  def _getIndexContext(self, node):
+    """ Return the document if node is in the document's tree, the element
+        if node is in the value of an attribute of an element in the tree, or
+        None if node is outside the document.
+    """
+    element= None
+    while node is not self:
+      if isinstance(node, Attr):
+        element= node._containerNode
+      node= node._containerNode
+      if node is None:
+        return None
+    if element is not None:
+      return element
+    return self
+
+  def _retestIndexes(self, element):
+    for elementIndex in self._lists.values():
+      elementIndex.retest(element)
   _childTypes= (
     Node.ELEMENT_NODE, Node.COMMENT_NODE, Node.PROCESSING_INSTRUCTION_NODE,
     Node.DOCUMENT_TYPE_NODE
@@ -1346,8 +1793,16 @@ class Document(Node):
     if namespaceURI=='':
       namespaceURI= None
     return NodeListByTagName(self, namespaceURI, localName)
+  # ID lookup, through an IdIndex kept with the element indexes, so it is
+  # updated as children, attributes and their values change.
+  #
   def getElementById(self, elementId):
-    return self._getElementById(self, elementId)
+    if self._building:
+      return self._getElementById(self, elementId)
+    idIndex= self._lists.get(('id',))
+    if idIndex is None:
+      idIndex= self._lists[('id',)]= IdIndex()
+    return idIndex.get(self, elementId)
   def _getElementById(self, node, elementId):
     if node._attributes is not None:
       for attr in node._attributes:
@@ -1519,6 +1974,10 @@ class Element(NamedNodeNS):
     if idAttr not in self._attributes._list:
       raise NotFoundErr(self._attributes, NONS, idAttr.name)
     idAttr._isId= isId
+    document= self._ownerDocument
+    if document is not None and document._lists:
+      if document._getIndexContext(self) is document:
+        document._retestIndexes(self)
 
   def _renameNode(self, namespaceURI, qualifiedName):
     self._setDefaultAttributes(False)
@@ -1600,6 +2059,11 @@ class Attr(NamedNodeNS):
   def _get_isId(self):
     return self._isId or self.schemaTypeInfo.typeName=='ID'
 
+  def _set_prefix(self, value):
+    NamedNodeNS._set_prefix(self, value)
+    if self._containerNode is not None:
+      self._containerNode._attributes._reindex()
+
   def _renameNode(self, namespaceURI, qualifiedName):
     owner= self._containerNode
     if owner is not None:
@@ -1631,6 +2095,13 @@ class CharacterData(Node):
     return len(self._data)
   def _set_data(self, value):
     self._data= value
+    self._dataChanged()
+  def _dataChanged(self):
+    document= self._ownerDocument
+    if document is not None and document._lists:
+      context= document._getIndexContext(self)
+      if context not in (None, document):
+        document._retestIndexes(context)
 
   def substringData(self, offset, count):
     if offset<0 or count<0 or offset>len(self._data):
@@ -1640,6 +2111,7 @@ class CharacterData(Node):
     if self._readonly:
       raise NoModificationAllowedErr(self, 'data')
     self._data= self._data+arg
+    self._dataChanged()
   def insertData(self, offset, arg):
     self.replaceData(offset, 0, arg)
   def deleteData(self, offset, count):
@@ -1650,6 +2122,7 @@ class CharacterData(Node):
     if offset<0 or count<0 or offset>len(self._data):
       raise IndexSizeErr(self._data, offset)
     self._data= self._data[:offset]+arg+self._data[offset+count:]
+    self._dataChanged()
 
   def __repr__(self):
     t= repr(self.nodeValue)
@@ -2115,7 +2588,10 @@ def _Node___recurse(self,
   if not clone:
     node= self
   else:
-    node= self.__class__()
+    if ownerDocument is None:
+      node= self.__class__()
+    else:
+      node= ownerDocument._createNodeLike(self)
     self._cloneTo(node)
 
   if ownerDocument is not None:
@@ -2663,6 +3139,7 @@ def _Text__replaceWholeText(self, value):
   if value=='':
     return None
   self._data= value
+  self._dataChanged()
   return self
 
 def _Text___getLogicallyAdjacentTextNodes(self):
@@ -2909,6 +3386,7 @@ def _Element___normalize(self, config):
     attr._normalize(config)
   if config.getParameter('canonical-form'):
     self._attributes._list.sort(_canonicalAttrSort)
+  self._attributes._reindex()
 
   # Fix element, attributes namespaces in place
   #
@@ -2923,6 +3401,8 @@ def _Element___normalize(self, config):
       self.setAttributeNS(NSNS, name, namespaceURI or '')
     for attr, prefix in reprefix:
       attr._prefix= prefix
+    if reprefix:
+      self._attributes._reindex()
 
   # Remove any namespace declarations that are redundant in canonical-form
   # mode, or all of them if namespace-declarations is off
@@ -3063,7 +3543,10 @@ class LSInput(DOMObject):
 class InputBuffer:
   """ Wrapper for reading from an LSInput (or user object implementing this
       interface) or other resource with possible encoding change if an XML
-      declaration is encountered.
+      declaration is encountered. A document is read, decoded and
+      newline-normalised a window at a time as the parser needs it, and the
+      parser swallows what it has finished with, so only a window or so of it
+      is held in memory at once.
   """
   def __init__(self, input, offset, config, isDocument):
     self.config= config
@@ -3078,35 +3561,54 @@ class InputBuffer:
       if input.baseURI is not None:
         self.uri= urlparse.urljoin(input.baseURI, self.uri)
 
-    # Hold encoding currently in use, and bytes or chars read from the input
-    # source. If both bytes and chars are non-None, we are uncertain that the
-    # encoding will prove to be correct; an XML declaration could override it.
+    # Hold encoding currently in use, and bytes read so far and chars not yet
+    # swallowed from the input source. If bytes is non-None, we are uncertain
+    # that the encoding will prove to be correct; an XML declaration could
+    # override it. Until then the chars are not checked for invalid
+    # characters.
     #
     self.bytes= None
     self.encoding= None
     self.chars= None
+    self.settled= False
+
+    # Stream still being read from (None once it is exhausted), how much of
+    # it to read at a time (None for all at once, as entities are re-read
+    # from the start), whether it is ours to close, and the incremental
+    # decoder for byte input.
+    #
+    self.stream= None
+    self.window= None
+    if isDocument:
+      self.window= BUFFERWINDOW
+    self.close= False
+    self.decoder= None
 
     # Whilst parsing, keep pointer into character data. Keep an offset into
     # data from uri so that we can know what the 'real' index was when dealing
-    # with internal entity values. Store pointer to parent buffer as a hack
-    # for parameter entity parsing.
+    # with internal entity values, and the number of characters thrown away
+    # by swallow. Store pointer to parent buffer as a hack for parameter
+    # entity parsing.
     #
     self.offset= offset
     self.parent= None
     self.reset()
+    self.lazy= config.getParameter('pxdom-lazy-locations')
 
-    # Read data from the input source as characters or bytes. If we come out
-    # of this with bytes and an encoding, that encoding's certainty is
+    # Open the input source as a stream of characters or bytes. If we come
+    # out of this with bytes and an encoding, that encoding's certainty is
     # dependent on the charset-overrides-xml-encoding parameter.
     #
+    isChars= False
     if input.characterStream is not None:
-      self.chars= input.characterStream.read()
+      self.stream= input.characterStream
+      isChars= True
       if unicode is not None:
         self.encoding= 'utf-16'
       else:
         self.encoding= 'utf-8'
     elif input.byteStream is not None:
-      self.bytes= input.byteStream.read()
+      self.stream= input.byteStream
     elif input.stringData not in (None, ''):
 
       # Hack. Allow string data to be a blank string by hiding it in a tuple.
@@ -3118,11 +3620,11 @@ class InputBuffer:
 
       # Treat stringData as bytes if it's a narrow string, or chars in Unicode
       #
+      self.stream= StringIO.StringIO(data)
       if isinstance(data, Unicode):
-        self.chars= data
+        isChars= True
         self.encoding= 'utf-16'
       else:
-        self.bytes= data
         self.encoding= 'utf-8'
 
     elif self.uri is not None:
@@ -3135,26 +3637,33 @@ class InputBuffer:
         if contentType not in XMLTYPES and contentType[-4:]!='+xml':
           self.config._handleError(UnsupportedMediaTypeErr(None))
       self.encoding= stream.info().getparam('charset')
-      self.bytes= stream.read()
-      stream.close()
+      self.stream= stream
+      self.close= True
     else:
       self.config._handleError(NoInputErr(None))
 
-    # If we have bytes, attempt to convert them to characters. If we are
-    # certain of the encoding, drop the original bytes on the floor.
+    # Read the first window. If we have bytes, guess the encoding from them if
+    # not known, and start converting them to characters. If we are certain
+    # of the encoding, drop the original bytes on the floor.
     #
-    if self.chars is None:
+    data= self.read()
+    if isChars:
+      self.decode(data)
+    else:
+      # A BOM is sniffed from the first bytes, so read at least four
+      #
+      while len(data)<4 and self.stream is not None:
+        data= data+self.read()
+      self.bytes= data
       certain= self.encoding is not None and charsetCertain
       if self.encoding is None:
         if self.bytes[:2] in ('\xff\xfe', '\xfe\xff'):
           self.encoding= 'utf-16'
         else:
           self.encoding= 'utf-8'
-      self.decode(True)
+      self.decode(self.bytes)
       if certain:
         self.bytes= None
-    else:
-      self.decode(False)
 
   def setEncoding(self, xmlEncoding= None):
     """ Finished checking for encoding in possible XML declaration. If we were
@@ -3164,85 +3673,200 @@ class InputBuffer:
     if self.bytes is not None:
       if xmlEncoding is not None and xmlEncoding!=self.encoding:
         self.encoding= xmlEncoding
-        self.decode(True)
+        self.decode(self.bytes)
       self.bytes= None
+    self.settled= True
+    self.check(0)
+
+  def check(self, start):
+    """ Check the chars from index start on for characters not allowed in XML.
+    """
     for ch in NOTCHAR:
-      if ch in self.chars:
-        self.index= string.find(self.chars, ch)
+      index= string.find(self.chars, ch, start)
+      if index!=-1:
+        self.index= index
         self.config._handleError(ParseErr(self,'Invalid chr '+hex(ord(ch))))
     if isinstance(self.chars, Unicode):
       for ch in NOTCHARU:
-        if ch in self.chars:
-          self.index= string.find(self.chars, ch)
+        index= string.find(self.chars, ch, start)
+        if index!=-1:
+          self.index= index
           self.config._handleError(ParseErr(self,'Invalid chr '+hex(ord(ch))))
 
-  def decode(self, fromBytes= True):
-    """ Take input from chars or bytes (decoding through encoding property),
-        send result with normalised newlines and no BOM.
+  def read(self, size= 0):
+    """ Read and return the next window of data from the stream, or size if
+        that is more, or all of it if not reading by windows. Let go of the
+        stream when it is exhausted.
     """
-    if fromBytes:
-      if unicode is not None:
-        try:
-          codec= codecs.lookup(self.encoding)
-        except LookupError:
-          self.config._handleError(UnsupportedEncodingErr(None))
-        if codec==codecs.lookup('utf-16'):
-          if self.bytes[:2]=='\xff\xfe':
-            self.encoding= 'utf-16le'
-          elif self.bytes[:2]=='\xfe\xff':
-            self.encoding= 'utf-16be'
-        self.chars= unicode(self.bytes, self.encoding, 'replace')
-      else:
-        self.chars= self.bytes
-    for ls in LS:
-      self.chars= r(self.chars, ls, '\n')
-    if isinstance(self.chars, Unicode):
-      for ls in LSU:
-        self.chars= r(self.chars, ls, '\n')
-      if self.chars[:1]==unichr(0xFEFF):
-        self.chars= self.chars[1:]
+    if self.window is None:
+      data= self.stream.read()
+    else:
+      data= self.stream.read(max(self.window, size))
+    if self.window is None or data=='':
+      if self.close:
+        self.stream.close()
+      self.stream= None
+    return data
+
+  def decode(self, data):
+    """ Start again converting the input, from data: the bytes read so far
+        (decoding through encoding property), or the first chars.
+    """
+    self.decoder= None
+    if self.bytes is not None and unicode is not None:
+      try:
+        codec= codecs.lookup(self.encoding)
+      except LookupError:
+        self.config._handleError(UnsupportedEncodingErr(None))
+      if codec==codecs.lookup('utf-16'):
+        if self.bytes[:2]=='\xff\xfe':
+          self.encoding= 'utf-16le'
+        elif self.bytes[:2]=='\xfe\xff':
+          self.encoding= 'utf-16be'
+      self.decoder= codecs.getincrementaldecoder(self.encoding)('replace')
+    self.chars= data[:0]
+    self.cr= False
+    self.bom= True
+    self.base= 0
+    self.lines= LineIndex(self.chars, self.offset)
+    self.add(data)
+
+  def add(self, data):
+    """ Add a piece of data read from the stream to the chars, decoded, with
+        normalised newlines and no BOM. A CR at the end of a piece is held
+        back in case the next piece starts with the LF of a CR-LF pair.
+    """
+    final= self.stream is None
+    if self.decoder is not None:
+      data= self.decoder.decode(data, final)
+    if self.cr:
+      data= '\r'+data
+    self.cr= not final and data[-1:]=='\r'
+    if self.cr:
+      data= data[:-1]
+    if isinstance(data, Unicode):
+      data= NEWLINEURE('\n', data)
+      if self.bom and data!='':
+        self.bom= False
+        if data[:1]==unichr(0xFEFF):
+          data= data[1:]
+    else:
+      data= NEWLINERE('\n', data)
+    start= len(self.chars)
+    self.chars= self.chars+data
+    self.lines.setChars(self.chars, self.base)
+    if self.settled:
+      self.check(start)
+
+  def more(self):
+    """ Read the next window of the stream into the chars. Return whether
+        there were any more. A run of text longer than a window isn't
+        swallowed until it ends, so read as much again as is held: adding a
+        window at a time would copy the run once per window.
+    """
+    while self.stream is not None:
+      length= len(self.chars)
+      data= self.read(length)
+      if self.bytes is not None:
+        self.bytes= self.bytes+data
+      self.add(data)
+      if len(self.chars)>length:
+        return True
+    return False
+
+  def fill(self, index):
+    """ Read as far as the character at index, if there is one. Return whether
+        there is.
+    """
+    while index>=len(self.chars):
+      if not self.more():
+        return False
+    return True
 
   def getLocation(self):
     """ Return (line, column) position corresponding to the current index.
     """
-    # Get (line, col) position relative to start of entity, caching the
-    # calculated location for the given index to reduce the amount of
-    # string to search through next time
-    #
-    line= string.count(self.chars, '\n', self.cIndex, self.index)
-    if line==0:
-      line= self.cLocation[0]
-      col= self.cLocation[1]+self.index-self.cIndex
-    else:
-      line= self.cLocation[0]+line
-      col= self.index-string.rfind(self.chars, '\n', self.cIndex,self.index)-1
-    self.cLocation= (line, col)
-    self.cIndex= self.index
+    return self.lines.getLocation(self.base+self.index)
 
-    # Return the relative-index added to the entity offset. (1-based)
-    #
-    if line==0:
-      col= col+self.offset[1]
-    else:
-      col= col+1
-    line= line+self.offset[0]
-    return (line, col)
+  def getNodeLocation(self):
+    """ Return the location to store in a node parsed at the current index:
+        (line, column), or with pxdom-lazy-locations only (LineIndex, offset)
+        for the node to turn into a line and column if it is ever asked for.
+    """
+    if self.lazy:
+      return (self.lines, self.base+self.index)
+    return self.lines.getLocation(self.base+self.index)
 
   def reset(self):
     """ Set the index point back to the beginning of this buffer in order to
         allow it to be read again.
     """
     self.index= 0
-    self.cIndex= 0
-    self.cLocation= (0, 0)
 
-  def swallow(self):
-    """ Throw away any previously-parsed part of this buffer.
+  def swallow(self, keep= 0):
+    """ Throw away any previously-parsed part of this buffer, but for the
+        last keep characters (for an error message to quote).
     """
-    if self.index!=0:
-      self.offset= self.getLocation()
-      self.chars= self.chars[self.index:]
-      self.index= 0
+    if self.index>keep:
+      drop= self.index-keep
+      self.base= self.base+drop
+      self.chars= self.chars[drop:]
+      self.index= keep
+      self.lines.setChars(self.chars, self.base)
+
+
+class LineIndex:
+  """ Index of where the lines start in the text of an InputBuffer, built
+      only as far as is needed to turn character offsets into (line, column)
+      locations. Offsets count from the start of the text, including any part
+      of it the buffer has since swallowed.
+  """
+  def __init__(self, chars, offset):
+    self.chars= chars
+    self.offset= offset
+    self.base= 0
+    self.starts= [0]
+    self.scanned= 0
+
+  def scan(self, index):
+    """ Index the line starts up to offset index.
+    """
+    if index>self.scanned and self.chars is not None:
+      end= index-self.base
+      i= string.find(self.chars, '\n', self.scanned-self.base, end)
+      while i!=-1:
+        self.starts.append(self.base+i+1)
+        i= string.find(self.chars, '\n', i+1, end)
+      self.scanned= index
+
+  def setChars(self, chars, base):
+    """ The buffer's text from offset base on is now chars, having been read
+        further or had its start thrown away.
+    """
+    self.scan(base)
+    self.chars= chars
+    self.base= base
+
+  def finish(self):
+    """ Index the line starts of the rest of the text and let go of it, when
+        no more of it will be read.
+    """
+    if self.chars is not None:
+      self.scan(self.base+len(self.chars))
+      self.chars= None
+
+  def getLocation(self, index):
+    """ Return the (line, column) location of offset index, relative to the
+        location of the start of the text. (1-based)
+    """
+    self.scan(index)
+    line= bisect.bisect_right(self.starts, index)-1
+    col= index-self.starts[line]
+    if line==0:
+      col= col+self.offset[1]
+    else:
+      col= col+1
+    return (line+self.offset[0], col)
 
 
 # Convenience method for parsers to get an InputBuffer object for a resource
@@ -3319,6 +3943,7 @@ class LSParser(DOMObject):
       config= ParserConfiguration()
     self._domConfig= config
     self._filter= None
+    self._buffer= None
   def _get_domConfig(self):
     return self._domConfig
   def _get_filter(self):
@@ -3433,12 +4058,14 @@ class LSParser(DOMObject):
       ccn= p('check-character-normalization')
       self._domConfig.setParameter('normalize-characters', False)
       self._domConfig.setParameter('check-character-normalization', False)
+    document= parentNode._ownerDocument
+    document._beginBuild()
     try:
 
       # Dispatch into internal node parsing interfaces
       #
       namespaces= parentNode._getNamespaces(FIXEDNS.copy())
-      self._queue= ''
+      self._queue= []
       try:
         self._buffer= InputBuffer(input, (1, 1), self._domConfig, True)
         self._inEntity= False
@@ -3449,6 +4076,17 @@ class LSParser(DOMObject):
       except LSFilterInterrupt:
         pass
     finally:
+      document._endBuild()
+
+      # Nodes with lazy locations keep their buffer's LineIndex, but it need
+      # not keep the text once all of it has been parsed
+      #
+      buffers= [self._buffer]
+      buffers.extend(self._generalEntities.values())
+      buffers.extend(self._parameterEntities.values())
+      for buffer in buffers:
+        if buffer is not None:
+          buffer.lines.finish()
       self._buffer= None
       del self._parameterEntities
       del self._generalEntities
@@ -3461,17 +4099,31 @@ class LSParser(DOMObject):
   # Parsing utility functions
   #
   def _push(self, text):
-    self._queue= self._queue+text
+    """ Queue text for the next Text node. Text is kept as a list of chunks
+        and only joined in _flush, so long runs of text broken up by
+        references don't get copied over and over.
+    """
+    if text!='':
+      self._queue.append(text)
+
+  def _pop(self):
+    """ Return all the text queued by _push and empty the queue.
+    """
+    if len(self._queue)==1:
+      text= self._queue[0]
+    else:
+      text= string.join(self._queue, '')
+    self._queue= []
+    return text
 
   def _flush(self, parentNode, refChild):
     """ Write any text that has been read and queued into a new Text node.
     """
-    if self._queue=='':
+    if not self._queue:
       return None
-    text= self._domConfig._cnorm(self._queue, parentNode, True)
-    self._queue= ''
+    text= self._domConfig._cnorm(self._pop(), parentNode, True)
     node= parentNode._ownerDocument.createTextNode(text)
-    node._setLocation(self._buffer.getLocation())
+    node._setLocation(self._buffer.getNodeLocation())
 
     # If whitespace removal is required, must put the node in place to test
     # whether it is element content whitespace.
@@ -3521,48 +4173,72 @@ class LSParser(DOMObject):
     """ Check if a string is the next thing in the queue. Optionally and by
         default step over it if it is.
     """
-    index= self._buffer.index
-    matches= self._buffer.chars[index:index+len(chars)]==chars
+    buffer= self._buffer
+    if buffer.stream is not None:
+      buffer.fill(buffer.index+len(chars)-1)
+    matches= buffer.chars.startswith(chars, buffer.index)
     if stepPast and matches:
-      self._buffer.index= index+len(chars)
+      buffer.index= buffer.index+len(chars)
     return matches
 
   def _upto(self, chars):
     """ Read text up until the next occurance of one of a range of characters
         or strings.
     """
-    end= len(self._buffer.chars)
-    for s in chars:
-      index= string.find(self._buffer.chars, s, self._buffer.index, end)
-      if index!=-1 and index<end:
-        end= index
+    key= tuple(chars)
     try:
-      return self._buffer.chars[self._buffer.index:end]
-    finally:
-      self._buffer.index= end
+      search, longest= UPTORES[key]
+    except KeyError:
+      search, longest= UPTORES[key]= (
+        re.compile(string.join(map(re.escape, key), '|'), re.DOTALL).search,
+        max(map(len, key))
+      )
+    buffer= self._buffer
+    index= buffer.index
+    match= search(buffer.chars, index)
+
+    # Read on while no delimiter was found before the last few characters, any
+    # of which could begin one completed in the next window
+    #
+    while buffer.stream is not None and (
+      match is None or match.start()>len(buffer.chars)-longest
+    ):
+      start= max(index, len(buffer.chars)-longest+1)
+      if not buffer.more():
+        break
+      match= search(buffer.chars, start)
+    if match is None:
+      end= len(buffer.chars)
+    else:
+      end= match.start()
+    buffer.index= end
+    return buffer.chars[index:end]
 
   def _white(self, required= True):
     """ Parse white space.
     """
-    start= self._buffer.index
-    l= len(self._buffer.chars)
+    buffer= self._buffer
+    start= buffer.index
     while True:
-      index= self._buffer.index
-      if index>=l:
-        break
-      c= self._buffer.chars[index]
-      if not (c in WHITE or isinstance(c, Unicode) and c in WHITEU):
+      if isinstance(buffer.chars, Unicode):
+        index= WHITEURE(buffer.chars, start).end()
+      else:
+        index= WHITERE(buffer.chars, start).end()
+      if index<len(buffer.chars) or not buffer.more():
         break
-      self._buffer.index= index+1
+    buffer.index= index
     if required and index<=start:
       self._error('Expected whitespace')
 
   def _quote(self):
     """ Parse and return a quote character.
     """
-    for quote in '"\'':
-      if self._match(quote):
-        return quote
+    buffer= self._buffer
+    buffer.fill(buffer.index)
+    quote= buffer.chars[buffer.index:buffer.index+1]
+    if quote=='"' or quote=="'":
+      buffer.index= buffer.index+1
+      return quote
     self._error('Expected open-quote')
 
   def _equal(self):
@@ -3586,10 +4262,9 @@ class LSParser(DOMObject):
     """ Parse and return a hexadecimal number.
     """
     start= self._buffer.index
-    l= len(self._buffer.chars)
     while True:
       index= self._buffer.index
-      if index>=l or self._buffer.chars[index] not in HEX:
+      if not self._buffer.fill(index) or self._buffer.chars[index] not in HEX:
         break
       self._buffer.index= index+1
     if index==start:
@@ -3600,10 +4275,9 @@ class LSParser(DOMObject):
     """ Parse and return a decimal number.
     """
     start= self._buffer.index
-    l= len(self._buffer.chars)
     while True:
       index= self._buffer.index
-      if index>=l or self._buffer.chars[index] not in HEX:
+      if not self._buffer.fill(index) or self._buffer.chars[index] not in HEX:
         break
       self._buffer.index= index+1
     if index==start:
@@ -3613,45 +4287,36 @@ class LSParser(DOMObject):
   def _name(self):
     """ Parse and return an XML name.
     """
-    index= self._buffer.index
-    if index>=len(self._buffer.chars):
-      self._error('Expected name')
-    char= self._buffer.chars[index]
-    if char in NOTFIRST:
+    buffer= self._buffer
+    buffer.fill(buffer.index)
+    if isinstance(buffer.chars, Unicode):
+      first= FIRSTURE(buffer.chars, buffer.index)
+    else:
+      first= FIRSTRE(buffer.chars, buffer.index)
+    if first is None:
       self._error('Expected name')
-    if isinstance(char, Unicode):
-      for c0, c1 in NOTFIRSTU:
-        if ord(char)>=c0 and ord(char)<c1:
-          self._error('Expected name')
     return self._nmtokens()
   def _nmtokens(self):
-    start= self._buffer.index
-    l= len(self._buffer.chars)
+    buffer= self._buffer
+    start= buffer.index
+    buffer.fill(start)
     while True:
-      index= self._buffer.index
-      if index>=l:
-        break
-      char= self._buffer.chars[index]
-      if char in NOTNAME or char in NOTCHAR:
+      if isinstance(buffer.chars, Unicode):
+        match= NAMEURE(buffer.chars, start)
+      else:
+        match= NAMERE(buffer.chars, start)
+      if match is None or match.end()<len(buffer.chars) or not buffer.more():
         break
-      if isinstance(char, Unicode):
-        if char in NOTCHARU:
-          break
-        bad= False
-        for c0, c1 in NOTNAMEU:
-          if ord(char)>=c0 and ord(char)<c1:
-            bad= True
-        if bad:
-          break
-      self._buffer.index= index+1
-    if index==start:
+    if match is None:
       self._error('Expected name tokens')
-    return self._domConfig._cnorm(self._buffer.chars[start:index], None, True)
+      return self._domConfig._cnorm(buffer.chars[start:start], None, True)
+    buffer.index= match.end()
+    return self._domConfig._cnorm(match.group(), None, True)
 
   def _end(self):
     """ Check there is no more input to come.
     """
-    if self._buffer.index<len(self._buffer.chars):
+    if self._buffer.fill(self._buffer.index):
       self._error('Expected end of input')
 
 
@@ -3712,6 +4377,11 @@ class LSParser(DOMObject):
     isDoc= parentNode.nodeType==Node.DOCUMENT_NODE
     while True:
 
+      # Let go of the document text parsed so far once there is a window of it
+      #
+      if self._buffer.window is not None and self._buffer.index>=BUFFERWINDOW:
+        self._buffer.swallow(ERRORCONTEXT)
+
       # Get text up until next markup character and push it onto the text
       # queue.
       #
@@ -3783,7 +4453,7 @@ class LSParser(DOMObject):
     # namespaces into scope.
     #
     element= doc.createElement(self._name())
-    element._setLocation(self._buffer.getLocation())
+    element._setLocation(self._buffer.getNodeLocation())
     if ns:
       for attr in element.attributes:
         if attr.namespaceURI==NSNS:
@@ -3816,7 +4486,7 @@ class LSParser(DOMObject):
       # declarations for next pass.
       #
       attr= doc.createAttribute(name)
-      attr._setLocation(self._buffer.getLocation())
+      attr._setLocation(self._buffer.getNodeLocation())
       self._equal()
       self._Attr(attr, None, namespaces)
 
@@ -3861,6 +4531,7 @@ class LSParser(DOMObject):
         else:
           attr._namespaceURI= None
           self._domConfig._handleError(UnboundNSErr(element, self._inEntity))
+      element._attributes._reindex()
 
     # Add element to document. If we are inheriting a skipped baseURI and the
     # element doesn't completely override it with an absolute URI, fix it up
@@ -3995,7 +4666,7 @@ class LSParser(DOMObject):
           self._flush(parentNode, refChild)
           ent= EntityReference(parentNode._ownerDocument, 'x')
           ent._nodeName= '#x%x' % value
-          ent._setLocation(self._buffer.getLocation())
+          ent._setLocation(self._buffer.getNodeLocation())
           ent._recurse(True, readonly= True)
           self._insert(ent, parentNode, refChild)
 
@@ -4094,7 +4765,7 @@ class LSParser(DOMObject):
     if self._domConfig.getParameter('comments'):
       self._flush(parentNode, refChild)
       comment= parentNode._ownerDocument.createComment(data)
-      comment._setLocation(self._buffer.getLocation())
+      comment._setLocation(self._buffer.getNodeLocation())
       self._insert(comment, parentNode, refChild)
 
 
@@ -4107,7 +4778,7 @@ class LSParser(DOMObject):
       if not self._match('?>'):
         self._error('Expected ?> to close processing instruction')
     pi= parentNode._ownerDocument.createProcessingInstruction(target, data)
-    pi._setLocation(self._buffer.getLocation())
+    pi._setLocation(self._buffer.getNodeLocation())
     self._flush(parentNode, refChild)
     self._insert(pi, parentNode, refChild)
     if inheritURI is not None:
@@ -4122,7 +4793,7 @@ class LSParser(DOMObject):
       self._push(data)
     else:
       cdata= parentNode._ownerDocument.createCDATASection(data)
-      cdata._setLocation(self._buffer.getLocation())
+      cdata._setLocation(self._buffer.getNodeLocation())
 
       # Depending on configuration parameter, possibly throw away CDATA
       # sections in element content that contain only whitespace. It is
@@ -4226,6 +4897,7 @@ class LSParser(DOMObject):
       if self._match('%'):
         if ignorePercent:
           index= self._buffer.index
+          self._buffer.fill(index)
           if self._buffer.chars[index:index+1] in WHITE+'%':
             self._buffer.index= index-1
             return
@@ -4248,8 +4920,10 @@ class LSParser(DOMObject):
 
       # Step out of PE
       #
-      l= len(self._buffer.chars)
-      if self._buffer.index>=l and self._buffer.parent is not None:
+      if (
+        not self._buffer.fill(self._buffer.index) and
+        self._buffer.parent is not None
+      ):
         par= self._buffer.parent
         self._buffer.parent= None
         self._buffer.index= 0
@@ -4285,7 +4959,7 @@ class LSParser(DOMObject):
     while True:
       self._checkPE(doctype)
       if (
-        self._buffer.index==len(self._buffer.chars) or
+        not self._buffer.fill(self._buffer.index) or
         self._match(']', stepPast=False)
       ):
         break
@@ -4402,11 +5076,10 @@ class LSParser(DOMObject):
           self._Charref(doctype, None, None, textonly= True)
         else:
           self._checkPE(doctype, white= False)
-          if self._buffer.index==len(self._buffer.chars):
+          if not self._buffer.fill(self._buffer.index):
             break
 
-      replacement= self._queue
-      self._queue= ''
+      replacement= self._pop()
       self._buffer=realbuf
 
       input= LSInput()
@@ -5510,14 +6183,17 @@ class ParseErr(DOMException):
     self.buffer= buffer
     line, column= buffer.getLocation()
     self.location= DOMLocator(None, line, column, buffer.uri)
+
+    # Take the text around the error now, the buffer will read on and swallow.
+    # What follows is only what has been read, which may end short of it.
+    #
+    ch= buffer.chars
+    ix= buffer.index
+    self.pre= string.split(ch[max(ix-ERRORCONTEXT, 0):ix], '\n')[-1]
+    self.post= string.split(ch[ix:ix+ERRORCONTEXT], '\n')[0]
   def __str__(self):
-    LEE= 30
-    ch= self.buffer.chars
-    ix= self.buffer.index
-    pre= string.split(ch[max(ix-LEE, 0):ix], '\n')[-1]
-    post= string.split(ch[ix:min(ix+LEE, len(ch))], '\n')[0]
-    pre= string.join(filter(lambda c: ord(c)<127, pre), '')
-    post= string.join(filter(lambda c: ord(c)<127, post), '')
+    pre= string.join(filter(lambda c: ord(c)<127, self.pre), '')
+    post= string.join(filter(lambda c: ord(c)<127, self.post), '')
     line, column= self.location.lineNumber, self.location.columnNumber
     s= '%s\naround line %s char %s' % (self.message, line, column)
     if self.buffer.uri is not None:
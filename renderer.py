@@ -1,4 +1,5 @@
 import re
+from collections import OrderedDict
 
 class Renderer:
     def text_size(self, text, elem):
@@ -7,6 +8,16 @@ class Renderer:
         """
         raise NotImplementedError
 
+    def font_key(self, elem):
+        """ Return a hashable key for the font the text in elem is rendered
+        in. Text measured in fonts with equal keys must have the same size,
+        see boxmodel.metrics. The default uses the element's computed font
+        properties.
+        """
+        style = elem.ownerDocument.defaultView.getLayoutStyle(elem)
+        return (style.fontFamily, style.fontSize, style.fontWeight,
+                style.fontStyle, style.fontVariant)
+
     def render_box(self, box):
         """ Render onto the internal canvas of the renderer the contents of the given box
         """
@@ -15,13 +26,31 @@ class Renderer:
 import pygame
 
 class PygameRenderer(Renderer):
-    def __init__(self, width, height):
+    """ Renders boxes with pygame.
+
+    Rendered text is kept in a cache of at most cache_size surfaces keyed by
+    (font, text, color), shared by all boxes and renderAll calls. If direct is
+    true boxes are drawn onto the page surface as they are rendered, instead
+    of being kept and drawn by renderAll.
+
+    Rendering a box of another layout than the last one (a box tree with a
+    different root) first clears the page, see clear.
+    """
+    TEXT_COLOR = (0,0,0)
+    PAGE_COLOR = (255,255,255)
+
+    def __init__(self, width, height, direct=False, cache_size=1024):
         self.box_counter = 0
         self.boxes = []
         self.width = width
         self.height = height
         self.iwidth = width
         self.iheight = height
+        self.direct = direct
+        self._renders = OrderedDict()
+        self._cache_size = cache_size
+        self._page = None
+        self._root = None
         pygame.font.init()
         self.font = pygame.font.SysFont('Times New Roman', 16)
 
@@ -35,29 +64,84 @@ class PygameRenderer(Renderer):
         (width, height) = self.font.size(text)
         return (width, self.font.get_linesize())
 
-    def renderAll(self):
+    def font_key(self, elem):
+        # all text is rendered in the same font for now
+        return self.font
+
+    def render_text(self, font, text, color):
+        """ Return a surface with text rendered in font and color, from the
+        render cache if possible
+        """
+        key = (font, text, color)
+        renders = self._renders
+        try:
+            surface = renders.pop(key)
+        except KeyError:
+            surface = font.render(text, True, color)
+            if len(renders) >= self._cache_size:
+                renders.popitem(last=False)
+        renders[key] = surface
+        return surface
+
+    def _new_page(self):
+        """ Return a blank page surface of the current size, with whatever was
+        drawn directly on the old page copied over
+        """
         page = pygame.Surface((self.width, self.height))
-        page.fill((255,255,255))
-        for box, img in self.boxes:
-            page.blit(img, (box.x, box.y))
+        page.fill(self.PAGE_COLOR)
+        if self._page is not None:
+            page.blit(self._page, (0, 0))
+        return page
+
+    def clear(self):
+        """ Drop all boxes rendered so far, including what was drawn directly
+        on the page, and shrink the page back to its initial size
+        """
+        self.boxes = []
+        self._page = None
+        self.width = self.iwidth
+        self.height = self.iheight
+
+    def renderAll(self):
+        if self.direct:
+            if self._page is None or \
+                    self._page.get_size() != (self.width, self.height):
+                self._page = self._new_page()
+            page = self._page
+        else:
+            page = self._new_page()
+            for box, key in self.boxes:
+                page.blit(self.render_text(*key), (box.x, box.y))
         pygame.draw.rect(page, (0,0,0), 
                          pygame.Rect(0,0, self.iwidth, self.iheight),
                          1)
         return page
 
     def render_box(self, box):
+        root = box
+        while root.parentBox is not None:
+            root = root.parentBox
+        if root is not self._root:
+            self.clear()
+            self._root = root
+        self._render_box(box)
+
+    def _render_box(self, box):
         if box.__class__.__name__ == 'TextBox':
             #print 'about to render box %d: "%s": %d,%d' % (self.box_counter, box.text, box.x, box.y)
 
-            box_render = self.font.render(box.text, True, (0,0,0))#, (255,255,255))
+            key = (self.font, box.text, self.TEXT_COLOR)
             #pygame.image.save(box_render, 'box_dumps/box%d.bmp' % self.box_counter)
             self.box_counter += 1
             self.width = max(self.width, box.x + box.width)
             self.height = max(self.height, box.y + box.height)
-            self.boxes.append((box, box_render))
+            if self.direct:
+                if self._page is None or \
+                        self._page.get_size() != (self.width, self.height):
+                    self._page = self._new_page()
+                self._page.blit(self.render_text(*key), (box.x, box.y))
+            else:
+                self.boxes.append((box, key))
         else:
             for child in box.childBoxes:
-                self.render_box(child)
-        
-    
-        
+                self._render_box(child)